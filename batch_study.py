@@ -0,0 +1,176 @@
+"""
+Batch protection study of many feeders.
+Each feeder is studied from its own input file, '<feeder> relay_coordination_input_file.xlsm' in the study directory.
+The network stages (fault level study) read the single PowerFactory session, so feeders are taken through them one at a
+time. The remaining stages need only the device data, and are run for each feeder in a process pool while the next
+feeder's network stages run. A summary of the status of each feeder is saved at the end.
+
+Usage, from the PowerFactory Python environment:
+    batch_study.py [feeder list.xlsx]
+The feeder list is a 'Feeder' column, as saved by load_rating_data/powerfactory_feeders.py. Defaults to the newest
+'PowerFactory Feeders *.xlsx' in the study directory.
+"""
+
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+from input_files import input_file, data_validation as dv
+from input_files.data_inputs import client_path
+from fault_level_data import fault_cache
+
+
+class Console:
+    """Prints the messages of study stages run in worker processes, in place of the PowerFactory output window"""
+
+    def __init__(self, feeder: str):
+        self.feeder = feeder
+
+    def PrintPlain(self, message: str):
+        print(f"{self.feeder}: {message}")
+
+
+def feeder_input_path(feeder: str) -> Path:
+    return client_path() / f"{feeder} relay_coordination_input_file.xlsm"
+
+
+def read_feeders(path=None) -> list[str]:
+    """
+    :param path: Feeder list. Defaults to the newest PowerFactory Feeders file in the study directory
+    :return: Feeder names
+    """
+
+    if path is None:
+        feeder_lists = sorted(client_path().glob('PowerFactory Feeders *.xlsx'), key=lambda file: file.stat().st_mtime)
+        if not feeder_lists:
+            raise FileNotFoundError(f"No PowerFactory Feeders file found in {client_path()}")
+        path = feeder_lists[-1]
+    feeders = pd.read_excel(path, engine='openpyxl')['Feeder']
+    return [str(feeder) for feeder in feeders.dropna()]
+
+
+def batch_study(app, feeders: list[str], workers: int = None) -> dict[str:dict]:
+    """
+    Study each feeder.
+    :param app: PowerFactory application
+    :param feeders: Feeder names
+    :param workers: Number of worker processes. Defaults to the number of processors
+    :return: {feeder: status}, see save_summary()
+    """
+
+    summary = {}
+    futures = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for n, feeder in enumerate(feeders):
+            app.PrintPlain(f"Batch study feeder {n + 1} of {len(feeders)}: {feeder}")
+            network_start = time.time()
+            try:
+                job = network_job(app, feeder)
+            except (Exception, SystemExit) as error:
+                summary[feeder] = _status('Failed', 'Network stages', error, time.time() - network_start)
+                continue
+            futures[feeder] = (executor.submit(run_study_stages, job), time.time() - network_start)
+
+        for feeder, (future, network_time) in futures.items():
+            summary[feeder] = future.result()
+            summary[feeder]['Run time (s)'] = round(summary[feeder]['Run time (s)'] + network_time, 1)
+
+    return {feeder: summary[feeder] for feeder in feeders}
+
+
+def network_job(app, feeder: str) -> dict:
+    """
+    Read the feeder input file and run its network stages.
+    :param app:
+    :param feeder:
+    :return: Picklable job for run_study_stages()
+    """
+
+    path = feeder_input_path(feeder)
+    if not path.exists():
+        raise FileNotFoundError(f"Input file {path.name} not found")
+    instructions, inputs, grad_param = input_file.get_input(path)
+    instructions[0] = feeder
+    dv.validate_data(app, instructions, inputs, grad_param)
+    input_file.set_grading_parameters(grad_param)
+    import start
+
+    all_devices = input_file.update_devices(grad_param, inputs)
+    gen_info, all_devices, detailed_fls = start.network_stages(app, instructions, all_devices)
+    if detailed_fls is not None:
+        # Detailed fault levels refer to PowerFactory objects. Reduce them to plain data for the worker process
+        detailed_fls = fault_cache.capture(gen_info, all_devices, detailed_fls)
+    return {'instructions': instructions, 'grad_param': grad_param, 'gen_info': gen_info,
+            'all_devices': all_devices, 'detailed_fls': detailed_fls}
+
+
+def run_study_stages(job: dict) -> dict:
+    """
+    Worker process: run the study stages of one feeder and save its results.
+    :param job: network_job()
+    :return: Feeder status
+    """
+
+    start_time = time.time()
+    instructions = job['instructions']
+    feeder = instructions[0]
+    try:
+        input_file.set_grading_parameters(job['grad_param'])
+        import start
+
+        all_devices = job['all_devices']
+        gen_info, detailed_fls = job['gen_info'], None
+        if job['detailed_fls'] is not None:
+            gen_info, all_devices, detailed_fls = fault_cache.restore(job['detailed_fls'], all_devices)
+        start.study_stages(Console(feeder), instructions, job['grad_param'], gen_info, all_devices, detailed_fls,
+                           feeder_file_name=True)
+    except (Exception, SystemExit) as error:
+        return _status('Failed', 'Study stages', error, time.time() - start_time)
+    return _status('Complete', '', None, time.time() - start_time)
+
+
+def _status(status: str, stage: str, error, run_time: float) -> dict:
+    if error is not None:
+        detail = ''.join(traceback.format_exception_only(type(error), error)).strip()
+    else:
+        detail = ''
+    return {'Status': status, 'Failed stage': stage, 'Detail': detail, 'Run time (s)': round(run_time, 1)}
+
+
+def save_summary(app, summary: dict[str:dict]) -> Path:
+    """
+    Save the feeder status summary to 'Batch Study Summary <date>.xlsx' in the study directory.
+    :param app:
+    :param summary: batch_study() summary
+    :return: Summary file
+    """
+
+    date_string = time.strftime("%Y%m%d-%H%M%S")
+    filepath = client_path() / f"Batch Study Summary {date_string}.xlsx"
+    df = pd.DataFrame.from_dict(summary, orient='index')
+    df.index.name = 'Feeder'
+    with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Summary')
+    complete = sum(status['Status'] == 'Complete' for status in summary.values())
+    app.PrintPlain(f"{complete} of {len(summary)} feeders studied. Summary saved to {filepath}")
+    return filepath
+
+
+if __name__ == '__main__':
+    from helper_funcs.script_helper import project_manager
+    import powerfactory as pf
+
+    start_time = time.time()
+    app = pf.GetApplication()
+    app.SetEnableUserBreak(1)
+    app.ClearOutputWindow()
+
+    feeders = read_feeders(sys.argv[1] if len(sys.argv) > 1 else None)
+    with project_manager(app):
+        summary = batch_study(app, feeders)
+    save_summary(app, summary)
+
+    run_time = round(time.time() - start_time, 6)
+    app.PrintPlain(f"Script run time: {run_time} seconds")
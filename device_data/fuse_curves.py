@@ -0,0 +1,208 @@
+"""
+Fuse time-current curves.
+Fuse curve data tables are converted once to sorted numpy arrays. Times and currents are interpolated on log-log axes,
+for a single value or an array of values in one call. The curves of several fuses can be stacked into a CurveStack, to
+interpolate every curve at the same values in one call.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class FuseCurve:
+    """Min melting and total clearing time-current curves of a fuse"""
+
+    def __init__(self, name: str, min_curve: tuple, total_curve: tuple = None):
+        """
+        Initialise attributes
+        :param name: Fuse name
+        :param min_curve: (currents, times) of the minimum melting curve
+        :param total_curve: (currents, times) of the total clearing curve. Defaults to the min_curve
+        """
+        self.name: str = name
+        self.min = _Curve(*min_curve)
+        self.total = _Curve(*total_curve) if total_curve is not None else self.min
+
+    def bound(self, bound: str):
+        """
+        :param bound: 'Min' for the minimum melting curve, otherwise the total clearing curve
+        :return:
+        """
+        if bound == 'Min':
+            return self.min
+        return self.total
+
+    def time(self, current, bound: str = 'Min', clip: bool = True):
+        """
+        Interpolate fuse time from current.
+        :param current: Current (A), or array of currents
+        :param bound: 'Min', 'Max'
+        :param clip: If False, currents outside the curve return nan. Otherwise the curve end values are returned
+        :return: Time (s), or array of times
+        """
+        return self.bound(bound).time(current, clip)
+
+    def current(self, time, bound: str = 'Min', clip: bool = True):
+        """
+        Interpolate fuse current from time.
+        :param time: Time (s), or array of times
+        :param bound: 'Min', 'Max'
+        :param clip: If False, times outside the curve return nan. Otherwise the curve end values are returned
+        :return: Current (A), or array of currents
+        """
+        return self.bound(bound).current(time, clip)
+
+
+class _Curve:
+    """Single time-current curve held as log-log arrays sorted for interpolation in both directions"""
+
+    def __init__(self, currents, times):
+        currents = np.asarray(currents, dtype=float)
+        times = np.asarray(times, dtype=float)
+        valid = np.isfinite(currents) & np.isfinite(times) & (currents > 0) & (times > 0)
+        log_i = np.log10(currents[valid])
+        log_t = np.log10(times[valid])
+        if not log_i.size:
+            raise ValueError("Fuse curve has no valid time-current points")
+
+        by_current = np.argsort(log_i, kind='stable')
+        self._i_log_i = np.ascontiguousarray(log_i[by_current])
+        self._i_log_t = np.ascontiguousarray(log_t[by_current])
+        by_time = np.argsort(log_t, kind='stable')
+        self._t_log_t = np.ascontiguousarray(log_t[by_time])
+        self._t_log_i = np.ascontiguousarray(log_i[by_time])
+
+    @property
+    def currents(self) -> np.ndarray:
+        """Currents of the curve points, in ascending order. The curve slope changes only at these currents."""
+        return 10 ** self._i_log_i
+
+    def time(self, current, clip: bool = True):
+        return _interp(current, self._i_log_i, self._i_log_t, clip)
+
+    def current(self, time, clip: bool = True):
+        return _interp(time, self._t_log_t, self._t_log_i, clip)
+
+
+def _interp(x, xp, fp, clip: bool):
+    """Log-log interpolation. Returns a float for scalar x, otherwise an array the shape of x."""
+
+    x = np.asarray(x, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_x = np.log10(x)
+    if clip:
+        y = 10 ** np.interp(log_x, xp, fp)
+    else:
+        y = 10 ** np.interp(log_x, xp, fp, left=np.nan, right=np.nan)
+    if y.ndim == 0:
+        return float(y)
+    return y
+
+
+class CurveStack:
+    """
+    One bound of several fuse curves, padded to a common length. Each value is interpolated on every curve at once.
+    Values outside a curve return nan, as FuseCurve.time and FuseCurve.current with clip=False.
+    """
+
+    def __init__(self, curves: list[FuseCurve], bound: str):
+        """
+        Initialise attributes
+        :param curves: Fuse curves, in the order of the stack rows
+        :param bound: 'Min', 'Max'
+        """
+        self.names: list[str] = [curve.name for curve in curves]
+        bounds = [curve.bound(bound) for curve in curves]
+        self._i_log_i, self._i_log_t = _pad([b._i_log_i for b in bounds], [b._i_log_t for b in bounds])
+        self._t_log_t, self._t_log_i = _pad([b._t_log_t for b in bounds], [b._t_log_i for b in bounds])
+
+    def time(self, current) -> np.ndarray:
+        """
+        :param current: Current (A), or array of currents
+        :return: Times (s), shape (len(curves), *current.shape)
+        """
+        return _interp_stack(current, self._i_log_i, self._i_log_t)
+
+    def current(self, time) -> np.ndarray:
+        """
+        :param time: Time (s), or array of times
+        :return: Currents (A), shape (len(curves), *time.shape)
+        """
+        return _interp_stack(time, self._t_log_t, self._t_log_i)
+
+
+def _pad(xps: list[np.ndarray], fps: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Stack curve point arrays. Rows are padded with inf x values, which lie beyond every interpolated value."""
+
+    length = max(len(xp) for xp in xps)
+    xp_stack = np.full((len(xps), length), np.inf)
+    fp_stack = np.zeros((len(xps), length))
+    for row, (xp, fp) in enumerate(zip(xps, fps)):
+        xp_stack[row, :len(xp)] = xp
+        fp_stack[row, :len(fp)] = fp
+    return xp_stack, fp_stack
+
+
+def _interp_stack(x, xp: np.ndarray, fp: np.ndarray) -> np.ndarray:
+    """
+    Log-log interpolation of x on each row of the padded curve stack (xp, fp), equivalent to _interp(x, row xp,
+    row fp, clip=False) for every row.
+    """
+
+    x = np.asarray(x, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_x = np.log10(x).reshape(-1)
+    lengths = np.isfinite(xp).sum(axis=1)[:, None]
+    # Number of curve points at or below each value. The value lies between points count - 1 and count
+    count = (xp[:, None, :] <= log_x[None, :, None]).sum(axis=2)
+    hi = np.clip(np.minimum(count, lengths - 1), 1, max(xp.shape[1] - 1, 1))
+    lo = hi - 1
+    x0 = np.take_along_axis(xp, lo, axis=1)
+    x1 = np.take_along_axis(xp, hi, axis=1)
+    f0 = np.take_along_axis(fp, lo, axis=1)
+    f1 = np.take_along_axis(fp, hi, axis=1)
+    last = np.take_along_axis(xp, lengths - 1, axis=1)
+    last_f = np.take_along_axis(fp, lengths - 1, axis=1)
+    inside = (count >= 1) & (count < lengths)
+    at_end = (count == lengths) & (log_x == last)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = np.where(inside, f0 + (log_x - x0) / (x1 - x0) * (f1 - f0), np.where(at_end, last_f, np.nan))
+    return (10 ** y).reshape(len(xp), *x.shape)
+
+
+def single_curves(df) -> dict[str, FuseCurve]:
+    """
+    Fuse curves from a table with the current in the first column and a time column for each fuse
+    (grade_sheet_fuse_data()). The same curve is used for both bounds.
+    :param df:
+    :return: {fuse name: FuseCurve}
+    """
+
+    currents = _column(df.iloc[:, 0])
+    return {name: FuseCurve(name, (currents, _column(df[name]))) for name in df.columns[1:]}
+
+
+def bound_curves(df) -> dict[str, FuseCurve]:
+    """
+    Fuse curves from a table of {fuse}minI, {fuse}minT, {fuse}totI, {fuse}totT columns (fuse_data()).
+    :param df:
+    :return: {fuse name: FuseCurve}
+    """
+
+    curves = {}
+    for column in df.columns:
+        if not column.endswith('minI'):
+            continue
+        name = column[:-len('minI')]
+        min_curve = (_column(df[f"{name}minI"]), _column(df[f"{name}minT"]))
+        if f"{name}totI" in df.columns:
+            total_curve = (_column(df[f"{name}totI"]), _column(df[f"{name}totT"]))
+        else:
+            total_curve = None
+        curves[name] = FuseCurve(name, min_curve, total_curve)
+    return curves
+
+
+def _column(series) -> np.ndarray:
+    """Column values as floats. Blank or non-numeric cells become nan and are dropped from the curve."""
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=float)
@@ -1,5 +1,6 @@
 from typing import Union
 from fault_level_data import study_templates
+from fault_level_data.network_backend import NetworkBackend
 
 
 def short_circuit(app, bound: str, f_type: str, location: Union[object, None] = None, ppro: int = 0) -> object:
@@ -13,6 +14,9 @@ def short_circuit(app, bound: str, f_type: str, location: Union[object, None] =
     :return: Short-Circuit Command
     """
 
+    if isinstance(app, NetworkBackend):
+        return app.short_circuit(bound, f_type, location, ppro)
+
     ComShc = app.GetFromStudyCase("Short_Circuit.ComShc")
     study_templates.apply_sc(ComShc, bound, f_type)
     if location:
@@ -0,0 +1,193 @@
+"""
+Persistent fault level study results.
+The results of the last fault level study of each feeder are kept in a local cache file, keyed by a stamp of everything
+the study reads: the feeder model and switch states, the electrical parameters of the feeder elements, the external grid
+parameters, the short-circuit study settings and the device inputs. While the key is unchanged, fault_study loads the results from the cache rather than running the
+short-circuit calculations again.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import pickle
+from dataclasses import fields
+from typing import Union
+from fault_level_data import study_templates, topology
+from input_files.data_inputs import cache_dir
+
+# Short-circuit study settings applied by analysis.short_circuit
+sc_templates = (
+    study_templates.MaxPhaseShortCircuit, study_templates.MaxGroundShortCircuit,
+    study_templates.MinPhaseShortCircuit, study_templates.MinGroundShortCircuit,
+)
+
+# Element and type parameters that set the fault levels, by class. Type (typ_id) parameters are stamped with the
+# element. External grid parameters are stamped from fault_data.get_grid_data.
+electrical_parameters = {
+    'ElmTerm': ('uknom',),
+    'ElmLne': ('dline', 'nlnum', 'fline', 'typ_id'),
+    'TypLne': ('uline', 'rline', 'xline', 'rline0', 'xline0', 'rtemp', 'nlnph', 'nneutral'),
+    'ElmTr2': ('ntnum', 'nntap', 'typ_id'),
+    'TypTr2': ('strn', 'utrn_h', 'utrn_l', 'uktr', 'pcutr', 'uk0tr', 'ur0tr', 'zx0hl_n', 'tr2cn_h', 'tr2cn_l',
+               'nt2ag'),
+    'ElmLod': ('Strat', 'plini', 'qlini', 'slini', 'scale0'),
+    'ElmGenstat': ('sgn', 'ngnum', 'ip_ctrl', 'Kfactor', 'Ipeak'),
+    'ElmPvsys': ('sgn', 'ngnum', 'ip_ctrl', 'Kfactor', 'Ipeak'),
+    'ElmSym': ('ngnum', 'typ_id'),
+    'TypSym': ('sgn', 'ugn', 'xdss', 'rstr', 'x2sy', 'r2sy', 'x0sy', 'r0sy'),
+}
+
+
+class CachedObject:
+    """Stand-in for a PowerFactory object in cached results, carrying the attributes read from it"""
+
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+def cache_path(feeder_name: str):
+    return cache_dir() / f"{feeder_name} fault levels.cache.pkl"
+
+
+def study_key(app, feeder: object, all_devices: list[object], switch_state: dict, grid_data: dict) -> str:
+    """
+    Stamp of the fault level study inputs.
+    :param app:
+    :param feeder: ElmFeeder
+    :param all_devices: Devices before the study
+    :param switch_state: {switch: on_off} from fault_data.store_switch_state
+    :param grid_data: External grid parameters from fault_data.get_grid_data
+    :return:
+    """
+
+    objects = feeder.GetAll()
+    inputs = {
+        'feeder': [feeder.loc_name, topology.model_stamp(app, objects)],
+        'parameters': [[obj.loc_name, _parameters(obj)] for obj in objects
+                       if obj.GetClassName() in electrical_parameters],
+        'switches': sorted((switch.loc_name, switch_state[switch]) for switch in switch_state),
+        'grids': grid_data,
+        'templates': {
+            template.__name__: {field.name: getattr(template, field.name) for field in fields(template)}
+            for template in sc_templates
+        },
+        'devices': [[device.name, _encode(vars(device.netdat))] for device in all_devices],
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def load(feeder_name: str, key: str) -> Union[dict, None]:
+    """
+    :param feeder_name:
+    :param key: study_key()
+    :return: Cached results of the study with this key, or None
+    """
+
+    try:
+        with open(cache_path(feeder_name), 'rb') as file:
+            cached = pickle.load(file)
+        if cached['key'] == key:
+            return cached['results']
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError, TypeError):
+        pass
+    return None
+
+
+def save(feeder_name: str, key: str, results: dict):
+    path = cache_path(feeder_name)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as file:
+            pickle.dump({'key': key, 'results': results}, file)
+    except OSError:
+        # The cache is an optimisation only. Carry on if the cache directory cannot be written.
+        pass
+
+
+def capture(gen_info: list, all_devices: list[object], detailed_fls: list) -> dict:
+    """
+    The fault_study results as plain data. PowerFactory objects are reduced to the names and values read from them
+    when the results are saved.
+    :return:
+    """
+
+    *fls, section_loads = detailed_fls
+    return {
+        'gen_info': gen_info,
+        'netdat': {device.name: _encode(vars(device.netdat)) for device in all_devices},
+        'fls': [
+            {device.loc_name: {term.loc_name: fl for term, fl in terms.items()} for device, terms in results.items()}
+            for results in fls
+        ],
+        'section_loads': {
+            device.loc_name: [(load.loc_name, load.Strat, load.bus1.cterm.loc_name) for load in loads]
+            for device, loads in section_loads.items()
+        },
+    }
+
+
+def restore(results: dict, all_devices: list[object]) -> tuple[list, list, list]:
+    """
+    Apply captured results to the devices.
+    :param results: capture() results
+    :param all_devices:
+    :return: gen_info, all_devices, detailed_fls as returned by fault_study. Terminals and loads in detailed_fls are
+    stand-ins carrying the attributes used when the results are saved.
+    """
+
+    devices = {device.name: device for device in all_devices}
+    for device in all_devices:
+        for attribute, value in results['netdat'][device.name].items():
+            setattr(device.netdat, attribute, _decode(value, devices))
+
+    terminals = {}
+
+    def terminal(name):
+        if name not in terminals:
+            terminals[name] = CachedObject(loc_name=name)
+        return terminals[name]
+
+    fls = [
+        {terminal(device): {terminal(term): fl for term, fl in terms.items()} for device, terms in sect.items()}
+        for sect in results['fls']
+    ]
+    section_loads = {
+        terminal(device): [
+            CachedObject(loc_name=name, Strat=strat, bus1=CachedObject(cterm=terminal(term)))
+            for name, strat, term in loads
+        ]
+        for device, loads in results['section_loads'].items()
+    }
+    return results['gen_info'], all_devices, fls + [section_loads]
+
+
+def _parameters(obj) -> dict:
+    """Electrical parameters of an element, with those of its type in place of the type reference"""
+    parameters = {}
+    for attribute in electrical_parameters.get(obj.GetClassName(), ()):
+        if not obj.HasAttribute(attribute):
+            continue
+        value = obj.GetAttribute(attribute)
+        if hasattr(value, 'GetClassName'):
+            value = [value.loc_name, _parameters(value)]
+        parameters[attribute] = value
+    return parameters
+
+
+def _encode(value):
+    """Replace device objects with ('device', name) references"""
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if hasattr(value, 'netdat'):
+        return ('device', value.name)
+    return value
+
+
+def _decode(value, devices: dict):
+    if isinstance(value, list):
+        return [_decode(item, devices) for item in value]
+    if isinstance(value, tuple) and len(value) == 2 and value[0] == 'device':
+        return devices[value[1]]
+    return value
@@ -1,10 +1,15 @@
+from __future__ import annotations
 from importlib import reload
 
 import sys
 import math
 sys.path.append(r"\\Ecasd01\WksMgmt\PowerFactory\ScriptsDEV\PowerFactoryTyping")
-import powerfactorytyping as pft
-from fault_level_data import analysis, floating_terminals as ft
+try:
+    # Type annotations only. Not available off the PowerFactory host.
+    import powerfactorytyping as pft
+except ImportError:
+    pft = None
+from fault_level_data import analysis, fault_cache, fault_results, floating_terminals as ft, topology
 from device_data import eql_fuse_data as fu
 
 
@@ -29,76 +34,68 @@ def fault_study(app, all_devices: list[object], feeder: str) -> tuple[list, list
         app.PrintPlain("To run this script, please radialise the feeder")
         sys.exit(0)
 
+    # Reuse the results of the last study of the feeder if none of its inputs have changed
+    grid_data = get_grid_data(app)
+    switch_state = store_switch_state(app, {}, False)
+    cache_key = fault_cache.study_key(app, feeder_name, all_devices, switch_state, grid_data)
+    cached = fault_cache.load(feeder_name.loc_name, cache_key)
+    if cached is not None:
+        app.PrintPlain("Fault level study inputs are unchanged. Fault levels loaded from the previous study")
+        return fault_cache.restore(cached, all_devices)
+
     # For each of the feeder devices, identify all downstream nodes
-    devices_terminals, devices_loads = get_downstream_objects(app, site_name_map)
+    graph = topology.feeder_graph(app, feeder_name)
+    devices_terminals, devices_loads = get_downstream_objects(app, site_name_map, graph)
     # Update all devices with the lists of downstream devices and upstreams devices
-    all_devices = us_ds_device(devices_terminals, site_name_map, all_devices)
+    site_index = SiteIndex(site_name_map, all_devices)
+    all_devices = us_ds_device(devices_terminals, site_index, all_devices)
 
     ds_capacity = get_ds_capacity(devices_loads)
     section_loads = get_device_sections(devices_loads)
     device_max_load, device_max_trs = get_section_max_tr(section_loads)
     devices_sections = get_device_sections(devices_terminals)
-    floating_terms = ft.get_floating_terminals(feeder_name, devices_sections)
+    floating_terms = ft.get_floating_terminals(feeder_name, devices_sections, graph)
 
-    bound = 'Max'
-    f_type = 'Ground'
-    analysis.short_circuit(app, bound, f_type)
+    # Run the four study cases and read the results of all section terminals
+    table = fault_results.extract(app, devices_sections, floating_terms, device_max_trs)
     # Max transformer data
-    max_tr_pg_fls = terminal_fls(device_max_trs, bound, f_type)
-    sect_tr_pg_max = sect_fl_bound(max_tr_pg_fls, bound)
+    sect_tr_pg_max = table.section_bound('Max', 'Ground', group='transformers')
+    sect_tr_phase_max = table.section_bound('Max', 'Phase', group='transformers')
     # Terminal data
-    pg_max_first_pass = terminal_fls(devices_sections, bound, f_type)
-    pg_max_all = append_floating_terms(app, pg_max_first_pass, floating_terms, bound, f_type)
-    sect_pg_max = sect_fl_bound(pg_max_all, bound)
-
-    f_type = 'Phase'
-    analysis.short_circuit(app, bound, f_type)
-    # Max transformer data
-    max_tr_p_fls = terminal_fls(device_max_trs, bound, f_type)
-    sect_tr_phase_max = sect_fl_bound(max_tr_p_fls, bound)
-    # Terminal data
-    phase_max_first_pass = terminal_fls(devices_sections, bound, f_type)
-    phase_max_all = append_floating_terms(app, phase_max_first_pass, floating_terms, bound, f_type)
-    sect_phase_max = sect_fl_bound(phase_max_all, bound)
-
-    bound = 'Min'
-    f_type = 'Ground'
-    analysis.short_circuit(app, bound, f_type)
-    pg_min_first_pass = terminal_fls(devices_sections, bound, f_type)
-    pg_min_all = append_floating_terms(app, pg_min_first_pass, floating_terms, bound, f_type)
-    sect_pg_min = sect_fl_bound(pg_min_all, bound)
-
-    f_type = 'Phase'
-    analysis.short_circuit(app, bound, f_type)
-    phase_min_first_pass = terminal_fls(devices_sections, bound, f_type)
-    phase_min_all = append_floating_terms(app, phase_min_first_pass, floating_terms, bound, f_type)
-    sect_phase_min = sect_fl_bound(phase_min_all, bound)
+    pg_max_all = table.results('Max', 'Ground')
+    sect_pg_max = table.section_bound('Max', 'Ground')
+    phase_max_all = table.results('Max', 'Phase')
+    sect_phase_max = table.section_bound('Max', 'Phase')
+    pg_min_all = table.results('Min', 'Ground')
+    sect_pg_min = table.section_bound('Min', 'Ground')
+    phase_min_all = table.results('Min', 'Phase')
+    sect_phase_min = table.section_bound('Min', 'Phase')
 
     # Load device fault level data into their respective objects
     for device, term in ds_capacity.items():
-        dev_obj = pf_to_obj(site_name_map, device, all_devices)
+        dev_obj = site_index.device(device)
         dev_obj.netdat.ds_capacity = round(term)
     for device, term in sect_pg_max.items():
-        dev_obj = pf_to_obj(site_name_map, device, all_devices)
+        dev_obj = site_index.device(device)
         (dev_obj.netdat.max_pg_fl,) = term.values()
     for device, term in sect_phase_max.items():
-        dev_obj = pf_to_obj(site_name_map, device, all_devices)
+        dev_obj = site_index.device(device)
         (dev_obj.netdat.max_3p_fl,) = term.values()
     for device, term in sect_pg_min.items():
-        dev_obj = pf_to_obj(site_name_map, device, all_devices)
+        dev_obj = site_index.device(device)
         (dev_obj.netdat.min_pg_fl,) = term.values()
     for device, term in sect_phase_min.items():
-        dev_obj = pf_to_obj(site_name_map, device, all_devices)
+        dev_obj = site_index.device(device)
         (dev_obj.netdat.min_2p_fl,) = term.values()
 
     # Update device transformer data
     for device, term in sect_tr_pg_max.items():
-        dev_obj = pf_to_obj(site_name_map, device, all_devices)
+        dev_obj = site_index.device(device)
         (load_term,) = term.keys()
         dev_obj.netdat.tr_max_name = load_term.loc_name
         (dev_obj.netdat.tr_max_pg,) = term.values()
     for device, term in sect_tr_phase_max.items():
-        dev_obj = pf_to_obj(site_name_map, device, all_devices)
+        dev_obj = site_index.device(device)
         (dev_obj.netdat.tr_max_3p,) = term.values()
     for device in all_devices:
         pf_device = [key for key in device_max_load.keys() if device.name in key][0]
@@ -109,9 +106,10 @@ def fault_study(app, all_devices: list[object], feeder: str) -> tuple[list, list
     sub_devices(all_devices, feeder, unknown_sites)
 
     # package general information
-    gen_info = [feeder_name.loc_name, get_grid_data(app)]
+    gen_info = [feeder_name.loc_name, grid_data]
     # package detailed fl data
     detailed_fls = [pg_max_all, phase_max_all, pg_min_all, phase_min_all, section_loads]
+    fault_cache.save(feeder_name.loc_name, cache_key, fault_cache.capture(gen_info, all_devices, detailed_fls))
 
     return gen_info, all_devices, detailed_fls
 
@@ -244,16 +242,35 @@ def coup_to_term(switch):
         return cubicle, device_term
 
 
-def pf_to_obj(site_name_map: dict[str:dict[pft.StaCubic: pft.ElmTerm]], device_term: pft.ElmTerm, all_devices) -> object:
-    """ Convert a PowerFactory device object to the relevant script object"""
+class SiteIndex:
+    """
+    Index between the PowerFactory cubicles and terminals of the device sites, the site names and the device objects.
+    Built once per study, so that each lookup is a dictionary access.
+    """
+
+    def __init__(self, site_name_map: dict[str:dict[pft.StaCubic: pft.ElmTerm]], all_devices: list[object]):
+        """Initialise attributes"""
+        name_device = {}
+        for device in all_devices:
+            name_device.setdefault(device.name, device)
+        self._sites = {}
+        self._term_device = {}
+        for name, inner_dict in site_name_map.items():
+            device = name_device.get(name)
+            if device is None:
+                continue
+            for cubicle, term in inner_dict.items():
+                self._sites.setdefault(device, (cubicle, term))
+                # Terminals are matched by loc_name
+                self._term_device.setdefault(term.loc_name, device)
 
-    for device_str, inner_dict in site_name_map.items():
-        inner_values = [dev.loc_name for dev in inner_dict.values()]
-        if device_term.loc_name in inner_values:
-            for device in all_devices:
-                if device.name == device_str:
-                    return device
-    return None
+    def device(self, device_term: pft.ElmTerm) -> object:
+        """Device at the terminal, or None"""
+        return self._term_device.get(device_term.loc_name)
+
+    def site(self, device: object) -> tuple[pft.StaCubic, pft.ElmTerm]:
+        """(cubicle, terminal) of the device, or None if the device was not found in PowerFactory"""
+        return self._sites.get(device)
 
 
 def get_fdr_name(app, feeder: str) -> pft.ElmFeeder:
@@ -280,12 +297,13 @@ def get_fdr_name(app, feeder: str) -> pft.ElmFeeder:
     return feeder_name
 
 
-def get_downstream_objects(app, site_name_map) \
+def get_downstream_objects(app, site_name_map, graph: topology.FeederGraph = None) \
         -> tuple[dict[pft.ElmTerm:pft.ElmTerm], dict[pft.ElmTerm:pft.ElmLod]]:
     """
 
     :param app:
     :param devices:
+    :param graph: Feeder topology graph. Devices not on the graph are searched in PowerFactory
     :return:
     """
 
@@ -298,6 +316,10 @@ def get_downstream_objects(app, site_name_map) \
         for key, value in dictionary.items():
             cubicle = key
             termination = value
+        downstream = graph.downstream(cubicle, termination) if graph else None
+        if downstream:
+            devices_terminals[termination], devices_loads[termination] = downstream
+            continue
         devices_terminals[termination] = [termination]
         devices_loads[termination] = []
         # Do a topological search of the device downstream ojects
@@ -316,37 +338,23 @@ def get_downstream_objects(app, site_name_map) \
     return devices_terminals, devices_loads
 
 
-def us_ds_device(devices_terminals: dict[pft.ElmTerm:pft.ElmTerm], site_name_map: dict, all_devices: list[object]) \
+def us_ds_device(devices_terminals: dict[pft.ElmTerm:pft.ElmTerm], site_index: SiteIndex, all_devices: list[object]) \
         -> list[object]:
     """
     Update all devices with the lists of downstream devices and upstreams devices
     :param devices_terminals:
+    :param site_index:
     :param all_devices:
     :return:
     """
 
-    for device, terms in devices_terminals.items():
-        # get a dictionary of device-terms that include the device in its list of terminals
-        d_t_dic = {}
-        for other_device, other_terms in devices_terminals.items():
-            if other_device == device:
-                continue
-            if device in other_terms:
-                d_t_dic[other_device] = other_terms
-        # from this dictionary, the device with the shortest list of terminals is the backup device
-        if d_t_dic:
-            min_val = min([len(value) for key, value in d_t_dic.items()])
-            bu_device = False
-            for other_device, other_terms in d_t_dic.items():
-                if len(other_terms) == min_val:
-                    bu_device = other_device
-            dev_obj = pf_to_obj(site_name_map, device, all_devices)
-            if bu_device:
-                dev_obj_us = pf_to_obj(site_name_map, bu_device, all_devices)
-                if bu_device not in dev_obj.netdat.upstream_devices:
-                    dev_obj.netdat.upstream_devices.append((pf_to_obj(site_name_map, bu_device, all_devices)))
-                if device not in dev_obj_us.netdat.upstream_devices:
-                    dev_obj_us.netdat.downstream_devices.append((pf_to_obj(site_name_map, device, all_devices)))
+    for device, bu_device in backup_devices(devices_terminals).items():
+        dev_obj = site_index.device(device)
+        dev_obj_us = site_index.device(bu_device)
+        if dev_obj_us not in dev_obj.netdat.upstream_devices:
+            dev_obj.netdat.upstream_devices.append(dev_obj_us)
+        if dev_obj not in dev_obj_us.netdat.downstream_devices:
+            dev_obj_us.netdat.downstream_devices.append(dev_obj)
 
     return all_devices
 
@@ -372,22 +380,72 @@ def get_device_sections(devices_terms: dict[pft.ElmTerm:list[pft.ElmTerm]]) -> d
     :return:
     """
 
-    # Sort the keys by the length of their lists in descending order
-    sorted_keys = sorted(devices_terms, key=lambda k: len(devices_terms[k]), reverse=True)
+    _, sections = section_map(devices_terms)
+    return sections
 
-    # Iterate over the sorted keys
-    for i, key1 in enumerate(sorted_keys):
-        for key2 in sorted_keys[i + 1:]:
-            set1 = set(devices_terms[key1])
-            set2 = set(devices_terms[key2])
 
-            # Find common elements except the key of the shorter list (key2)
-            common_elements = set1 & set2 - {key2}
+def section_map(devices_terms: dict[pft.ElmTerm:list[pft.ElmTerm]]) \
+        -> tuple[dict[pft.ElmTerm:pft.ElmTerm], dict[pft.ElmTerm:list[pft.ElmTerm]]]:
+    """
+    Assign each terminal to the section of its nearest upstream device, i.e. the device with the shortest list of
+    downstream terminals that includes it. A device's own terminal also stays in the section of the device before it,
+    marking the section boundary.
+    :param devices_terms: {device: [downstream terminals]}
+    :return: {terminal: device}, {device: [section terminals]}
+    """
 
-            # Remove common elements from the longer list (key1's list)
-            devices_terms[key1] = [elem for elem in devices_terms[key1] if elem not in common_elements]
+    term_device, boundary_device = _nearest_devices(devices_terms)
 
-    return devices_terms
+    device_terms = {}
+    for device, terms in devices_terms.items():
+        device_terms[device] = [
+            term for term in terms
+            if term_device[term] is device or (term_device[term] is term and boundary_device[term] is device)
+        ]
+
+    return term_device, device_terms
+
+
+def backup_devices(devices_terms: dict[pft.ElmTerm:list[pft.ElmTerm]]) -> dict[pft.ElmTerm:pft.ElmTerm]:
+    """
+    The back-up device of each device, i.e. the device with the shortest list of downstream terminals that includes
+    the device terminal.
+    :param devices_terms: {device: [device terminal, downstream terminals]}
+    :return: {device: back-up device}. Devices with no back-up device are omitted
+    """
+
+    term_device, boundary_device = _nearest_devices(devices_terms)
+    bu_devices = {}
+    for device in devices_terms:
+        # The last device that includes the device terminal, other than the device itself
+        bu_device = term_device.get(device)
+        if bu_device is device:
+            bu_device = boundary_device[device]
+        if bu_device is not None:
+            bu_devices[device] = bu_device
+    return bu_devices
+
+
+def _nearest_devices(devices_terms: dict[pft.ElmTerm:list[pft.ElmTerm]]) -> tuple[dict, dict]:
+    """
+    Devices are ranked once by the length of their terminal lists, and each terminal keeps the last device that
+    includes it and the device before that, so the assignment is a single pass over the lists.
+    :return: {terminal: last device}, {terminal: device before the last device, or None}
+    """
+
+    # Sort the keys by the length of their lists in descending order
+    sorted_keys = sorted(devices_terms, key=lambda k: len(devices_terms[k]), reverse=True)
+
+    term_device = {}
+    boundary_device = {}
+    for device in sorted_keys:
+        for term in devices_terms[device]:
+            previous = term_device.get(term)
+            if previous is not device:
+                term_device[term] = device
+                boundary_device[term] = previous
+
+    return term_device, boundary_device
 
 
 def get_section_max_tr(section_loads: dict[pft.ElmTerm:pft.ElmLod]) -> (
@@ -421,15 +479,7 @@ def terminal_fls(devices_sections: dict[pft.ElmTerm:pft.ElmTerm], bound: str, f_
 
     """
 
-    if f_type == "Ground":
-        # Ground fault (max and min bound)
-        attribute = 'm:Ikss:A'
-    elif bound == "Min":
-        # Phase fault, min bound
-        attribute = 'm:Ikss:B'
-    else:
-        # Phase fault, max bound
-        attribute = 'm:Ikss'
+    attribute = fault_results.fl_attribute(bound, f_type)
 
     results_all = {}
     for device, terminals in devices_sections.items():
@@ -0,0 +1,155 @@
+"""
+Short-circuit results of the fault level study held as one columnar table.
+Each short-circuit calculation is read once, for all terminals of interest, into a column of a NumPy array indexed by
+node id. Line end faults at floating terminals add rows of their own. Device sections are index arrays into the table,
+so the section maximum or minimum of each study case is found by array reductions.
+"""
+
+from __future__ import annotations
+from typing import Union
+import numpy as np
+from fault_level_data import analysis
+from fault_level_data.network_backend import study_cases
+
+
+def fl_attribute(bound: str, f_type: str) -> str:
+    """
+    Terminal short-circuit result attribute of the study case
+    :param bound: 'Max', 'Min'
+    :param f_type: 'Phase', 'Ground'
+    :return:
+    """
+
+    if f_type == "Ground":
+        # Ground fault (max and min bound)
+        return 'm:Ikss:A'
+    elif bound == "Min":
+        # Phase fault, min bound
+        return 'm:Ikss:B'
+    else:
+        # Phase fault, max bound
+        return 'm:Ikss'
+
+
+class FaultLevelTable:
+    """
+    Fault levels (A) of the study cases. Rows are terminals, followed by floating terminal line end faults. Columns are
+    the study_cases.
+    """
+
+    def __init__(self, terminals: list, values: np.ndarray, groups: dict[str, dict]):
+        """
+        Initialise attributes
+        :param terminals: Terminal of each row
+        :param values: Fault levels, shape (len(terminals), len(study_cases))
+        :param groups: {group name: {device: rows}}, where rows is an int array of the device's rows in section order
+        """
+        self.terminals = terminals
+        self.values = values
+        self.groups = groups
+
+    @staticmethod
+    def column(bound: str, f_type: str) -> int:
+        return study_cases.index((bound, f_type))
+
+    def results(self, bound: str, f_type: str, group: str = 'sections') -> dict[object:dict[object:float]]:
+        """
+        Fault levels of each device section
+        :param bound: 'Max', 'Min'
+        :param f_type: 'Phase', 'Ground'
+        :param group: 'sections' for the device sections and floating terminals, 'transformers' for the section max
+        transformer terminals
+        :return: {device: {terminal: fault level}}
+        """
+
+        column = self.values[:, self.column(bound, f_type)].tolist()
+        return {
+            device: {self.terminals[row]: column[row] for row in rows.tolist()}
+            for device, rows in self.groups[group].items()
+        }
+
+    def section_bound(self, bound: str, f_type: str, group: str = 'sections') \
+            -> dict[object:Union[dict[object:float], str]]:
+        """
+        Maximum (bound 'Max') or minimum (bound 'Min') non-zero fault level of each device section. Equivalent to
+        fault_data.sect_fl_bound of results(). Missing results (nan, e.g. a floating terminal line current of None) are
+        skipped as zero fault levels are.
+        :param bound: 'Max', 'Min'
+        :param f_type: 'Phase', 'Ground'
+        :param group: See results()
+        :return: {device: {terminal: fault level}}, or {device: 'no terminations'} if all fault levels are zero
+        """
+
+        column = self.values[:, self.column(bound, f_type)]
+        sect_bound = {}
+        for device, rows in self.groups[group].items():
+            fls = column[rows]
+            non_zero = np.isfinite(fls) & (fls != 0)
+            if not non_zero.any():
+                sect_bound[device] = 'no terminations'
+                continue
+            if bound == 'Min':
+                i = np.argmin(np.where(non_zero, fls, np.inf))
+            else:
+                i = np.argmax(np.where(non_zero, fls, -np.inf))
+            row = rows[i]
+            sect_bound[device] = {self.terminals[row]: column[row].item()}
+        return sect_bound
+
+
+def extract(app, devices_sections: dict, floating_terms: dict, device_max_trs: dict) -> FaultLevelTable:
+    """
+    Run the study cases and read their results into a FaultLevelTable.
+    :param app:
+    :param devices_sections: {device: [section terminals]}
+    :param floating_terms: {device: {line: floating terminal}}
+    :param device_max_trs: {device: [section max transformer terminals]}
+    :return: Table with groups 'sections' (section terminals, then floating terminals) and 'transformers'
+    """
+
+    terminals = list(dict.fromkeys(
+        term for sections in (devices_sections, device_max_trs) for terms in sections.values() for term in terms
+    ))
+    node = {term: i for i, term in enumerate(terminals)}
+    floating = []
+    for device, lines in floating_terms.items():
+        for line, term in lines.items():
+            ppro = 1 if line.bus1.cterm == term else 99
+            floating.append((device, line, term, ppro))
+
+    values = np.zeros((len(terminals) + len(floating), len(study_cases)))
+    for c, (bound, f_type) in enumerate(study_cases):
+        analysis.short_circuit(app, bound, f_type)
+        values[:len(terminals), c] = terminal_results(terminals, fl_attribute(bound, f_type))
+        for k, (_, line, _, ppro) in enumerate(floating):
+            analysis.short_circuit(app, bound, f_type, location=line, ppro=ppro)
+            line_current = analysis.get_line_current(line)
+            values[len(terminals) + k, c] = np.nan if line_current is None else line_current
+
+    groups = {
+        'sections': {device: {term: node[term] for term in terms} for device, terms in devices_sections.items()},
+        'transformers': {device: {term: node[term] for term in terms} for device, terms in device_max_trs.items()},
+    }
+    # A floating terminal replaces any earlier row of the same terminal in the device section
+    for k, (device, _, term, _) in enumerate(floating):
+        groups['sections'].setdefault(device, {})[term] = len(terminals) + k
+    row_terminals = terminals + [term for _, _, term, _ in floating]
+    groups = {
+        name: {device: np.fromiter(rows.values(), dtype=np.int64, count=len(rows)) for device, rows in group.items()}
+        for name, group in groups.items()
+    }
+    return FaultLevelTable(row_terminals, values, groups)
+
+
+def terminal_results(terminals: list, attribute: str) -> np.ndarray:
+    """
+    Read a short-circuit result of all terminals in one pass.
+    :param terminals:
+    :param attribute: Result attribute (kA)
+    :return: Fault levels (A). 0 where the terminal has no result
+    """
+
+    return np.array(
+        [round(term.GetAttribute(attribute), 3) * 1000 if term.HasAttribute(attribute) else 0 for term in terminals],
+        dtype=float
+    )
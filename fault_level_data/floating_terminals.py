@@ -37,14 +37,20 @@ def find_end_points(feeder: object) -> list[object]:
     return floating_lines
 
 
-def get_floating_terminals(feeder: object, devices_section: dict[object:object]) -> dict[object:dict[object:object]]:
+def get_floating_terminals(feeder: object, devices_section: dict[object:object], graph=None) \
+        -> dict[object:dict[object:object]]:
     """
     Outputs all floating terminal objects with their associated line objects for all devices
     :param feeder:
     :param devices_section:
+    :param graph: Feeder topology graph (topology.FeederGraph). If it holds all the feeder lines, the floating
+    terminals are found from the graph in one pass over the lines
     :return:
     """
 
+    if graph is not None and all(graph.node(line) is not None for line in feeder.GetObjs('ElmLne')):
+        return graph.floating_terminals(devices_section)
+
     floating_terms= {}
     floating_lines = find_end_points(feeder)
     for device, terms in devices_section.items():
@@ -0,0 +1,316 @@
+"""
+Network backends for the fault level study.
+The fault level study talks to the network model through the PowerFactory application object (app) and the data
+objects it returns. Any object providing the same calls can stand in for it. NetworkBackend defines the calls used by
+fault_data, analysis and floating_terminals, in addition to those used on the returned data objects
+(loc_name, GetClassName, HasAttribute, GetAttribute, GetAll, GetObjs, GetConnectedCubicles, GetConnectedElements and
+plain attribute access).
+
+ReplayNetwork is a file-backed backend. On the PowerFactory host, record() captures a feeder's topology and its
+short-circuit results to a JSON file. ReplayNetwork.load() replays the file anywhere, without PowerFactory, and is passed
+to the study in place of app.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import Union
+from fault_level_data.fault_cache import electrical_parameters
+
+# Short-circuit result attributes of terminals and lines read by the fault level study
+terminal_results = ('m:Ikss:A', 'm:Ikss:B', 'm:Ikss')
+line_results = tuple(f'm:Ikss:{bus}:{phase}' for bus in ('bus1', 'bus2') for phase in ('A', 'B', 'C'))
+
+# Short-circuit studies run by the fault level study, and the fault positions (ppro) of line end faults
+study_cases = (('Max', 'Ground'), ('Max', 'Phase'), ('Min', 'Ground'), ('Min', 'Phase'))
+line_fault_positions = (1, 99)
+
+# Attributes recorded for each class of data object, in addition to outserv and the fault_cache electrical_parameters.
+# Object valued attributes are recorded as references.
+recorded_attributes = {
+    'ElmCoup': ('on_off', 'outserv', 'bus1', 'bus2'),
+    'StaSwitch': ('on_off', 'fold_id'),
+    'StaCubic': ('cterm', 'obj_id'),
+    'ElmTerm': ('iUsage',),
+    'ElmLod': ('Strat', 'bus1', 'outserv'),
+    'ElmLne': ('bus1', 'bus2', 'outserv'),
+    'ElmFeeder': ('obj_id',),
+    'ElmXnet': ('outserv', 'ikss', 'rntxn', 'z2tz1', 'x0tx1', 'r0tx0',
+                'ikssmin', 'rntxnmin', 'z2tz1min', 'x0tx1min', 'r0tx0min'),
+}
+
+
+class NetworkBackend(ABC):
+    """
+    The application calls made by the fault level study. The PowerFactory application object provides these natively.
+    """
+
+    @abstractmethod
+    def PrintPlain(self, message: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def GetCalcRelevantObjects(self, pattern: str) -> list:
+        raise NotImplementedError
+
+    @abstractmethod
+    def GetProjectFolder(self, name: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def short_circuit(self, bound: str, f_type: str, location: Union[object, None] = None, ppro: int = 0):
+        """
+        Perform a short-circuit calculation (see analysis.short_circuit). Results are then read from the data objects
+        with GetAttribute.
+        :param bound: 'Max', 'Min'
+        :param f_type: 'Phase', 'Ground'
+        :param location: Line at which the fault is applied. None if all busbars
+        :param ppro: fault distance from terminal
+        :return:
+        """
+        raise NotImplementedError
+
+
+class ReplayNetwork(NetworkBackend):
+    """Network backend that replays a recording made by record()"""
+
+    def __init__(self, recording: dict):
+        """Initialise attributes"""
+        self._results = recording['results']
+        self._active_results = {}
+        self._objects = {
+            object_id: ReplayObject(self, object_id, data) for object_id, data in recording['objects'].items()
+        }
+        self._calc_relevant = recording['calc_relevant']
+        self._netmod = _ReplayFolder([self.obj(object_id) for object_id in recording['feeders']])
+
+    @classmethod
+    def load(cls, path) -> 'ReplayNetwork':
+        with open(path, 'r') as file:
+            return cls(json.load(file))
+
+    def obj(self, object_id: Union[str, None]):
+        if object_id is None:
+            return None
+        return self._objects[object_id]
+
+    def PrintPlain(self, message: str):
+        print(message)
+
+    def GetCalcRelevantObjects(self, pattern: str) -> list:
+        return [self.obj(object_id) for object_id in self._calc_relevant.get(pattern, [])]
+
+    def GetProjectFolder(self, name: str):
+        if name != 'netmod':
+            raise KeyError(f"Project folder {name} is not recorded")
+        return self._netmod
+
+    def short_circuit(self, bound: str, f_type: str, location: Union[object, None] = None, ppro: int = 0):
+        if location is None:
+            key = _case_key(bound, f_type)
+        else:
+            key = _case_key(bound, f_type, location.object_id, ppro)
+        if key not in self._results:
+            raise KeyError(f"Short-circuit results {key} are not recorded")
+        self._active_results = self._results[key]
+        return 0
+
+    def result(self, object_id: str, attribute: str):
+        return self._active_results.get(object_id, {}).get(attribute)
+
+
+class ReplayObject:
+    """Recorded PowerFactory data object"""
+
+    def __init__(self, network: ReplayNetwork, object_id: str, data: dict):
+        self._network = network
+        self.object_id = object_id
+        self.loc_name: str = data['loc_name']
+        self._class_name: str = data['class']
+        self._attributes: dict = data.get('attributes', {})
+        self._references: dict = data.get('references', {})
+        self._calls: dict = data.get('calls', {})
+
+    def __getattr__(self, name):
+        # Only called for attributes not set in __init__
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name in self._references:
+            return self._network.obj(self._references[name])
+        if name in self._attributes:
+            return self._attributes[name]
+        raise AttributeError(f"{self._class_name} {self.loc_name} attribute {name} is not recorded")
+
+    def __repr__(self):
+        return f"{self.loc_name}.{self._class_name}"
+
+    def GetClassName(self) -> str:
+        return self._class_name
+
+    def HasAttribute(self, name: str) -> bool:
+        if name.startswith('m:'):
+            return self._network.result(self.object_id, name) is not None
+        return name in self._attributes or name in self._references
+
+    def GetAttribute(self, name: str):
+        if name.startswith('m:'):
+            return self._network.result(self.object_id, name)
+        return getattr(self, name)
+
+    def _call(self, *key) -> list:
+        call = _call_key(*key)
+        if call not in self._calls:
+            raise KeyError(f"{self._class_name} {self.loc_name} call {call} is not recorded")
+        return [self._network.obj(object_id) for object_id in self._calls[call]]
+
+    def GetAll(self, *args) -> list:
+        return self._call('GetAll', *args)
+
+    def GetObjs(self, class_name: str) -> list:
+        return self._call('GetObjs', class_name)
+
+    def GetConnectedCubicles(self) -> list:
+        return self._call('GetConnectedCubicles')
+
+    def GetConnectedElements(self, *args) -> list:
+        return self._call('GetConnectedElements', *args)
+
+
+class _ReplayFolder:
+    """Recorded network model folder"""
+
+    def __init__(self, feeders: list):
+        self._feeders = feeders
+
+    def GetContents(self, pattern: str, recursive: bool = False) -> list:
+        if pattern != '*.ElmFeeder':
+            raise KeyError(f"Folder contents {pattern} are not recorded")
+        return list(self._feeders)
+
+
+def record(app, feeder: str, site_names: list[str], path):
+    """
+    Record the topology and short-circuit results of a feeder from PowerFactory for ReplayNetwork.
+    Only the data the fault level study reads for the given feeder and site names is recorded.
+    :param app: PowerFactory application
+    :param feeder: Feeder name as per the input file
+    :param site_names: Device site names as per the input file
+    :param path: Recording file
+    :return:
+    """
+
+    # Imported here, as fault_data requires the PowerFactory environment
+    from fault_level_data import analysis, fault_data, floating_terminals as ft
+
+    recorder = _Recorder()
+
+    site_name_map, unknown_sites = fault_data.site_name_convert(app, site_names)
+    switches = app.GetCalcRelevantObjects('*.ElmCoup') + app.GetCalcRelevantObjects('*.StaSwitch')
+    site_switches = [switch for switch in switches if any(name in switch.loc_name for name in site_names)]
+    calc_relevant = {
+        '*.ElmCoup': [switch for switch in site_switches if switch.GetClassName() == 'ElmCoup'],
+        '*.StaSwitch': [switch for switch in site_switches if switch.GetClassName() == 'StaSwitch'],
+        '*.ElmXnet': app.GetCalcRelevantObjects('*.ElmXnet'),
+    }
+
+    feeder_obj = fault_data.get_fdr_name(app, feeder)
+    feeder_objects = feeder_obj.GetAll()
+    recorder.add_call(feeder_obj, ('GetAll',), feeder_objects)
+    # Element connectivity used to build the feeder topology graph
+    for obj in feeder_objects:
+        if obj.GetClassName() != 'ElmTerm':
+            recorder.add_call(obj, ('GetConnectedElements', 1, 1, 0), obj.GetConnectedElements(1, 1, 0))
+    feeder_lines = feeder_obj.GetObjs('ElmLne')
+    recorder.add_call(feeder_obj, ('GetObjs', 'ElmLne'), feeder_lines)
+    # Topological searches from each device and from the feeder
+    cubicles = [feeder_obj.obj_id] + [cubicle for site in site_name_map.values() for cubicle in site]
+    for cubicle in cubicles:
+        for direction in (1, 0):
+            recorder.add_call(cubicle, ('GetAll', direction, 0), cubicle.GetAll(direction, 0))
+    # Line connectivity used to find floating terminals
+    for line in feeder_lines:
+        recorder.add_call(line, ('GetConnectedElements',), line.GetConnectedElements())
+        recorder.add_call(line, ('GetConnectedElements', 1, 1, 0), line.GetConnectedElements(1, 1, 0))
+        for cubicle in (line.bus1, line.bus2):
+            if cubicle and cubicle.HasAttribute('cterm'):
+                recorder.add_call(cubicle.cterm, ('GetConnectedCubicles',), cubicle.cterm.GetConnectedCubicles())
+    for objects in calc_relevant.values():
+        for obj in objects:
+            recorder.add(obj)
+
+    floating_lines = ft.find_end_points(feeder_obj)
+    for line in floating_lines:
+        recorder.add(line)
+
+    # Short-circuit results
+    terminals = [obj for obj in recorder.recorded() if obj.GetClassName() == 'ElmTerm']
+    results = {}
+    for bound, f_type in study_cases:
+        analysis.short_circuit(app, bound, f_type)
+        results[_case_key(bound, f_type)] = {
+            recorder.add(term): {attribute: term.GetAttribute(attribute)
+                                 for attribute in terminal_results if term.HasAttribute(attribute)}
+            for term in terminals
+        }
+        for line in floating_lines:
+            for ppro in line_fault_positions:
+                analysis.short_circuit(app, bound, f_type, location=line, ppro=ppro)
+                results[_case_key(bound, f_type, recorder.add(line), ppro)] = {
+                    recorder.add(line): {attribute: line.GetAttribute(attribute)
+                                         for attribute in line_results if line.HasAttribute(attribute)}
+                }
+
+    recording = {
+        'objects': recorder.objects,
+        'calc_relevant': {
+            pattern: [recorder.add(obj) for obj in objects] for pattern, objects in calc_relevant.items()
+        },
+        'feeders': [recorder.add(feeder_obj)],
+        'results': results,
+    }
+    with open(path, 'w') as file:
+        json.dump(recording, file)
+
+
+class _Recorder:
+    """Serialises PowerFactory data objects, and the objects they reference, for ReplayNetwork"""
+
+    def __init__(self):
+        self.objects: dict = {}
+        self._ids: dict = {}
+        self._live: dict = {}
+
+    def add(self, obj) -> str:
+        """Record obj if not already recorded. Returns its object id."""
+        if obj in self._ids:
+            return self._ids[obj]
+        object_id = str(len(self._ids))
+        self._ids[obj] = object_id
+        self._live[object_id] = obj
+        class_name = obj.GetClassName()
+        data = {'class': class_name, 'loc_name': obj.loc_name, 'attributes': {}, 'references': {}, 'calls': {}}
+        self.objects[object_id] = data
+        attributes = recorded_attributes.get(class_name, ()) + ('outserv',) + electrical_parameters.get(class_name, ())
+        for attribute in dict.fromkeys(attributes):
+            if not obj.HasAttribute(attribute):
+                continue
+            value = obj.GetAttribute(attribute)
+            if value is None or isinstance(value, (int, float, str)):
+                data['attributes'][attribute] = value
+            else:
+                data['references'][attribute] = self.add(value)
+        return object_id
+
+    def add_call(self, obj, key: tuple, objects: list):
+        object_id = self.add(obj)
+        self.objects[object_id]['calls'][_call_key(*key)] = [self.add(item) for item in objects]
+
+    def recorded(self) -> list:
+        return list(self._live.values())
+
+
+def _call_key(*key) -> str:
+    return '|'.join(str(item) for item in key)
+
+
+def _case_key(bound: str, f_type: str, *location) -> str:
+    return '|'.join(str(item) for item in (bound, f_type) + location)
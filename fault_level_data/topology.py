@@ -0,0 +1,287 @@
+"""
+Feeder topology graph.
+The feeder is extracted from PowerFactory once into an adjacency graph of integer node ids, held as CSR arrays
+(indptr, indices) and rooted at the feeder terminal. The downstream terminals and loads of a device are then a slice of
+the graph preorder, rather than a PowerFactory topological search per device.
+The arrays are cached on disk, keyed by a stamp of the feeder model state, and reused while the feeder is unchanged.
+"""
+
+from __future__ import annotations
+import hashlib
+import pickle
+from typing import Union
+import numpy as np
+from input_files.data_inputs import cache_dir
+
+# Graphs built during this session: {feeder name: FeederGraph}
+_graphs: dict = {}
+
+
+class FeederGraph:
+    """Radial feeder topology. Nodes are the feeder objects, edges join each element to its connected terminals."""
+
+    def __init__(self, objects: list, indptr: np.ndarray, indices: np.ndarray, line_ends: np.ndarray, root: int,
+                 stamp: str):
+        """
+        Initialise attributes
+        :param objects: Feeder objects. The node id of an object is its position in the list
+        :param indptr: CSR row pointers, length len(objects) + 1
+        :param indices: CSR column indices
+        :param line_ends: Rows of (line, bus1 terminal, bus2 terminal) node ids, regardless of switch states. -1 if the
+        line end has no terminal on the feeder
+        :param root: Node id of the feeder terminal
+        :param stamp: Model state stamp the graph was built for
+        """
+        self.objects = objects
+        self.indptr = indptr
+        self.indices = indices
+        self.line_ends = line_ends
+        self.root = root
+        self.stamp = stamp
+        self._ids = {obj: i for i, obj in enumerate(objects)}
+        classes = [obj.GetClassName() for obj in objects]
+        self._terminal = np.array([name == 'ElmTerm' for name in classes], dtype=bool)
+        self._load = np.array([name == 'ElmLod' for name in classes], dtype=bool)
+        self.parent, self.order, self._first, self._end = _rooted_tree(indptr, indices, root)
+
+    def node(self, obj) -> Union[int, None]:
+        return self._ids.get(obj)
+
+    def subtree(self, node: int) -> np.ndarray:
+        """Node ids of node and all nodes downstream of it, in preorder"""
+        return self.order[self._first[node]:self._end[node]]
+
+    def downstream(self, cubicle, term) -> Union[tuple[list, list], None]:
+        """
+        Terminals and loads downstream of a device, equivalent to the device cubicle topological search
+        (see fault_data.get_downstream_objects).
+        :param cubicle: Device cubicle
+        :param term: Device terminal
+        :return: ([device terminal, downstream terminals], [downstream loads]), or None if the device is not on the
+        graph
+        """
+
+        t = self.node(term)
+        e = self.node(cubicle.obj_id)
+        if t is None or e is None:
+            return None
+        if self.parent[e] == t:
+            # The cubicle element leads away from the feeder terminal
+            nodes = self.subtree(e)
+        elif self.parent[t] == e:
+            # The cubicle element leads towards the feeder terminal. Search the other way
+            nodes = self.subtree(t)[1:]
+        else:
+            return None
+        terminals = [term] + [self.objects[i] for i in nodes[self._terminal[nodes]]]
+        loads = [self.objects[i] for i in nodes[self._load[nodes]]]
+        return terminals, loads
+
+    def floating_terminals(self, devices_section: dict[object:list]) -> dict[object:dict[object:object]]:
+        """
+        Floating terminals of each device section, equivalent to floating_terminals.get_floating_terminals. A line is
+        floating if it is connected through closed switches at one end only, that end is in the device section and its
+        other end is not. As in find_end_points, only lines sharing a terminal with another line are considered.
+        :param devices_section: {device: [section terminals]}
+        :return: {device: {line: floating terminal}}
+        """
+
+        floating_terms = {device: {} for device in devices_section}
+        section_devices = {}
+        for device, terms in devices_section.items():
+            for term in terms:
+                section_devices.setdefault(term, {})[device] = None
+        section_sets = {device: set(terms) for device, terms in devices_section.items()}
+
+        # Line cubicles at each terminal
+        ends = self.line_ends[:, 1:]
+        lines_at = np.bincount(ends[ends >= 0], minlength=len(self.objects))
+        for line, bus1, bus2 in self.line_ends.tolist():
+            # Other line cubicles at each end of the line
+            other_1 = lines_at[bus1] - 1 if bus1 >= 0 else 0
+            other_2 = lines_at[bus2] - 1 if bus2 >= 0 else 0
+            same_term = bus1 == bus2
+            if not (other_1 == 1 or other_2 == 1
+                    or (other_1 > 1 and not same_term) or (other_2 > 1 and not same_term)):
+                continue
+            connected = self.indices[self.indptr[line]:self.indptr[line + 1]]
+            if len(connected) != 1:
+                continue
+            if connected[0] == bus2:
+                connected_term, floating_term = bus2, bus1
+            elif connected[0] == bus1:
+                connected_term, floating_term = bus1, bus2
+            else:
+                continue
+            if floating_term < 0:
+                continue
+            connected_term = self.objects[connected_term]
+            floating_term = self.objects[floating_term]
+            for device in section_devices.get(connected_term, ()):
+                if floating_term not in section_sets[device]:
+                    floating_terms[device][self.objects[line]] = floating_term
+        return floating_terms
+
+
+def feeder_graph(app, feeder: object) -> Union[FeederGraph, None]:
+    """
+    Topology graph of the feeder. The graph is built from PowerFactory only if the feeder model state has changed
+    since it was last built, in this session or (via the disk cache) in an earlier one.
+    :param app:
+    :param feeder: ElmFeeder
+    :return: None if the feeder terminal could not be found
+    """
+
+    objects = feeder.GetAll()
+    stamp = model_stamp(app, objects)
+    cached = _graphs.get(feeder.loc_name)
+    if cached is not None and cached.stamp == stamp:
+        return cached
+
+    try:
+        root = objects.index(feeder.obj_id.cterm)
+    except (AttributeError, ValueError):
+        return None
+
+    path = cache_path(feeder.loc_name)
+    arrays = None
+    try:
+        with open(path, 'rb') as file:
+            cached_arrays = pickle.load(file)
+        if cached_arrays['stamp'] == stamp:
+            arrays = cached_arrays['indptr'], cached_arrays['indices'], cached_arrays['line_ends']
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError, TypeError):
+        pass
+
+    if arrays is None:
+        arrays = _adjacency(objects)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'wb') as file:
+                pickle.dump(
+                    {'stamp': stamp, 'indptr': arrays[0], 'indices': arrays[1], 'line_ends': arrays[2]}, file
+                )
+        except OSError:
+            # The cache is an optimisation only. Carry on if the cache directory cannot be written.
+            pass
+
+    graph = FeederGraph(objects, *arrays, root, stamp)
+    _graphs[feeder.loc_name] = graph
+    return graph
+
+
+def clear_graphs():
+    """Discard the graphs held in memory. Disk cache files are left in place."""
+    _graphs.clear()
+
+
+def cache_path(feeder_name: str):
+    return cache_dir() / f"{feeder_name} topology.cache.pkl"
+
+
+def model_stamp(app, objects: list) -> str:
+    """
+    Stamp of the feeder model state: its objects, in order, with their service and switch states. The stamp changes
+    if an object is added, removed or renamed, or a switch is operated.
+    :param app:
+    :param objects: Feeder objects
+    :return:
+    """
+
+    digest = hashlib.sha256()
+    for obj in objects:
+        digest.update(f"{obj.GetClassName()}|{obj.loc_name}|{_state(obj)}\n".encode())
+    # Cubicle switches are not feeder objects, but set the feeder connectivity
+    terminals = {obj for obj in objects if obj.GetClassName() == 'ElmTerm'}
+    for switch in app.GetCalcRelevantObjects('*.StaSwitch'):
+        cubicle = switch.fold_id
+        if cubicle is not None and cubicle.HasAttribute('cterm') and cubicle.cterm in terminals:
+            digest.update(f"{switch.loc_name}|{cubicle.cterm.loc_name}|{_state(switch)}\n".encode())
+    return digest.hexdigest()
+
+
+def _state(obj) -> str:
+    outserv = obj.GetAttribute('outserv') if obj.HasAttribute('outserv') else ''
+    on_off = obj.GetAttribute('on_off') if obj.HasAttribute('on_off') else ''
+    return f"{outserv}|{on_off}"
+
+
+def _connected(obj) -> bool:
+    if obj.HasAttribute('outserv') and obj.GetAttribute('outserv') == 1:
+        return False
+    if obj.GetClassName() == 'ElmCoup' and obj.HasAttribute('on_off') and obj.GetAttribute('on_off') == 0:
+        return False
+    return True
+
+
+def _adjacency(objects: list) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    CSR adjacency arrays of the feeder objects. Each element is joined to the terminals it is connected to through
+    closed switches.
+    :param objects:
+    :return: indptr, indices, line_ends (see FeederGraph)
+    """
+
+    ids = {obj: i for i, obj in enumerate(objects)}
+    rows = []
+    cols = []
+    line_ends = []
+    for i, obj in enumerate(objects):
+        class_name = obj.GetClassName()
+        if class_name == 'ElmLne':
+            line_ends.append([i, _bus_term(ids, obj, 'bus1'), _bus_term(ids, obj, 'bus2')])
+        if class_name == 'ElmTerm' or not _connected(obj):
+            continue
+        for term in obj.GetConnectedElements(1, 1, 0):
+            j = ids.get(term)
+            if j is not None:
+                rows += [i, j]
+                cols += [j, i]
+
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    by_row = np.argsort(rows, kind='stable')
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=len(objects)))))
+    line_ends = np.asarray(line_ends, dtype=np.int64).reshape(-1, 3)
+    return indptr, cols[by_row], line_ends
+
+
+def _bus_term(ids: dict, line, bus: str) -> int:
+    """Node id of the terminal at a line end, or -1"""
+    cubicle = line.GetAttribute(bus) if line.HasAttribute(bus) else None
+    if not cubicle or not cubicle.HasAttribute('cterm'):
+        return -1
+    return ids.get(cubicle.cterm, -1)
+
+
+def _rooted_tree(indptr: np.ndarray, indices: np.ndarray, root: int) \
+        -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Depth first search of the graph from root.
+    :return: parent of each node (-1 for the root and unreached nodes), preorder of the reached nodes, and the
+    preorder slice [first, end) of each node's subtree
+    """
+
+    n = len(indptr) - 1
+    parent = np.full(n, -1, dtype=np.int64)
+    seen = np.zeros(n, dtype=bool)
+    order = []
+    stack = [root]
+    seen[root] = True
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        for other in indices[indptr[node]:indptr[node + 1]].tolist():
+            if not seen[other]:
+                seen[other] = True
+                parent[other] = node
+                stack.append(other)
+
+    order = np.asarray(order, dtype=np.int64)
+    first = np.zeros(n, dtype=np.int64)
+    first[order] = np.arange(len(order))
+    size = np.ones(n, dtype=np.int64)
+    for node in order[:0:-1].tolist():
+        size[parent[node]] += size[node]
+    end = first + size
+    return parent, order, first, end
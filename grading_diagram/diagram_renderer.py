@@ -0,0 +1,319 @@
+"""
+Grading diagrams drawn without Excel.
+Log-log time-current diagrams of the OC or EF element are built from the relay settings and fuse curves, reading the
+curves from the shared curve cache. Each diagram shows the device curves, the max, min and max transformer fault level
+of each relay, and the grading margin of each downstream/upstream device pair. Diagrams are written as SVG directly, or
+as PNG through matplotlib (an optional dependency), and many feeders can be rendered in parallel in a process pool.
+"""
+
+from __future__ import annotations
+import math
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from xml.sax.saxutils import escape
+import numpy as np
+from relay_coordination import curve_cache as cc
+from relay_coordination import trip_time as tt
+
+# Time axis limits (s). Trip times outside the limits are not drawn.
+time_limits = (0.01, 100)
+
+colours = ['#1f77b4', '#2ca02c', '#d62728', '#17becf', '#9467bd', '#bcbd22', '#000000', '#ff7f0e', '#8c564b',
+           '#e377c2']
+
+
+class Diagram:
+    """Plain data of a grading diagram, which can be pickled to a worker process"""
+
+    def __init__(self, title: str, f_type: str, curves: list[tuple], markers: list[tuple], margins: list[tuple]):
+        """
+        Initialise attributes
+        :param title: Diagram title, also used as the file name
+        :param f_type: 'EF', 'OC'
+        :param curves: [(device name, fault levels, trip times, colour)]
+        :param markers: [(label, fault level, colour)]
+        :param margins: [(downstream device name, upstream device name, fault level, downstream time, upstream time)],
+        at the fault level of the minimum grading margin of each device pair
+        """
+        self.title = title
+        self.f_type = f_type
+        self.curves = curves
+        self.markers = markers
+        self.margins = margins
+
+    def current_limits(self) -> tuple[float, float]:
+        """Current axis limits (A), whole decades spanning all curves and markers"""
+        currents = [fault_levels[[0, -1]] for _, fault_levels, _, _ in self.curves if len(fault_levels)]
+        currents.append(np.array([fault_level for _, fault_level, _ in self.markers], dtype=float))
+        currents = np.concatenate(currents) if currents else np.zeros(0)
+        currents = currents[np.isfinite(currents) & (currents > 0)]
+        if not currents.size:
+            return 10, 10000
+        return 10 ** math.floor(math.log10(currents.min())), 10 ** math.ceil(math.log10(currents.max()) + 1e-9)
+
+
+def build_diagram(title: str, all_devices: list, f_type: str) -> Diagram:
+    """
+    Diagram of the relays and line fuses of a feeder.
+    :param title:
+    :param all_devices: Devices with settings. Device links may be objects or names (as left by relay_coordination)
+    :param f_type: 'EF', 'OC'
+    :return:
+    """
+
+    devices = [device for device in all_devices if _has_fault_levels(device, f_type)]
+    by_name = {device.name: device for device in devices}
+    colour = {device.name: colours[i % len(colours)] for i, device in enumerate(devices)}
+
+    curves = []
+    markers = []
+    for device in devices:
+        if hasattr(device, 'cb_interrupt'):
+            fault_levels, trip_times = cc.relay_curve(device, f_type)
+        elif device.relset.rating in _fuse_names():
+            min_fl, max_fl = cc.fault_level_range(device, f_type)
+            fault_levels = cc.samples(min_fl, max_fl, tt.device_breakpoints(device, f_type))
+            trip_times = cc.trip_times(device, f_type, fault_levels)
+        else:
+            continue
+        curves.append((device.name, fault_levels, trip_times, colour[device.name]))
+        if hasattr(device, 'cb_interrupt'):
+            min_fl, max_fl = cc.fault_level_range(device, f_type)
+            tr_max = device.netdat.tr_max_pg if f_type == 'EF' else device.netdat.tr_max_3p
+            markers += [(f"{device.name} max", max_fl, colour[device.name]),
+                        (f"{device.name} min", min_fl, colour[device.name])]
+            if tr_max:
+                markers.append((f"{device.name} tr max", tr_max, colour[device.name]))
+
+    # Each relay with its downstream and upstream devices
+    pairs = {}
+    for device in devices:
+        if not hasattr(device, 'cb_interrupt'):
+            continue
+        for ds_device in _linked(device.netdat.downstream_devices, by_name):
+            pairs[(ds_device.name, device.name)] = (ds_device, device)
+        for us_device in _linked(device.netdat.upstream_devices, by_name):
+            if hasattr(us_device, 'cb_interrupt'):
+                pairs[(device.name, us_device.name)] = (device, us_device)
+    margins = []
+    for ds_device, us_device in pairs.values():
+        fault_levels, ds_times, us_times = cc.grading_curves(ds_device, us_device, f_type)
+        if not fault_levels.size:
+            continue
+        worst = int(np.argmin(us_times - ds_times))
+        margins.append((ds_device.name, us_device.name, float(fault_levels[worst]), float(ds_times[worst]),
+                        float(us_times[worst])))
+
+    return Diagram(title, f_type, curves, markers, margins)
+
+
+def _fuse_names() -> set:
+    """Fuses with grading sheet curves. Empty if the fuse data file cannot be read"""
+    try:
+        return set(tt.grade_sheet_curves())
+    except OSError:
+        return set()
+
+
+def _has_fault_levels(device, f_type: str) -> bool:
+    if not (hasattr(device, 'cb_interrupt') or hasattr(device.relset, 'rating')):
+        return False
+    min_fl, max_fl = cc.fault_level_range(device, f_type)
+    return isinstance(min_fl, (int, float)) and isinstance(max_fl, (int, float))
+
+
+def _linked(links, by_name: dict) -> list:
+    if not links:
+        return []
+    if isinstance(links, str):
+        links = links.split(', ')
+    names = [link if isinstance(link, str) else link.name for link in links]
+    return [by_name[name] for name in names if name in by_name]
+
+
+def render_svg(diagram: Diagram, width: int = 900, height: int = 650) -> str:
+    """
+    :param diagram:
+    :param width: Image width (px)
+    :param height: Image height (px)
+    :return: SVG document
+    """
+
+    left, right, top, bottom = 70, 180, 40, 60
+    i_min, i_max = diagram.current_limits()
+    t_min, t_max = time_limits
+    plot_width = width - left - right
+    plot_height = height - top - bottom
+
+    def x(current):
+        return left + plot_width * (np.log10(current) - math.log10(i_min)) / (math.log10(i_max) - math.log10(i_min))
+
+    def y(time):
+        return top + plot_height * (math.log10(t_max) - np.log10(time)) / (math.log10(t_max) - math.log10(t_min))
+
+    svg = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="Arial" font-size="11">',
+        f'<rect width="{width}" height="{height}" fill="white"/>',
+        f'<text x="{left}" y="{top - 15}" font-size="15">{escape(diagram.title)}</text>',
+    ]
+
+    # Grid lines at 1, 2 and 5 of each decade
+    for to_x, low, high in ((True, i_min, i_max), (False, t_min, t_max)):
+        for decade in range(int(round(math.log10(low))), int(round(math.log10(high))) + 1):
+            for step in (1, 2, 5):
+                value = step * 10 ** decade
+                if not low <= value <= high:
+                    continue
+                stroke = '#bbbbbb' if step == 1 else '#e5e5e5'
+                if to_x:
+                    px = x(value)
+                    svg.append(f'<line x1="{px:.1f}" y1="{top}" x2="{px:.1f}" y2="{top + plot_height}" '
+                               f'stroke="{stroke}"/>')
+                    if step == 1:
+                        svg.append(f'<text x="{px:.1f}" y="{top + plot_height + 15}" '
+                                   f'text-anchor="middle">{_label(value)}</text>')
+                else:
+                    py = y(value)
+                    svg.append(f'<line x1="{left}" y1="{py:.1f}" x2="{left + plot_width}" y2="{py:.1f}" '
+                               f'stroke="{stroke}"/>')
+                    if step == 1:
+                        svg.append(f'<text x="{left - 6}" y="{py + 4:.1f}" text-anchor="end">{_label(value)}</text>')
+    svg += [
+        f'<rect x="{left}" y="{top}" width="{plot_width}" height="{plot_height}" fill="none" stroke="black"/>',
+        f'<text x="{left + plot_width / 2:.1f}" y="{height - 20}" text-anchor="middle">'
+        f'{diagram.f_type} fault current (A)</text>',
+        f'<text x="18" y="{top + plot_height / 2:.1f}" text-anchor="middle" '
+        f'transform="rotate(-90 18 {top + plot_height / 2:.1f})">Time (s)</text>',
+    ]
+
+    # Fault level markers
+    for label, fault_level, colour in diagram.markers:
+        if not i_min <= fault_level <= i_max:
+            continue
+        px = x(fault_level)
+        svg.append(f'<line x1="{px:.1f}" y1="{top}" x2="{px:.1f}" y2="{top + plot_height}" stroke="{colour}" '
+                   f'stroke-dasharray="4 3" stroke-width="0.8"/>')
+        svg.append(f'<text x="{px + 3:.1f}" y="{top + plot_height - 4}" fill="{colour}" font-size="9" '
+                   f'transform="rotate(-90 {px + 3:.1f} {top + plot_height - 4})">{escape(label)}</text>')
+
+    # Device curves
+    for n, (name, fault_levels, trip_times, colour) in enumerate(diagram.curves):
+        for segment in _segments(fault_levels, trip_times, (i_min, i_max)):
+            points = ' '.join(f'{px:.1f},{py:.1f}' for px, py in zip(x(segment[0]), y(segment[1])))
+            svg.append(f'<polyline points="{points}" fill="none" stroke="{colour}" stroke-width="1.8"/>')
+        legend_y = top + 10 + 16 * n
+        svg.append(f'<line x1="{left + plot_width + 12}" y1="{legend_y}" x2="{left + plot_width + 32}" '
+                   f'y2="{legend_y}" stroke="{colour}" stroke-width="2"/>')
+        svg.append(f'<text x="{left + plot_width + 37}" y="{legend_y + 4}">{escape(name)}</text>')
+
+    # Grading margins
+    for ds_name, us_name, fault_level, ds_time, us_time in diagram.margins:
+        if not (i_min <= fault_level <= i_max and t_min <= ds_time <= t_max and t_min <= us_time <= t_max):
+            continue
+        px, y1, y2 = x(fault_level), y(ds_time), y(us_time)
+        svg.append(f'<line x1="{px:.1f}" y1="{y1:.1f}" x2="{px:.1f}" y2="{y2:.1f}" stroke="black" '
+                   f'stroke-width="1"/>')
+        for py in (y1, y2):
+            svg.append(f'<line x1="{px - 3:.1f}" y1="{py:.1f}" x2="{px + 3:.1f}" y2="{py:.1f}" stroke="black"/>')
+        svg.append(f'<text x="{px + 5:.1f}" y="{(y1 + y2) / 2 + 4:.1f}" font-size="10">'
+                   f'{escape(_margin_label(ds_name, us_name, us_time - ds_time))}</text>')
+
+    svg.append('</svg>')
+    return '\n'.join(svg)
+
+
+def render_png(diagram: Diagram, path, dpi: int = 120):
+    """
+    Draw the diagram to a PNG file. Requires matplotlib.
+    :param diagram:
+    :param path:
+    :param dpi:
+    :return:
+    """
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    i_min, i_max = diagram.current_limits()
+    figure, axes = plt.subplots(figsize=(9, 6.5))
+    for label, fault_level, colour in diagram.markers:
+        axes.axvline(fault_level, color=colour, linestyle='--', linewidth=0.8)
+        axes.annotate(label, (fault_level, time_limits[0]), rotation=90, fontsize=7, color=colour,
+                      xytext=(2, 4), textcoords='offset points')
+    for name, fault_levels, trip_times, colour in diagram.curves:
+        for n, segment in enumerate(_segments(fault_levels, trip_times, (i_min, i_max))):
+            axes.plot(segment[0], segment[1], color=colour, linewidth=1.8, label=name if n == 0 else None)
+    for ds_name, us_name, fault_level, ds_time, us_time in diagram.margins:
+        axes.annotate('', (fault_level, us_time), (fault_level, ds_time), arrowprops={'arrowstyle': '<->'})
+        axes.annotate(_margin_label(ds_name, us_name, us_time - ds_time), (fault_level, math.sqrt(ds_time * us_time)),
+                      xytext=(4, 0), textcoords='offset points', fontsize=8)
+    axes.set_xscale('log')
+    axes.set_yscale('log')
+    axes.set_xlim(i_min, i_max)
+    axes.set_ylim(*time_limits)
+    axes.grid(True, which='both', color='#e5e5e5')
+    axes.set_xlabel(f'{diagram.f_type} fault current (A)')
+    axes.set_ylabel('Time (s)')
+    axes.set_title(diagram.title)
+    axes.legend(loc='upper left', bbox_to_anchor=(1.01, 1), fontsize=8)
+    figure.tight_layout()
+    figure.savefig(path, dpi=dpi)
+    plt.close(figure)
+
+
+def save_diagram(diagram: Diagram, directory, formats: tuple = ('svg',)) -> list[Path]:
+    """
+    :param diagram:
+    :param directory:
+    :param formats: 'svg', 'png'
+    :return: Files saved
+    """
+
+    stem = Path(directory) / re.sub(r'[\\/:*?"<>|]', '_', diagram.title)
+    saved = []
+    for file_format in formats:
+        path = stem.with_name(f"{stem.name}.{file_format}")
+        if file_format == 'svg':
+            path.write_text(render_svg(diagram), encoding='utf-8')
+        elif file_format == 'png':
+            render_png(diagram, path)
+        else:
+            raise ValueError(f"Unknown grading diagram format: {file_format}")
+        saved.append(path)
+    return saved
+
+
+def render_diagrams(diagrams: list[Diagram], directory, formats: tuple = ('svg',), workers: int = None) -> list[Path]:
+    """
+    Save many diagrams (e.g. of many feeders) in a process pool.
+    :param diagrams:
+    :param directory:
+    :param formats: 'svg', 'png'
+    :param workers: Number of worker processes. Defaults to the number of processors
+    :return: Files saved
+    """
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(save_diagram, diagram, directory, formats) for diagram in diagrams]
+        return [path for future in futures for path in future.result()]
+
+
+def _segments(fault_levels: np.ndarray, trip_times: np.ndarray, current_limits: tuple) -> list[tuple]:
+    """Runs of curve points within the axis limits, so that the curve is broken where it leaves the diagram"""
+
+    inside = ((trip_times >= time_limits[0]) & (trip_times <= time_limits[1]) & (fault_levels >= current_limits[0])
+              & (fault_levels <= current_limits[1]))
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], inside.astype(np.int8), [0]))))
+    return [(fault_levels[start:end], trip_times[start:end]) for start, end in zip(edges[::2], edges[1::2])
+            if end - start > 1]
+
+
+def _label(value: float) -> str:
+    return f"{value:g}"
+
+
+def _margin_label(ds_name: str, us_name: str, margin: float) -> str:
+    return f"{us_name}/{ds_name} {margin:.2f}s"
@@ -4,6 +4,8 @@ from pathlib import Path
 import time
 # import xlwings as xw
 import pandas as pd
+from grading_diagram import diagram_renderer as dr
+from input_files.data_inputs import client_path
 
 
 curve_maps = {'SI': 2, 'VI': 3, 'EI': 4}
@@ -296,14 +298,28 @@ def faults_sheet(workbook, output, fault_type: str):
     workbook.close()
 
 
-def create_diagrams(all_devices):
+def create_diagrams(all_devices, feeder: str = None):
     """
+    Save the OC and EF grading diagrams as SVG files in the study directory (see diagram_renderer).
+    If feeder is given, it is included in the file names.
+
+    Excel template diagrams (temporarily disabled):
     relay_grading_template: Excel relay grading template file. Normally stored on network drive.
     input_file: Excel file of data io_template_files created by user. Stored in user's home directory
     Relay Coordination Results: Excel file produced by the relay coordination program. Stored in user's home directory
     Relay Grading Diagram
     """
-    pass
+
+    date_string = time.strftime("%Y%m%d-%H%M%S")
+    prefix = f"{feeder} " if feeder else ""
+    for fault_type in ('OC', 'EF'):
+        diagram = dr.build_diagram(f"{prefix}{fault_type} Grading Diagram {date_string}", all_devices, fault_type)
+        try:
+            for path in dr.save_diagram(diagram, client_path()):
+                print(f"Grading diagram saved to {path}")
+        except OSError as error:
+            print(f"Grading diagram not saved: {error}")
+
     # temporarly disabled below code whilst rest of code base is tested
 
     """app = xw.app(visible=True)
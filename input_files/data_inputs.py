@@ -1,3 +1,6 @@
+import hashlib
+import os
+import pickle
 from pathlib import Path
 import pandas as pd
 
@@ -5,9 +8,15 @@ import pandas as pd
 # TODO: Below are temporary data storeage paths to be used during testing. These are to be updated to Q drive when
 #  deployed.
 
-def grade_sheet_fuse_data():
+# Tables are read on first access and kept in memory. A pickled copy of each table is kept in the per-user cache
+# directory and is reused while the source file is unchanged, so that later runs do not need to parse the source file
+# at all.
+_tables: dict = {}
+
+
+def client_path() -> Path:
     """
-    This function is used for the grading sheet excel file
+    Directory in which the study data files are stored
     :return:
     """
 
@@ -18,29 +27,127 @@ def grade_sheet_fuse_data():
         clientpath = basepath / Path('RelayCoordinationStudies')
     else:
         clientpath = Path('c:/LocalData') / user / Path('RelayCoordinationStudies')
+    return clientpath
+
+
+def cache_dir() -> Path:
+    """
+    Per-user directory for cache files. Cache files are pickles, and loading a pickle can run code, so they are kept
+    out of the shared study directory where other users could replace them.
+    :return:
+    """
+
+    local = os.environ.get('LOCALAPPDATA')
+    if local:
+        return Path(local) / 'RelayCoordinationStudies' / 'cache'
+    return Path.home() / '.cache' / 'RelayCoordinationStudies'
+
+
+def _cache_file_path(path: Path) -> Path:
+    # Source files of the same name in different directories get separate cache files
+    return cache_dir() / f"{path.name}.{hashlib.sha256(str(path).encode()).hexdigest()[:16]}.pkl"
+
 
-    data = pd.read_excel(f'{clientpath}/EGX fuse data.xlsx', sheet_name='Data')
-    data = data.interpolate()
+def _file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _load_table(path: Path, reader) -> pd.DataFrame:
+    """
+    Return the table read from path. The table is read with reader(path) only if it is not held in memory and the
+    cache file is missing or stale. The cache file is keyed by the source file mtime, and by its hash if the mtime
+    has changed.
+    :param path: Source file
+    :param reader: Function that reads the source file into a DataFrame
+    :return:
+    """
+
+    mtime = path.stat().st_mtime
+    key = str(path)
+    if key in _tables and _tables[key][0] == mtime:
+        return _tables[key][1]
+
+    cache_file = _cache_file_path(path)
+    file_hash = None
+    data = None
+    try:
+        with open(cache_file, 'rb') as file:
+            cached = pickle.load(file)
+        if cached['mtime'] == mtime:
+            data = cached['data']
+        else:
+            file_hash = _file_hash(path)
+            if cached['hash'] == file_hash:
+                data = cached['data']
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError, TypeError):
+        pass
+
+    # Write the cache file if the table was read, or if only the mtime has changed, so that the file is not hashed
+    # again on the next cold start
+    if data is None or file_hash is not None:
+        if data is None:
+            data = reader(path)
+        try:
+            if file_hash is None:
+                file_hash = _file_hash(path)
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(cache_file, 'wb') as file:
+                pickle.dump({'mtime': mtime, 'hash': file_hash, 'data': data}, file)
+        except OSError:
+            # The cache is an optimisation only. Carry on if the cache directory is not writable.
+            pass
+
+    _tables[key] = (mtime, data)
     return data
 
 
+# Functions called by clear_tables(), to discard data built from the tables
+_clear_callbacks: list = []
+
+
+def on_clear(callback):
+    """
+    Register a function to be called by clear_tables(), e.g. to discard fuse curves built from the tables.
+    :param callback: Function with no arguments
+    :return: callback
+    """
+    if callback not in _clear_callbacks:
+        _clear_callbacks.append(callback)
+    return callback
+
+
+def clear_tables():
+    """Discard the tables held in memory, and the data registered with on_clear(). Cache files are left in place."""
+    _tables.clear()
+    for callback in _clear_callbacks:
+        callback()
+
+
+def grade_sheet_fuse_data():
+    """
+    This function is used for the grading sheet excel file
+    :return:
+    """
+
+    def read(path):
+        data = pd.read_excel(path, sheet_name='Data')
+        return data.interpolate()
+
+    return _load_table(client_path() / 'EGX fuse data.xlsx', read)
+
+
 def fuse_data():
     """
     This function is used for the line fuse study imputs
     :return:
 
     """
-    user = Path.home().name
-    basepath = Path('//client/c$/LocalData') / user
 
-    if basepath.exists():
-        clientpath = basepath / Path('RelayCoordinationStudies')
-    else:
-        clientpath = Path('c:/LocalData') / user / Path('RelayCoordinationStudies')
+    def read(path):
+        with open(path, 'r') as file:
+            return pd.read_csv(file)
 
-    with open(f'{clientpath}/EQL Fuse Data.csv', 'r') as file:
-        df = pd.read_csv(file)
-    return df
+    return _load_table(client_path() / 'EQL Fuse Data.csv', read)
 
 
 def netplan_extract():
@@ -48,19 +155,9 @@ def netplan_extract():
 
     :return:
     """
-    user = Path.home().name
-    basepath = Path('//client/c$/LocalData') / user
-
-    if basepath.exists():
-        clientpath = basepath / Path('RelayCoordinationStudies')
-    else:
-        clientpath = Path('c:/LocalData') / user / Path('RelayCoordinationStudies')
-
-    with open(f'{clientpath}/Netplan Extract.csv', 'r') as file:
-        df = pd.read_csv(file)
-    return df
-
 
-fuse_data_1 = grade_sheet_fuse_data()
-fuse_data_2 = fuse_data()
+    def read(path):
+        with open(path, 'r') as file:
+            return pd.read_csv(file)
 
+    return _load_table(client_path() / 'Netplan Extract.csv', read)
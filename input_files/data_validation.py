@@ -1,4 +1,5 @@
 import sys
+from input_files.input_file import side_output_formats
 
 
 def validate_data(app, instructions, inputs, grad_param):
@@ -232,7 +233,18 @@ def parameters_validation(app, instructions, grad_param: dict):
             valid = _fail(app, f"Entered feeder rating is not in the correct format.")
         elif data[13] < 1 or data[13] > 1000000:
             valid = _fail(app, f"Entered feeder ratings is out of bounds (1, 1,000,000).")
-
+        chains = grad_param.get('Relay coordination optimization chains', 1)
+        if not isinstance(chains, (int, float)) or chains != int(chains):
+            valid = _fail(app, f"Relay coordination optimization chains is not in the correct format.")
+        elif chains < 1 or chains > 64:
+            valid = _fail(app, f"Relay coordination optimization chains is out of bounds (1, 64).")
+
+    if study_type in {2, 3}:
+        files = grad_param.get('Detailed fault level files', '')
+        if not isinstance(files, str):
+            valid = _fail(app, f"Detailed fault level files is not in the correct format.")
+        elif not set(side_output_formats(grad_param)) <= {'csv', 'parquet'}:
+            valid = _fail(app, f"Detailed fault level files must be csv and/or parquet.")
 
     if study_type in {2, 4, 6}:
         data = list(grad_param.values())
@@ -1,4 +1,5 @@
 from typing import Union, Any
+from contextlib import contextmanager
 from importlib import reload
 import pandas as pd
 from pathlib import Path
@@ -10,23 +11,32 @@ from input_files import lookup_tables as lt
 reload(fu)
 
 
-def get_input() -> tuple[list[Any], Any, dict]:
+# Grading Parameters sheet rows that older input files do not have, with their default values
+optional_parameters = {
+    'Relay coordination optimization chains': 1,
+    # Comma separated formats ('csv', 'parquet') in which the detailed fault levels are also saved
+    'Detailed fault level files': '',
+}
+
+
+def get_input(input_path: Union[str, Path] = None) -> tuple[list[Any], Any, dict]:
     """
     Get study instructions
+    :param input_path: Input file. Defaults to relay_coordination_input_file.xlsm in the user's study directory
     """
 
-    user = Path.home().name
-    basepath = Path('//client/c$/LocalData') / user
+    if input_path is None:
+        user = Path.home().name
+        basepath = Path('//client/c$/LocalData') / user
 
-    if basepath.exists():
-        clientpath = basepath / Path('RelayCoordinationStudies')
-    else:
-        clientpath = Path('c:/LocalData') / user / Path('RelayCoordinationStudies')
+        if basepath.exists():
+            clientpath = basepath / Path('RelayCoordinationStudies')
+        else:
+            clientpath = Path('c:/LocalData') / user / Path('RelayCoordinationStudies')
+        input_path = f'{clientpath}/relay_coordination_input_file.xlsm'
 
     sheet_names = ['Instructions', 'Inputs', 'Grading Parameters']
-    data = pd.read_excel(
-        f'{clientpath}/relay_coordination_input_file.xlsm', sheet_name=sheet_names, engine='openpyxl'
-    )
+    data = pd.read_excel(input_path, sheet_name=sheet_names, engine='openpyxl')
     instruction = data['Instructions']
     inputs = data['Inputs']
     grad_param_pd = data['Grading Parameters']
@@ -43,6 +53,10 @@ def get_input() -> tuple[list[Any], Any, dict]:
     grad_param = {}
     for n in [i for i in range(0, 5)] + [i for i in range(6, 12)] + [i for i in range(13, 16)]:
         grad_param[grad_param_pd.at[n, 'Parameter']] = grad_param_pd.at[n, 'Value']
+    # Optional parameters, read if the input file has a row for them
+    for parameter, default in optional_parameters.items():
+        values = grad_param_pd.loc[grad_param_pd['Parameter'] == parameter, 'Value']
+        grad_param[parameter] = values.iloc[0] if not values.empty and pd.notna(values.iloc[0]) else default
     grad_param['Consider cold load pickup'] = lt.clp_lookup[grad_param['Consider cold load pickup']]
     grad_param['Enter feeder rating and load forecast manually'] = (
         lt.clp_lookup)[grad_param['Enter feeder rating and load forecast manually']]
@@ -137,27 +151,66 @@ def update_devices(grad_param, inputs) -> list[Union[re.ProtectionRelay, fu.Line
             all_devices.append(new_fuse)
 
     # Add upstream and downstream device. These can only be added after all device objects are created
-    for device in all_devices:
-        downstream_objects = []
-        upstream_objects = []
-        downstream_devices = device.netdat.downstream_devices
-        upstream_devices = device.netdat.upstream_devices
-        for relay_1 in all_devices:
-            if relay_1.name in downstream_devices:
-                downstream_objects.append(relay_1)
-        device.netdat.downstream_devices = downstream_objects
-        for relay_2 in all_devices:
-            if relay_2.name in upstream_devices:
-                upstream_objects.append(relay_2)
-        device.netdat.upstream_devices = upstream_objects
+    unresolved = link_devices(all_devices)
+    if unresolved:
+        print(f"Downstream or back-up devices not found in the Inputs sheet: {', '.join(unresolved)}")
     return all_devices
 
 
+def device_adjacency(all_devices: list) -> tuple[list[list[int]], list[list[int]], list[str]]:
+    """
+    Resolve the downstream and back-up device names of each device to indices into all_devices.
+    :param all_devices: Devices with netdat.downstream_devices and netdat.upstream_devices as lists of names
+    :return: downstream indices per device, upstream indices per device, unresolved names (with the device listing
+    them). Indices are in all_devices order and exclude the device itself.
+    """
+
+    index = {device.name: i for i, device in enumerate(all_devices)}
+    downstream = []
+    upstream = []
+    unresolved = []
+    for i, device in enumerate(all_devices):
+        links = []
+        for names in (device.netdat.downstream_devices, device.netdat.upstream_devices):
+            resolved = set()
+            for name in names:
+                if name in (None, ''):
+                    continue
+                j = index.get(name)
+                if j is None:
+                    unresolved.append(f"{name} ({device.name})")
+                elif j != i:
+                    resolved.add(j)
+            links.append(sorted(resolved))
+        downstream.append(links[0])
+        upstream.append(links[1])
+    return downstream, upstream, unresolved
+
+
+def link_devices(all_devices: list) -> list[str]:
+    """
+    Replace the downstream and back-up device names of each device with the device objects.
+    :param all_devices:
+    :return: Names that did not match a device
+    """
+
+    downstream, upstream, unresolved = device_adjacency(all_devices)
+    for device, ds_indices, us_indices in zip(all_devices, downstream, upstream):
+        device.netdat.downstream_devices = [all_devices[j] for j in ds_indices]
+        device.netdat.upstream_devices = [all_devices[j] for j in us_indices]
+    return unresolved
+
+
 class GradingParameters:
-    """"""
+    """
+    Study grading parameters from the input file Grading Parameters sheet.
+    Constraint relaxations made during the optimisation routine are applied with relax() and are reverted when the
+    enclosing scope() exits.
+    """
 
     def __init__(self, grad_param):
         """Initialise attributes"""
+        self._overrides: list[tuple[str, float]] = []
         self.consider_clp: str = grad_param['Consider cold load pickup']
         self.pri_reach_factor = float(grad_param['Primary reach factor'])
         self.bu_reach_factor = float(grad_param['Back-up reach factor'])
@@ -169,11 +222,81 @@ class GradingParameters:
         self.fuse_grading = float(grad_param['Fuse'])
         self.cb_interrupt = float(grad_param['CB interrupt time'])
         self.optimization_iter = int(grad_param['Relay coordination optimization iterations'])
+        # Attempts to generate relay settings that conform to grading constraints before aborting
+        self.grading_check_iter = self.optimization_iter * 10
+        # Independent optimisation chains per element. More than one runs the chains in a process pool
+        self.optimization_chains = int(grad_param.get('Relay coordination optimization chains', 1))
         self.enter_load_rating: str = grad_param['Enter feeder rating and load forecast manually']
         self.feeder_load = float(grad_param['Forecast feeder load (A)'])
         self.feeder_rating = float(grad_param['Feeder rating (A)'])
 
+    def relax(self, **offsets: float):
+        """
+        Offset one or more parameters, e.g. relax(fuse_grading=-0.15). The previous values are recorded so that the
+        enclosing scope() reverts them.
+        :param offsets: parameter name: offset
+        :return:
+        """
+        for name, offset in offsets.items():
+            value = getattr(self, name)
+            self._overrides.append((name, value))
+            setattr(self, name, value + offset)
+
+    @contextmanager
+    def scope(self):
+        """
+        Revert any relax() overrides made within the with block when it exits.
+        """
+        depth = len(self._overrides)
+        try:
+            yield self
+        finally:
+            while len(self._overrides) > depth:
+                name, value = self._overrides.pop()
+                setattr(self, name, value)
 
-def grading_parameters():
-    _, _, grad_param = get_input()
-    return GradingParameters(grad_param)
+
+_grading_parameters: Union[GradingParameters, None] = None
+
+
+def grading_parameters() -> GradingParameters:
+    """
+    Process-wide grading parameters. The input file is read on the first call only; call
+    clear_grading_parameters() to force it to be re-read.
+    :return:
+    """
+    global _grading_parameters
+    if _grading_parameters is None:
+        _, _, grad_param = get_input()
+        _grading_parameters = GradingParameters(grad_param)
+    return _grading_parameters
+
+
+def set_grading_parameters(grad_param: Union[dict, GradingParameters]) -> GradingParameters:
+    """
+    Load the process-wide grading parameters from grad_param data already read from the input file.
+    :param grad_param: grad_param dictionary from get_input(), or a GradingParameters object
+    :return:
+    """
+    global _grading_parameters
+    if not isinstance(grad_param, GradingParameters):
+        grad_param = GradingParameters(grad_param)
+    _grading_parameters = grad_param
+    return _grading_parameters
+
+
+def clear_grading_parameters():
+    """Invalidate the process-wide grading parameters."""
+    global _grading_parameters
+    _grading_parameters = None
+
+
+def side_output_formats(grad_param: dict) -> tuple:
+    """
+    :param grad_param:
+    :return: Formats in which the detailed fault levels are also saved, from the Detailed fault level files parameter
+    """
+    files = grad_param.get('Detailed fault level files', '')
+    if not isinstance(files, str):
+        return ()
+    return tuple(file_format.strip().lower() for file_format in files.split(',') if file_format.strip())
@@ -0,0 +1,163 @@
+"""
+Candidate fuse scoring for the line fuse study.
+Each candidate fuse is scored against each criterion for all fuses on the feeder in one array computation. The
+criteria currents of all fuses are interpolated on the stacked candidate fuse curves, which are built on the first call
+only.
+"""
+
+import math
+from typing import Union
+import numpy as np
+from device_data.fuse_curves import CurveStack
+from input_files import data_inputs as di
+from relay_coordination import trip_time as tt
+from input_files.input_file import grading_parameters
+
+# Candidate fuses are the Energex standard EDO/MDO fuse sizes (as per Energex Technical Instruction TSD0019i), in order
+# of size
+candidate_fuses = {'8T': 1, '16K': 2, '20K': 3, '25K': 4, '40K': 5, '50K': 6, '65K': 7, '80K': 8}
+
+# Report label and score of each criterion, in score matrix order
+criteria = {
+    "Fuse downstream capacity x 25 (inrush withstand):": 1,
+    "Fuse downstream capacity x 12 (inrush withstand):": 1,
+    "Fuse max load x 6 (clp capability):": 1,
+    "Fuse max load x 3 (clp capability):": 1,
+    "Fuse min melt at 300s (load capability):": 1,
+    "Fuse downstream TR 3P % time (ds grading):": 1,
+    "Fuse downstream TR 2P % time (ds grading):": 1,
+    "Fuse downstream TR PG % time (ds grading):": 1,
+    "Fuse min 2P clear time:": 5,
+    "Fuse min PG clear time:": 5,
+    "Fuse upstream device 3P grading margin:": 1,
+    "Fuse upstream device PG grading margin:": 1,
+}
+
+# Slowest permissible total clearing time at the minimum fault levels (s)
+slowest_clearing_time = 3
+
+# Candidate curve stacks: {bound: CurveStack}
+_stacks: dict = {}
+
+
+def candidate_stack(bound: str) -> CurveStack:
+    """
+    :param bound: 'Min' for the minimum melting curves, 'Max' for the total clearing curves
+    :return: Curves of the candidate fuses, in candidate_fuses order
+    """
+    if bound not in _stacks:
+        curves = tt.line_fuse_curves()
+        _stacks[bound] = CurveStack([curves[name] for name in candidate_fuses], bound)
+    return _stacks[bound]
+
+
+@di.on_clear
+def clear_stacks():
+    """Discard the candidate curve stacks, e.g. after the fuse data has changed."""
+    _stacks.clear()
+
+
+class FuseScores:
+    """Criteria values and scores of each candidate fuse for a list of fuses"""
+
+    def __init__(self, fuses: list, values: np.ndarray, passed: np.ndarray):
+        """
+        Initialise attributes
+        :param fuses: Fuses scored
+        :param values: Criteria values, shape (len(fuses), len(candidate_fuses), len(criteria)). nan where a fuse curve
+        does not reach the criterion current or time
+        :param passed: Criteria met, the same shape as values
+        """
+        self.fuses = fuses
+        self.candidates: list[str] = list(candidate_fuses)
+        self.values = values
+        self.scores = passed * np.fromiter(criteria.values(), dtype=int, count=len(criteria))
+        self.totals = self.scores.sum(axis=2)
+        # The smallest of the best scoring candidates. Candidates are in order of size, and argmax returns the first
+        self._best = np.argmax(self.totals, axis=1) if len(fuses) else np.zeros(0, dtype=int)
+        self.selection: list[str] = [self.candidates[i] for i in self._best.tolist()]
+
+    def report(self, i: int) -> list[float]:
+        """
+        :param i: Fuse index
+        :return: Criteria values of the selected candidate of the fuse, in criteria order
+        """
+        return self.values[i, self._best[i]].tolist()
+
+
+def score_fuses(fuses: list, fuse_grading: Union[float, None] = None) -> FuseScores:
+    """
+    Score every candidate fuse against every criterion for each fuse.
+    :param fuses: Line fuses, with fault levels and load data in netdat
+    :param fuse_grading: Upstream grading margin (s). Defaults to the grading parameters fuse grading margin
+    :return:
+    """
+
+    if fuse_grading is None:
+        fuse_grading = grading_parameters().fuse_grading
+
+    def netdat(attribute):
+        # None (no data) becomes nan, so that the criteria that depend on it are not met
+        return np.array([getattr(fuse.netdat, attribute) for fuse in fuses], dtype=float).reshape(-1)
+
+    ds_capacity = netdat('ds_capacity')
+    load = netdat('load')
+    tr_max_3p = netdat('tr_max_3p')
+    tr_max_2p = tr_max_3p * math.sqrt(3) / 2
+    tr_max_pg = netdat('tr_max_pg')
+    max_3p_fl = netdat('max_3p_fl')
+    max_pg_fl = netdat('max_pg_fl')
+
+    # Minimum melting times and total clearing times, shape (candidates, fuses, currents)
+    melt = candidate_stack('Min').time(np.stack(
+        [25 * ds_capacity, 12 * ds_capacity, 6 * load, 3 * load, tr_max_3p, tr_max_2p, tr_max_pg], axis=1
+    ))
+    clear = candidate_stack('Max').time(np.stack(
+        [tr_max_3p, tr_max_2p, tr_max_pg, netdat('min_2p_fl'), netdat('min_pg_fl'), max_3p_fl, max_pg_fl], axis=1
+    ))
+    melt_300s = np.broadcast_to(candidate_stack('Min').current(300.0)[:, None], melt.shape[:2])
+    us_3p, us_pg = upstream_trip_times(fuses, max_3p_fl, max_pg_fl)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.stack([
+            melt[..., 0], melt[..., 1], melt[..., 2], melt[..., 3], melt_300s,
+            # Downstream transformer fuse total clearing time as a fraction of the candidate minimum melting time
+            clear[..., 0] / melt[..., 4], clear[..., 1] / melt[..., 5], clear[..., 2] / melt[..., 6],
+            clear[..., 3], clear[..., 4],
+            us_3p - clear[..., 5], us_pg - clear[..., 6],
+        ], axis=2)
+        limits = [0.01, 0.1, 1, 10]
+        passed = np.concatenate([
+            values[..., :4] > limits,
+            (load <= 0.8 * values[..., 4])[..., None],
+            values[..., 5:8] <= 0.75,
+            values[..., 8:10] <= slowest_clearing_time,
+            values[..., 10:] >= fuse_grading,
+        ], axis=2)
+
+    # (candidates, fuses, criteria) to (fuses, candidates, criteria)
+    return FuseScores(fuses, values.transpose(1, 0, 2), passed.transpose(1, 0, 2))
+
+
+def upstream_trip_times(fuses: list, max_3p_fl: np.ndarray, max_pg_fl: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Trip times of the upstream device of each fuse at the fuse maximum fault levels. Assumes that if there is upstream
+    protection, it is a relay.
+    :param fuses:
+    :param max_3p_fl:
+    :param max_pg_fl:
+    :return: OC and EF trip times (s). nan where there is no upstream device or its settings are unknown
+    """
+
+    us_3p = np.full(len(fuses), np.nan)
+    us_pg = np.full(len(fuses), np.nan)
+    for i, fuse in enumerate(fuses):
+        if not fuse.netdat.upstream_devices:
+            continue
+        upstream_device = fuse.netdat.upstream_devices[0]
+        try:
+            us_3p[i] = tt.relay_trip_time(upstream_device, max_3p_fl[i], f_type='OC')
+            us_pg[i] = tt.relay_trip_time(upstream_device, max_pg_fl[i], f_type='EF')
+        except Exception:
+            us_3p[i] = us_pg[i] = np.nan
+    return us_3p, us_pg
@@ -6,12 +6,6 @@ from pathlib import Path
 import time
 import pandas as pd
 from typing import Union, Any
-from selenium import webdriver
-from selenium.webdriver.support.ui import Select
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
 
 
 def get_inputs() -> list:
@@ -66,6 +60,10 @@ def query_netplan(driver, feeder_name, first_query=False) -> tuple[Union[str,Non
     :return:
     """
 
+    from selenium.webdriver.support.ui import Select
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.common.by import By
+
     def failed(driver):
         # Go back to Ratings tab in preparation for next iteration
         rating_button = driver.find_element(By.ID, 'MN006')
@@ -238,8 +236,9 @@ def chrome_driver():
     :return:
     """
 
-    from pathlib import Path
-    import os
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
 
     # Initialize the Chrome options
     chrome_options = Options()
@@ -0,0 +1,156 @@
+"""
+Trip time curves shared by the optimiser, the setting reports and the grading diagrams.
+A curve is the trip times of a device at the tt.fault_samples of a fault level range. Curves are held in a
+process-wide least recently used cache, keyed by the device settings and the samples, and bounded in size (MB). The
+optimiser populates the cache with the curves of its final settings, and the later stages read them from it.
+"""
+
+from collections import OrderedDict
+import numpy as np
+from relay_coordination import trip_time as tt
+
+
+class CurveCache:
+    """Least recently used cache of arrays, bounded by their total size"""
+
+    def __init__(self, max_mb: float):
+        """
+        Initialise attributes
+        :param max_mb: Size bound (MB) of the arrays held
+        """
+        self.max_bytes = int(max_mb * 1e6)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, compute) -> np.ndarray:
+        """
+        :param key: Hashable key
+        :param compute: Function returning the array, called if the key is not held
+        :return:
+        """
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        array = compute()
+        # Arrays are shared between callers, so must not be changed in place
+        array.flags.writeable = False
+        self._entries[key] = array
+        self.nbytes += array.nbytes
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        return array
+
+    def resize(self, max_mb: float):
+        """Change the size bound, evicting the least recently used arrays if needed"""
+        self.max_bytes = int(max_mb * 1e6)
+        while self.nbytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Process-wide curve cache
+cache = CurveCache(max_mb=64)
+
+
+def device_key(device, f_type: str) -> tuple:
+    """
+    Everything that the device trip time curve depends on, other than the fault levels.
+    :param device: Relay or fuse
+    :param f_type: 'EF', 'OC'
+    :return:
+    """
+
+    if hasattr(device, 'cb_interrupt'):
+        return device.name, f_type, tt.element_settings(device, f_type), device.ct.saturation
+    return device.name, device.relset.rating
+
+
+def samples(min_fl: float, max_fl: float, breakpoints=()) -> np.ndarray:
+    """
+    tt.fault_samples of the range, cached.
+    :param min_fl:
+    :param max_fl:
+    :param breakpoints:
+    :return:
+    """
+
+    breakpoints = tuple(sorted(float(x) for x in breakpoints))
+    key = ('samples', min_fl, max_fl, breakpoints, tt.sample_points)
+    return cache.get(key, lambda: tt.fault_samples(min_fl, max_fl, breakpoints))
+
+
+def trip_times(device, f_type: str, fault_levels: np.ndarray) -> np.ndarray:
+    """
+    Device trip times (relay) or melting times (fuse) at fault_levels, cached.
+    :param device:
+    :param f_type: 'EF', 'OC'
+    :param fault_levels: A samples() array. The cache is keyed by its contents
+    :return:
+    """
+
+    key = (device_key(device, f_type), fault_levels.tobytes())
+    if hasattr(device, 'cb_interrupt'):
+        return cache.get(key, lambda: tt.relay_trip_time_array(device, fault_levels, f_type))
+    return cache.get(key, lambda: np.asarray(tt.fuse_melting_time(device.relset.rating, fault_levels), dtype=float))
+
+
+def relay_curve(relay, f_type: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Relay trip time curve across its own fault level range.
+    :param relay:
+    :param f_type: 'EF', 'OC'
+    :return: (fault levels, trip times)
+    """
+
+    min_fl, max_fl = fault_level_range(relay, f_type)
+    fault_levels = samples(min_fl, max_fl, tt.relay_breakpoints(relay, f_type))
+    return fault_levels, trip_times(relay, f_type, fault_levels)
+
+
+def grading_curves(ds_device, relay, f_type: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Trip time curves of a downstream device and an upstream relay across the downstream device fault level range.
+    :param ds_device:
+    :param relay:
+    :param f_type: 'EF', 'OC'
+    :return: (fault levels, downstream device trip times, relay trip times)
+    """
+
+    min_fl, max_fl = fault_level_range(ds_device, f_type)
+    breakpoints = tt.device_breakpoints(ds_device, f_type) + tt.relay_breakpoints(relay, f_type)
+    fault_levels = samples(min_fl, max_fl, breakpoints)
+    return fault_levels, trip_times(ds_device, f_type, fault_levels), trip_times(relay, f_type, fault_levels)
+
+
+def populate(relays: list, f_type: str):
+    """
+    Cache the curves of the relays used by the setting reports and grading diagrams: each relay's own curve and its
+    grading curves with its downstream devices.
+    :param relays:
+    :param f_type: 'EF', 'OC'
+    :return:
+    """
+
+    for relay in relays:
+        relay_curve(relay, f_type)
+        for device in relay.netdat.downstream_devices or []:
+            grading_curves(device, relay, f_type)
+
+
+def fault_level_range(device, f_type: str) -> tuple[float, float]:
+    if f_type == 'EF':
+        return device.netdat.min_pg_fl, device.netdat.max_pg_fl
+    return device.netdat.min_2p_fl, device.netdat.max_3p_fl
@@ -1,6 +1,8 @@
 """ Two types of grading margin may be calculated: Grading with nominal margin depending on the technology type,
  and exact grading margins with parameters specific to the relay and fault level"""
 
+import math
+import numpy as np
 from input_files.input_file import grading_parameters
 import relay_coordination.trip_time as tt
 
@@ -65,33 +67,94 @@ def _grade_time(ds_device: object, us_device: object, f_type: str, eval_type: st
     :return:
     """
 
-    eval = []
-    # Create a list of fault levels over which to compare curves
+    margin, fault_level = min_grading_margin(ds_device, us_device, f_type, eval_type)
+
+    return [margin >= 0]
+
+
+def min_grading_margin(ds_device: object, us_device: object, f_type: str, eval_type: str) -> tuple[float, float]:
+    """
+    Worst case grading margin between a downstream device and an upstream relay across the downstream device fault
+    level range (in the same 1A steps as tt.fault_range).
+    The margin is the actual grading time less the required grading time; grading is achieved if it is >= 0.
+    The margin is not evaluated at every step. It is evaluated at the tt.fault_samples of the range, which include both
+    sides of every point where either curve changes shape (pick up, CT saturation, hisets, fuse curve points). Between
+    these points both curves are smooth, and the minimum of each interval is found with a golden section search run
+    across all intervals at once.
+    :param ds_device:
+    :param us_device:
+    :param f_type:
+    :param eval_type: 'Nominal', 'Exact'
+    :return: (minimum margin, fault level at which it occurs). (inf, None) if the fault level range is empty.
+    """
+
     min_fl, max_fl = _min_max_fl(ds_device, f_type)
-    b = [a for a in range(min_fl, max_fl, 1)]
-    for x in b:
+    # Length of tt.fault_range(min_fl, max_fl)
+    steps = max(math.ceil(max_fl - min_fl), 0)
+    if not steps:
+        return float('inf'), None
+
+    def margin(step):
+        fault_levels = min_fl + step
         if hasattr(ds_device, 'cb_interrupt'):
-            trip_ds_device = tt.relay_trip_time(ds_device, x, f_type)
+            trip_ds_device = tt.relay_trip_time_array(ds_device, fault_levels, f_type)
         else:
-            trip_ds_device = tt.fuse_melting_time(ds_device.relset.rating, x)
-        trip_us_device = tt.relay_trip_time(us_device, x, f_type)
+            trip_ds_device = tt.fuse_melting_time(ds_device.relset.rating, fault_levels)
+        trip_us_device = tt.relay_trip_time_array(us_device, fault_levels, f_type)
         grading_actual = trip_us_device - trip_ds_device
-        # Evaluate downstream grading against device technology
-        eval.append(_grading_eval(ds_device, trip_ds_device, grading_actual, eval_type))
+        return grading_actual - _grading_required(ds_device, trip_ds_device, eval_type)
 
-    return eval
+    candidates = _search_steps(ds_device, us_device, f_type, min_fl, steps, margin)
+    margins = margin(candidates)
+    worst = int(np.argmin(margins))
 
+    return float(margins[worst]), float(min_fl + candidates[worst])
 
-def _grading_eval(device: object, device_trip: float, grading_actual: float, eval_type: str) -> bool:
-    """
 
-    :param device:
-    :param device_trip:
-    :param grading_actual:
-    :param eval_type:
+def _search_steps(ds_device: object, us_device: object, f_type: str, min_fl: float, steps: int, margin) -> np.ndarray:
+    """
+    Steps of the fault level range at which the grading margin may be at a minimum.
+    :param margin: Function of an array of steps returning the grading margin
     :return:
     """
 
+    # Steps either side of each fault level sample, which include the breakpoints and the ends of the range
+    breakpoints = tt.relay_breakpoints(us_device, f_type) + tt.device_breakpoints(ds_device, f_type)
+    after = np.ceil(tt.fault_samples(min_fl, min_fl + steps - 1, breakpoints) - min_fl)
+    knots = np.unique(np.clip(np.concatenate(([0, steps - 1], after - 1, after)), 0, steps - 1))
+    candidates = [knots]
+
+    # Golden section search within each interval between knots, down to intervals of a few steps
+    lower, upper = knots[:-1], knots[1:]
+    lower, upper = lower.astype(float), upper.astype(float)
+    ratio = (np.sqrt(5) - 1) / 2
+    x1 = upper - ratio * (upper - lower)
+    x2 = lower + ratio * (upper - lower)
+    m1, m2 = np.split(margin(np.concatenate((x1, x2))), 2)
+    while np.any(upper - lower > 8):
+        left = m1 <= m2
+        upper = np.where(left, x2, upper)
+        lower = np.where(left, lower, x1)
+        x1, x2 = (np.where(left, upper - ratio * (upper - lower), x2),
+                  np.where(left, x1, lower + ratio * (upper - lower)))
+        m_new = margin(np.where(left, x1, x2))
+        m1, m2 = np.where(left, m_new, m2), np.where(left, m1, m_new)
+    # Every step within the remaining intervals
+    for offset in range(10):
+        candidates.append(np.minimum(np.floor(lower) + offset, np.ceil(upper)))
+
+    return np.unique(np.concatenate(candidates))
+
+
+def _grading_required(device: object, device_trip, eval_type: str):
+    """
+    Grading time required above the downstream device.
+    :param device: Downstream device
+    :param device_trip: Trip time, or array of trip times
+    :param eval_type: 'Nominal', 'Exact'
+    :return: Grading time, or array of grading times for exact grading
+    """
+
     if hasattr(device, 'cb_interrupt'):
         if eval_type == 'Exact':
             grading_required = (((2 * device.manufacturer.timing_error + device.ct.ect) / 100) * device_trip
@@ -106,12 +169,7 @@ def _grading_eval(device: object, device_trip: float, grading_actual: float, eva
     else:
         grading_required = grading_parameters().fuse_grading
 
-    if grading_actual >= grading_required:
-        eval = True
-    else:
-        eval = False
-
-    return eval
+    return grading_required
 
 
 def _min_max_fl(device: object, f_type: str) -> tuple[float, float]:
@@ -0,0 +1,95 @@
+"""
+Multi-start optimisation.
+Independent, separately seeded optimisation chains for the EF and OC elements are run in a process pool. Each worker
+receives a pickled snapshot of the devices and returns only its best settings as a setting vector. The best EF chain
+and the best OC chain are then applied to the live relays.
+Worker processes are started with sys.executable. In the PowerFactory embedded interpreter this is the PowerFactory
+host rather than Python, so the chains are then run one after another in the calling process.
+"""
+
+import pickle
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from input_files import input_file
+from relay_coordination import setting_vector as sv
+
+
+def best_relays(all_devices: list, chains: int, workers: int = None, seed: int = 0) -> tuple[list, dict]:
+    """
+    Run chains optimisation chains per element across a process pool and apply the best settings to the relays. The
+    chains are run sequentially if worker processes cannot be started (see pool_available).
+    :param all_devices:
+    :param chains: Number of chains per element (EF, OC)
+    :param workers: Number of worker processes. Defaults to the number of processors
+    :param seed: Chain n is seeded with seed + n
+    :return: (best relays, {f_type: (best total trip, triggers, failed iterations)}). Best relays is an empty list if no
+    chain found permissible settings for either element.
+    """
+
+    relays = [device for device in all_devices if hasattr(device, 'cb_interrupt')]
+    initial_settings = sv.capture(relays)
+    snapshot = pickle.dumps(all_devices)
+
+    if pool_available():
+        with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(input_file.grading_parameters(),)
+        ) as executor:
+            futures = {
+                f_type: [executor.submit(_run_chain, snapshot, f_type, seed + n) for n in range(chains)]
+                for f_type in ('EF', 'OC')
+            }
+            chain_results = {f_type: [future.result() for future in element] for f_type, element in futures.items()}
+    else:
+        print("Python interpreter not found for worker processes, running the optimization chains sequentially")
+        chain_results = {
+            f_type: [_run_chain(snapshot, f_type, seed + n) for n in range(chains)] for f_type in ('EF', 'OC')
+        }
+
+    results = {}
+    found = True
+    for f_type, element in chain_results.items():
+        best_total_trip, settings, triggers, failed_iter = min(element, key=lambda result: result[0])
+        results[f_type] = (best_total_trip, triggers, failed_iter)
+        if settings is None:
+            found = False
+            continue
+        sv.restore(relays, settings, sv.element_fields(f_type))
+        # Relay statuses are only ever changed to "Required" during optimisation
+        changed = settings['status'] != initial_settings['status']
+        sv.restore([relay for relay, change in zip(relays, changed) if change], settings[changed], ('status',))
+
+    return relays if found else [], results
+
+
+def pool_available() -> bool:
+    """
+    Worker processes can only be started if sys.executable is a Python interpreter.
+    :return:
+    """
+
+    return Path(sys.executable).stem.lower().startswith('python')
+
+
+def _init_worker(grading_parameters: input_file.GradingParameters):
+    """Use the parent process grading parameters rather than re-reading the input file in each worker."""
+    input_file.set_grading_parameters(grading_parameters)
+
+
+def _run_chain(snapshot: bytes, f_type: str, seed: int) -> tuple:
+    """
+    :param snapshot: Pickled all_devices
+    :param f_type: 'EF', 'OC'
+    :param seed:
+    :return: (best total trip, best setting vector or None, triggers, failed iterations)
+    """
+
+    # Imported here, as relay_coord imports this module
+    from relay_coordination import relay_coord as rc
+
+    random.seed(seed)
+    all_devices = pickle.loads(snapshot)
+    best_total_trip, best_relays, triggers, failed_iter = rc.best_relays(all_devices, f_type)
+    settings = sv.capture(best_relays) if best_relays else None
+    return best_total_trip, settings, triggers, failed_iter
@@ -2,24 +2,24 @@
 
 """
 
-import copy
-
 from device_data.eql_relay_data import ProtectionRelay
 from input_files.input_file import grading_parameters
 from relay_coordination import trip_time as tt
+from relay_coordination import curve_cache as cc
 from relay_coordination import setting_checks as sc
 from relay_coordination import setting_reports as sr
-from relay_coordination.setting_checks import grading_check_iter
+from relay_coordination import setting_vector as sv
+from relay_coordination import multi_start as ms
 from line_fuse_study import study_line_fuse as slf
 
-# Set iterations of optimisation routine
-iterations = grading_parameters().optimization_iter
-
 
-def relay_coordination(all_devices: list) -> tuple[list[object], dict]:
+def relay_coordination(all_devices: list, chains: int = None, workers: int = None) -> tuple[list[object], dict]:
     """
 
     :param all_devices:
+    :param chains: Number of independent optimisation chains per element. If greater than 1, the chains and the EF and
+    OC searches are run in a process pool (see multi_start). Defaults to the grading parameters optimization chains
+    :param workers: Number of worker processes for multi-start optimisation. Defaults to the number of processors
     :return:
     """
 
@@ -28,9 +28,19 @@ def relay_coordination(all_devices: list) -> tuple[list[object], dict]:
 
     fuse_setting_report = slf.line_fuse_study(all_devices)
     print("Running optimization routine")
-    best_total_trip_ef, best_settings_ef, ef_triggers, failed_ef = best_relays(all_devices, f_type='EF')
-    best_total_trip_oc, best_settings, oc_triggers, failed_oc = best_relays(all_devices, f_type='OC')
+    if chains is None:
+        chains = grading_parameters().optimization_chains
+    if chains > 1:
+        best_settings, results = ms.best_relays(all_devices, chains, workers)
+        best_total_trip_ef, ef_triggers, failed_ef = results['EF']
+        best_total_trip_oc, oc_triggers, failed_oc = results['OC']
+    else:
+        best_total_trip_ef, best_settings_ef, ef_triggers, failed_ef = best_relays(all_devices, f_type='EF')
+        best_total_trip_oc, best_settings, oc_triggers, failed_oc = best_relays(all_devices, f_type='OC')
     print_results(best_total_trip_ef, ef_triggers, best_total_trip_oc, oc_triggers, failed_ef, failed_oc)
+    # Curves of the final settings, read by the setting reports and grading diagrams
+    for f_type in ('EF', 'OC'):
+        cc.populate(best_settings, f_type)
 
     ef_setting_report = sr.ef_report(best_settings)
     oc_setting_report = sr.oc_report(best_settings)
@@ -101,61 +111,82 @@ def best_relays(all_devices: list[object], f_type: str) -> tuple[float, list, li
 
     best_total_trip = 1000000
     best_relays = []
+    best_settings = None
     # Triggers are parameters indicating whether a solution has failed to converge under specified constraints.
     # When reaching a threshold value, this triggers formulation of new solutions under less stringent constraints.
     triggers = [0, 0, 0, 0, 0, 0, 0]
     failed_iter = 0
-    for n in range(0, iterations):
-        print(f"{f_type} settings iteration {n + 1} of {iterations}")
-        # Percentage is a variable that behaves similarly to temperature in simulated annealing. It progressively
-        # restricts bounds on setting parameter generation to converge on the best settings.
-        percentage = 1 - (n / iterations)
-        # Generate new relay settings under constraints
-        triggers = sc.check_settings(relays, triggers, percentage, f_type)
-        if triggers[6] == grading_check_iter:
-            # Iteration failed to generate permissible settings
-            failed_iter += 1
-            continue
-        total_trip_time = objective_function(relays, f_type)
-        if total_trip_time < best_total_trip:
-            best_total_trip = round(total_trip_time, 2)
-            best_relays = copy.deepcopy(relays)
-        relays = best_relays
-    # If fuse grading was changed, revert the change.
-    if triggers[3] == grading_check_iter or triggers[4] == grading_check_iter:
-        grading_parameters().fuse_grading += 0.15
-    # If slowest clearing time was changed, revert the change.
-    if triggers[5] == grading_check_iter or triggers[6] == grading_check_iter:
-        grading_parameters().pri_slowest_clear -= 1
-        grading_parameters().bu_slowest_clear -= 1
+    # Objective function contributions of each relay setting evaluated so far
+    contributions = {}
+    # Iterations of the optimisation routine
+    iterations = grading_parameters().optimization_iter
+    grading_check_iter = grading_parameters().grading_check_iter
+    # Fuse grading and slowest clearing time relaxations made by check_settings are reverted when the scope exits.
+    with grading_parameters().scope():
+        for n in range(0, iterations):
+            print(f"{f_type} settings iteration {n + 1} of {iterations}")
+            # Percentage is a variable that behaves similarly to temperature in simulated annealing. It progressively
+            # restricts bounds on setting parameter generation to converge on the best settings.
+            percentage = 1 - (n / iterations)
+            # Generate new relay settings under constraints
+            triggers = sc.check_settings(relays, triggers, percentage, f_type)
+            if triggers[6] == grading_check_iter:
+                # Iteration failed to generate permissible settings
+                failed_iter += 1
+                continue
+            total_trip_time = objective_function(relays, f_type, contributions)
+            if total_trip_time < best_total_trip:
+                best_total_trip = round(total_trip_time, 2)
+                best_settings = sv.capture(relays)
+            elif best_settings is not None:
+                # Continue from the best settings
+                sv.restore(relays, best_settings)
+
+    if best_settings is not None:
+        sv.restore(relays, best_settings)
+        best_relays = relays
 
     return best_total_trip, best_relays, triggers, failed_iter
 
 
-def objective_function(relays: list[object], f_type: str) -> float:
+def objective_function(relays: list[object], f_type: str, contributions: dict = None) -> float:
     """
-    Calculate total trip time for all relays across all fault levels.
+    Calculate total trip time for all relays, integrated across their fault level range.
     :param relays:
     :param f_type: "EF", "OC".
+    :param contributions: Optional cache of relay total trip times, keyed by relay_key(). Only relays whose settings
+    are not in the cache are evaluated.
     :return:
     """
 
+    if contributions is None:
+        contributions = {}
     total_trip_time = 0
     for relay in relays:
-        total_time = 0
-        if f_type == 'EF':
-            min_fl = relay.netdat.min_pg_fl
-            max_fl = relay.netdat.max_pg_fl
-        else:
-            min_fl = relay.netdat.min_2p_fl
-            max_fl = relay.netdat.max_3p_fl
-        for x in range(min_fl, max_fl, 1):
-            total_time += tt.relay_trip_time(relay, x,  f_type)
-        total_trip_time += total_time
+        key = relay_key(relay, f_type)
+        if key not in contributions:
+            min_fl, max_fl = key[2]
+            contributions[key] = tt.relay_trip_time_integral(relay, min_fl, max_fl, f_type)
+        total_trip_time += contributions[key]
 
     return total_trip_time
 
 
+def relay_key(relay, f_type: str) -> tuple:
+    """
+    Everything that a relay's objective function contribution depends on.
+    :param relay:
+    :param f_type: "EF", "OC".
+    :return: (name, element settings, (min fault level, max fault level), CT saturation)
+    """
+
+    if f_type == 'EF':
+        fault_levels = (relay.netdat.min_pg_fl, relay.netdat.max_pg_fl)
+    else:
+        fault_levels = (relay.netdat.min_2p_fl, relay.netdat.max_3p_fl)
+    return relay.name, tt.element_settings(relay, f_type), fault_levels, relay.ct.saturation
+
+
 def print_results(
         best_total_trip_ef: float,
         ef_triggers: list,
@@ -173,6 +204,8 @@ def print_results(
     :return:
 
     """
+    iterations = grading_parameters().optimization_iter
+    grading_check_iter = grading_parameters().grading_check_iter
     print(f"There were {failed_ef} failed EF iterations out of a total of {iterations} attempts")
     if ef_triggers[0] == grading_check_iter:
         print(f"EF Grading with existing settings not achieved using nominal margins.")
@@ -26,11 +26,6 @@ from relay_coordination.setting_generators import generate_settings as gs
 from relay_coordination import grading_margins as gm
 
 
-# The grading_check_iter variable denotes how many times the script will attempt to generate relay settings that
-# conform to grading constraints before aborting
-
-grading_check_iter = grading_parameters().optimization_iter * 10
-
 def check_settings(relays: list, triggers: list, percentage: float, f_type: str):
     """
 
@@ -46,6 +41,8 @@ def check_settings(relays: list, triggers: list, percentage: float, f_type: str)
     new_relays = sorted(new_relays, key=lambda x: x.netdat.max_pg_fl)
     exist_feed_relays = [relay for relay in relays if relay.relset.status == "Existing" and relay.net.dat.i_split == 1]
     sub_bu_relays = [relay for relay in relays if relay.relset.status == "Existing" and relay.net.dat.i_split > 1]
+    # Number of attempts to generate relay settings that conform to grading constraints before aborting
+    grading_check_iter = grading_parameters().grading_check_iter
 
     a, b, c, d, e, f, g = triggers
     if percentage < 1:
@@ -92,7 +89,7 @@ def check_settings(relays: list, triggers: list, percentage: float, f_type: str)
 
     # Relax fuse grading
     if a == b == c == d == grading_check_iter:
-        grading_parameters().fuse_grading -= 0.15
+        grading_parameters().relax(fuse_grading=-0.15)
         e = generate_settings(new_relays, percentage, f_type, eval_type='Exact')
 
     # Add substation bu relays to new_relays list
@@ -104,8 +101,7 @@ def check_settings(relays: list, triggers: list, percentage: float, f_type: str)
 
     # Relax permissible slowest primary and backup clearing times
     if a == b == c == d == e == f == grading_check_iter:
-        grading_parameters().pri_slowest_clear += 1
-        grading_parameters().bu_slowest_clear += 1
+        grading_parameters().relax(pri_slowest_clear=1, bu_slowest_clear=1)
         g = generate_settings(new_relays, percentage, f_type, eval_type='Exact')
 
     triggers = [a, b, c, d, e, f, g]
@@ -121,6 +117,7 @@ def generate_settings(relays: list, percentage: float, f_type: str, eval_type: s
     :param eval_type: 'Nominal', 'Exact'
     :return:
     """
+    grading_check_iter = grading_parameters().grading_check_iter
     n = 0 
     grading_check = [False]
     while not all(grading_check) and n < grading_check_iter:
@@ -85,7 +85,7 @@ def generate_oc_settings(relays, percentage):
             oc_hiset_scenarios = hg.oc_hiset_mintime(relay)
             relay_settings = random.choice(oc_hiset_scenarios)
             relay.relset.oc_hiset = relay_settings[0]
-            relay.relset.oc_hiset_min_time = relay_settings[1]
+            relay.relset.oc_min_time = relay_settings[1]
             relay.relset.oc_hiset2 = relay_settings[2]
             relay.relset.oc_min_time2 = relay_settings[3]
             # curve selection for all iterations will be a random choice from scenarios
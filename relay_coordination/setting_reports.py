@@ -1,7 +1,7 @@
 from relay_coordination import trip_time as tt
-from relay_coordination.setting_checks import grading_check_iter
+from relay_coordination import curve_cache as cc
+from input_files.input_file import grading_parameters
 
-iterations = round(grading_check_iter / 10)
 
 def ef_report(best_relays):
     """
@@ -28,13 +28,11 @@ def ef_report(best_relays):
             ds_grading = "No downstream devices"
         else:
             for device in relay.netdat.downstream_devices:
-                # Create a list of fault levels over which to compare curves
-                b = [a for a in range(device.netdat.min_pg_fl, device.netdat.max_pg_fl, 1)]
+                # Curves over the fault levels at which to compare them
+                b, trip_relay_1, trip_relay_2 = cc.grading_curves(device, relay, 'EF')
                 min_grading = 999
-                for x in b:
-                    trip_relay_1 = tt.relay_trip_time(device, x, f_type='EF')
-                    trip_relay_2 = tt.relay_trip_time(relay, x, f_type='EF')
-                    grading_time_d = trip_relay_2 - trip_relay_1
+                if b.size:
+                    grading_time_d = float((trip_relay_2 - trip_relay_1).min())
                     if grading_time_d < min_grading:
                         min_grading = round(grading_time_d, 3)
                 ds_grading = min_grading
@@ -56,10 +54,10 @@ def ef_report(best_relays):
             bu_reach_factor = "No downstream devices"
 
         # relay slowest operating time
-        b = [a for a in range(relay.netdat.min_pg_fl, relay.netdat.max_pg_fl, 1)]
+        b, trip_times = cc.relay_curve(relay, 'EF')
         slowest_trip = 0
-        for x in b:
-            trip_relay = tt.relay_trip_time(relay, x, f_type='EF')
+        if b.size:
+            trip_relay = float(trip_times.max())
             if trip_relay > slowest_trip:
                 slowest_trip = round(trip_relay, 3)
         slowest_operate = slowest_trip
@@ -99,13 +97,11 @@ def oc_report(best_relays):
             ds_grading = "No downstream devices"
         else:
             for device in relay.netdat.downstream_devices:
-                # Create a list of fault levels over which to compare curves
-                b = [a for a in range(device.netdat.min_2p_fl, device.netdat.max_3p_fl, 1)]
+                # Curves over the fault levels at which to compare them
+                b, trip_relay_1, trip_relay_2 = cc.grading_curves(device, relay, 'OC')
                 min_grading = 999
-                for x in b:
-                    trip_relay_1 = tt.relay_trip_time(device, x, f_type='OC')
-                    trip_relay_2 = tt.relay_trip_time(relay, x, f_type='OC')
-                    grading_time_d = trip_relay_2 - trip_relay_1
+                if b.size:
+                    grading_time_d = float((trip_relay_2 - trip_relay_1).min())
                     if grading_time_d < min_grading:
                         min_grading = round(grading_time_d, 3)
                 ds_grading = min_grading
@@ -152,10 +148,10 @@ def oc_report(best_relays):
             r_f = "No"
 
         # relay slowest operating time
-        b = [a for a in range(relay.netdat.min_2p_fl, relay.netdat.max_3p_fl, 1)]
+        b, trip_times = cc.relay_curve(relay, 'OC')
         slowest_trip = 0
-        for x in b:
-            trip_relay = tt.relay_trip_time(relay, x, f_type='OC')
+        if b.size:
+            trip_relay = float(trip_times.max())
             if trip_relay > slowest_trip:
                 slowest_trip = round(trip_relay, 3)
         slowest_operate = slowest_trip
@@ -168,7 +164,8 @@ def oc_report(best_relays):
 
 def triggers_report(ef_triggers, oc_triggers, failed_ef, failed_oc):
 
-
+    grading_check_iter = grading_parameters().grading_check_iter
+    iterations = grading_parameters().optimization_iter
     ef_a, ef_b, ef_c, ef_d, ef_e, ef_f, ef_g = ef_triggers
     ef_notes = []
     if ef_a == grading_check_iter:
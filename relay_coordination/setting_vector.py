@@ -0,0 +1,71 @@
+"""
+Relay settings held as a numpy structured array, one row per relay.
+The optimisation routine snapshots and restores the settings of all relays with a single array copy, rather than
+copying the relay objects (and with them the whole feeder through their upstream and downstream device links).
+"""
+
+import numbers
+import numpy as np
+
+# RelaySettings attributes held in the array
+setting_fields = (
+    'status',
+    'oc_pu', 'oc_tms', 'oc_curve', 'oc_hiset', 'oc_min_time', 'oc_hiset2', 'oc_min_time2',
+    'ef_pu', 'ef_tms', 'ef_curve', 'ef_hiset', 'ef_min_time', 'ef_hiset2', 'ef_min_time2',
+)
+
+setting_dtype = np.dtype([(field, 'f8') for field in setting_fields])
+
+# Non-numeric setting values are stored as negative codes: -1 for the first value, -2 for the second, etc.
+_text_values = ("OFF", "", False, None, "SI", "VI", "EI", "Existing", "Required", "New")
+
+
+def capture(relays: list) -> np.ndarray:
+    """
+    Settings of the relays.
+    :param relays:
+    :return: Structured array of setting_dtype, one row per relay in the order given
+    """
+
+    settings = np.empty(len(relays), dtype=setting_dtype)
+    for i, relay in enumerate(relays):
+        settings[i] = tuple(_encode(getattr(relay.relset, field)) for field in setting_fields)
+    return settings
+
+
+def element_fields(f_type: str) -> tuple:
+    """
+    :param f_type: 'EF', 'OC'
+    :return: Setting fields of the relay EF or OC element
+    """
+    prefix = 'ef_' if f_type == 'EF' else 'oc_'
+    return tuple(field for field in setting_fields if field.startswith(prefix))
+
+
+def restore(relays: list, settings: np.ndarray, fields: tuple = setting_fields):
+    """
+    Apply settings from capture() back to the relays.
+    :param relays: The relays the settings were captured from, in the same order
+    :param settings:
+    :param fields: The settings to apply. Defaults to all settings
+    :return:
+    """
+
+    for relay, row in zip(relays, settings[list(fields)].tolist()):
+        for field, value in zip(fields, row):
+            setattr(relay.relset, field, _decode(value))
+
+
+def _encode(value) -> float:
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return float(value)
+    for i, text in enumerate(_text_values):
+        if value is text or (type(value) is type(text) and value == text):
+            return -(i + 1.0)
+    raise ValueError(f"Relay setting value {value!r} cannot be stored in a setting vector")
+
+
+def _decode(value: float):
+    if value < 0:
+        return _text_values[int(-value) - 1]
+    return value
@@ -1,4 +1,9 @@
-from input_files.data_inputs import fuse_data_1 as fd_1, fuse_data_2 as fd_2
+import math
+from typing import Union
+import numpy as np
+from device_data import fuse_curves as fc
+from device_data.fuse_curves import FuseCurve
+from input_files import data_inputs as di
 from input_files.input_file import grading_parameters
 
 def curve_parameters(curve: str) -> tuple[float, float]:
@@ -7,10 +12,10 @@ def curve_parameters(curve: str) -> tuple[float, float]:
     :param curve:
     :return:
     """
-    if curve == 'SI' or 'si':
+    if curve in ('SI', 'si'):
         k = 0.14
         a = 0.02
-    elif curve == "VI" or 'vi':
+    elif curve in ('VI', 'vi'):
         k = 13.5
         a = 1
     else:
@@ -20,25 +25,24 @@ def curve_parameters(curve: str) -> tuple[float, float]:
     return k, a
 
 
+def element_settings(relay, f_type: str) -> tuple:
+    """
+    Settings of the relay EF or OC element.
+    :param relay:
+    :param f_type: 'EF', 'OC'
+    :return: (pu, tms, curve, hiset, min_time, hiset_2, min_time2)
+    """
+    if f_type == 'EF':
+        return (relay.relset.ef_pu, relay.relset.ef_tms, relay.relset.ef_curve, relay.relset.ef_hiset,
+                relay.relset.ef_min_time, relay.relset.ef_hiset2, relay.relset.ef_min_time2)
+    return (relay.relset.oc_pu, relay.relset.oc_tms, relay.relset.oc_curve, relay.relset.oc_hiset,
+            relay.relset.oc_min_time, relay.relset.oc_hiset2, relay.relset.oc_min_time2)
+
+
 def relay_trip_time(relay, fault_level, f_type):
     """Calculate relay trip time
     """
-    if f_type == 'EF':
-        pu = relay.relset.ef_pu
-        tms = relay.relset.ef_tms
-        curve = relay.relset.ef_curve
-        hiset = relay.relset.ef_hiset
-        min_time = relay.relset.ef_min_time
-        hiset_2 = relay.relset.ef_hiset2
-        min_time2 = relay.relset.ef_min_time2
-    else:
-        pu = relay.relset.oc_pu
-        tms = relay.relset.oc_tms
-        curve = relay.relset.oc_curve
-        hiset = relay.relset.oc_hiset
-        min_time = relay.relset.oc_min_time
-        hiset_2 = relay.relset.oc_hiset2
-        min_time2 = relay.relset.oc_min_time2
+    pu, tms, curve, hiset, min_time, hiset_2, min_time2 = element_settings(relay, f_type)
 
     k, a = curve_parameters(curve)
 
@@ -89,6 +93,209 @@ def relay_trip_time(relay, fault_level, f_type):
     return trip_time
 
 
+def relay_trip_time_array(relay, fault_levels, f_type: str) -> np.ndarray:
+    """
+    Vectorised relay_trip_time. Calculate relay trip times for an array of fault levels in a single call.
+    The hiset, hiset 2 and CT saturation branches of relay_trip_time are applied as masks.
+    :param relay:
+    :param fault_levels: Array of fault levels (A)
+    :param f_type: 'EF', 'OC'
+    :return: Array of trip times (s), the same shape as fault_levels
+    """
+
+    pu, tms, curve, hiset, min_time, hiset_2, min_time2 = element_settings(relay, f_type)
+
+    k, a = curve_parameters(curve)
+
+    fault_levels = np.asarray(fault_levels, dtype=float)
+    multiplier = fault_levels / pu
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        operate_time = (k * tms) / (multiplier ** a - 1)
+    # Below pick up (and at pick up, where the scalar calculation would divide by zero) the relay does not operate
+    operate_time = np.where((operate_time <= 0) | ~np.isfinite(operate_time), 9999, operate_time)
+    saturate_curve = (k * tms) / (relay.ct.saturation ** a - 1)
+    idmt_time = np.where(multiplier > relay.ct.saturation, saturate_curve, operate_time)
+
+    # hisets off
+    if hiset == "OFF":
+        trip_time = idmt_time
+    # hiset 1 on, hiset 2 off
+    elif hiset_2 == "OFF":
+        trip_time = np.where(fault_levels < hiset, idmt_time, min_time)
+    # hiset 1 on, hiset 2 on
+    else:
+        trip_time = np.where(fault_levels < hiset, idmt_time, np.where(fault_levels < hiset_2, min_time, min_time2))
+
+    assert np.all(trip_time >= 0), (f"Trip time error: {relay.name}, "
+                                    f"fault type: {f_type}, "
+                                    f"min trip time: {trip_time.min()}, "
+                                    f"hiset: {hiset}, "
+                                    f"min time: {min_time},"
+                                    f"hiset2: {hiset_2},"
+                                    f"min_time2: {min_time2}")
+
+    return trip_time
+
+
+def relay_breakpoints(relay, f_type: str) -> list[float]:
+    """
+    Fault levels at which the relay curve changes shape: pick up, CT saturation, hiset and hiset 2.
+    :param relay:
+    :param f_type: 'EF', 'OC'
+    :return:
+    """
+
+    pu, tms, curve, hiset, min_time, hiset_2, min_time2 = element_settings(relay, f_type)
+    breakpoints = [pu, pu * relay.ct.saturation]
+    if hiset != "OFF":
+        breakpoints.append(hiset)
+        if hiset_2 != "OFF":
+            breakpoints.append(hiset_2)
+    return breakpoints
+
+
+def device_breakpoints(device, f_type: str) -> list[float]:
+    """
+    Fault levels at which the device curve changes shape: relay_breakpoints() of a relay, or the fuse curve points of a
+    fuse.
+    :param device:
+    :param f_type: 'EF', 'OC'
+    :return:
+    """
+
+    if hasattr(device, 'cb_interrupt'):
+        return relay_breakpoints(device, f_type)
+    return list(fuse_breakpoints(device.relset.rating))
+
+
+def fault_range(min_fl: float, max_fl: float) -> np.ndarray:
+    """
+    Fault levels (1A steps) over which relay curves are evaluated.
+    :param min_fl:
+    :param max_fl:
+    :return:
+    """
+    return np.arange(min_fl, max_fl, 1)
+
+
+# Default number of fault levels sampled by fault_samples
+sample_points = 256
+
+
+def fault_samples(min_fl: float, max_fl: float, breakpoints=(), points: int = None) -> np.ndarray:
+    """
+    Fault levels over which curves are compared, as an alternative to fault_range whose length does not depend on the
+    size of the fault levels. The fault levels are log-spaced from min_fl to max_fl, refined with each breakpoint
+    within the range and the fault level just below it, so that both sides of every change in curve shape are sampled.
+    :param min_fl:
+    :param max_fl:
+    :param breakpoints: Fault levels at which the curves change shape (see device_breakpoints)
+    :param points: Point budget. At most half of it is used for breakpoints; if there are more, an evenly spread
+    selection of them is refined. Defaults to sample_points
+    :return: Sorted fault levels, including min_fl and max_fl. Empty if max_fl <= min_fl
+    """
+
+    if points is None:
+        points = sample_points
+    if not max_fl > min_fl:
+        return np.zeros(0)
+
+    breakpoints = np.unique(np.asarray(breakpoints, dtype=float))
+    breakpoints = breakpoints[(breakpoints > min_fl) & (breakpoints <= max_fl)]
+    if 2 * len(breakpoints) > points // 2:
+        breakpoints = breakpoints[np.linspace(0, len(breakpoints) - 1, max(points // 4, 1)).round().astype(int)]
+    spaced = np.geomspace(max(min_fl, 1), max_fl, max(points - 2 * len(breakpoints), 2))
+    samples = np.concatenate(([min_fl, max_fl], spaced, breakpoints, np.nextafter(breakpoints, -np.inf)))
+    return np.unique(samples[(samples >= min_fl) & (samples <= max_fl)])
+
+
+# Gauss-Legendre nodes and weights used by relay_trip_time_integral for curves without a closed form integral
+_gl_nodes, _gl_weights = np.polynomial.legendre.leggauss(8)
+
+
+def relay_trip_time_integral(relay, min_fl: float, max_fl: float, f_type: str, tol: float = 1e-6) -> float:
+    """
+    Integral of relay trip time over fault levels min_fl to max_fl (A.s). This is the continuous equivalent of summing
+    relay_trip_time at 1A steps over fault_range(min_fl, max_fl).
+    The range is split at the pick up, CT saturation, hiset and hiset 2 breakpoints. Time plateaus are integrated
+    exactly, the VI and EI curves in closed form and other curves by Gauss-Legendre quadrature.
+    Between pick up and pick up + 1A the curve is taken to be flat at its pick up + 1A value, as the curve integral
+    diverges at pick up.
+    :param relay:
+    :param min_fl:
+    :param max_fl:
+    :param f_type: 'EF', 'OC'
+    :param tol: Relative tolerance of the quadrature
+    :return:
+    """
+
+    pu, tms, curve, hiset, min_time, hiset_2, min_time2 = element_settings(relay, f_type)
+
+    k, a = curve_parameters(curve)
+    saturation = relay.ct.saturation
+    saturate_curve = (k * tms) / (saturation ** a - 1)
+    hiset_on = hiset != "OFF"
+    hiset_2_on = hiset_on and hiset_2 != "OFF"
+
+    breakpoints = {min_fl, max_fl, pu, pu + 1, pu * saturation}
+    if hiset_on:
+        breakpoints.add(hiset)
+    if hiset_2_on:
+        breakpoints.add(hiset_2)
+    breakpoints = sorted(x for x in breakpoints if min_fl <= x <= max_fl)
+
+    total = 0
+    for x0, x1 in zip(breakpoints[:-1], breakpoints[1:]):
+        width = x1 - x0
+        mid = (x0 + x1) / 2
+        if hiset_on and mid >= hiset:
+            total += (min_time2 if hiset_2_on and mid >= hiset_2 else min_time) * width
+        elif mid / pu > saturation:
+            total += saturate_curve * width
+        elif mid <= pu:
+            # The relay does not operate below pick up
+            total += 9999 * width
+        elif mid < pu + 1:
+            total += (k * tms) / (((pu + 1) / pu) ** a - 1) * width
+        else:
+            total += k * tms * pu * _idmt_integral(a, x0 / pu, x1 / pu, tol)
+
+    return total
+
+
+def _idmt_integral(a: float, m0: float, m1: float, tol: float) -> float:
+    """
+    Integral of 1 / (M^a - 1) over multiples of pick up m0 to m1, where 1 < m0 <= m1.
+    Quadrature is carried out in t = ln(M - 1), where the integrand (M - 1) / (M^a - 1) is smooth. The number of panels
+    is doubled until successive results agree to within tol.
+    """
+
+    if a == 1:
+        return math.log((m1 - 1) / (m0 - 1))
+    if a == 2:
+        return 0.5 * math.log(((m1 - 1) * (m0 + 1)) / ((m1 + 1) * (m0 - 1)))
+
+    t0, t1 = math.log(m0 - 1), math.log(m1 - 1)
+    panels = 1
+    value = _gauss_legendre(a, t0, t1, panels)
+    while panels < 1024:
+        panels *= 2
+        refined = _gauss_legendre(a, t0, t1, panels)
+        if abs(refined - value) <= tol * abs(refined):
+            return refined
+        value = refined
+    return value
+
+
+def _gauss_legendre(a: float, t0: float, t1: float, panels: int) -> float:
+    edges = np.linspace(t0, t1, panels + 1)
+    half = np.diff(edges)[:, None] / 2
+    t = edges[:-1, None] + half * (_gl_nodes + 1)
+    m = 1 + np.exp(t)
+    integrand = (m - 1) / (m ** a - 1)
+    return float(np.sum(half * _gl_weights * integrand))
+
+
 def tms_solver(relay: object, f_type: str, function: str) -> float:
     """
     Calculate tms associated with the slowest permissible fault clearing time
@@ -128,26 +335,59 @@ def tms_solver(relay: object, f_type: str, function: str) -> float:
     return tms
 
 
-def fuse_melting_time(fuse_name: str, fault_current: float) -> float:
+_grade_sheet_curves: Union[dict[str, FuseCurve], None] = None
+_line_fuse_curves: Union[dict[str, FuseCurve], None] = None
+
+
+def grade_sheet_curves() -> dict[str, FuseCurve]:
+    """
+    Fuse curves of the grading sheet fuse data, built on the first call only.
+    :return: {fuse name: FuseCurve}
+    """
+    global _grade_sheet_curves
+    if _grade_sheet_curves is None:
+        _grade_sheet_curves = fc.single_curves(di.grade_sheet_fuse_data())
+    return _grade_sheet_curves
+
+
+@di.on_clear
+def clear_fuse_curves():
+    """Discard the fuse curves, so that they are built again from the fuse data tables."""
+    global _grade_sheet_curves, _line_fuse_curves
+    _grade_sheet_curves = None
+    _line_fuse_curves = None
+
+
+def line_fuse_curves() -> dict[str, FuseCurve]:
+    """
+    Min melting and total clearing fuse curves of the line fuse study fuse data, built on the first call only.
+    :return: {fuse name: FuseCurve}
+    """
+    global _line_fuse_curves
+    if _line_fuse_curves is None:
+        _line_fuse_curves = fc.bound_curves(di.fuse_data())
+    return _line_fuse_curves
+
+
+def fuse_melting_time(fuse_name: str, fault_current):
     """
     Interpolates the fuse melting time for a given fuse and fault current.
-    :param df: grade_sheet_fuse_data()
     :param fuse_name: Name of the fuse.
-    :param fault_current: Fault current for which to interpolate the melting time.
-    :return: Interpolated fuse melting time.
+    :param fault_current: Fault current, or array of fault currents, for which to interpolate the melting time.
+    :return: Interpolated fuse melting time, or array of melting times.
     """
 
-    # Extract the column index of the fuse
-    fuse_index = fd_1.columns.get_loc(fuse_name)
+    return grade_sheet_curves()[fuse_name].time(fault_current)
 
-    # Sort the DataFrame by the fault current column
-    df_sorted = fd_1.sort_values(by=fd_1.columns[0])
 
-    # Interpolate the melting time for the given fault current
-    melting_time = df_sorted.iloc[:, [0, fuse_index]].interpolate(method='linear'). \
-        loc[df_sorted.iloc[:, 0].searchsorted(fault_current)].iloc[1]
+def fuse_breakpoints(fuse_name: str) -> np.ndarray:
+    """
+    Fault currents at which the fuse melting curve changes slope.
+    :param fuse_name:
+    :return:
+    """
 
-    return melting_time
+    return grade_sheet_curves()[fuse_name].min.currents
 
 
 def ip_fuse_time(fuse_name, current: float, bound: str) -> float:
@@ -155,31 +395,13 @@ def ip_fuse_time(fuse_name, current: float, bound: str) -> float:
     Interpolates fuse time from given current
     :param fuse_name:
     :param current:
-    :param bound:
-    :return:
+    :param bound: 'Min', 'Max'
+    :return: Time, or False if the current is outside the fuse curve
     """
 
-    if bound == 'Min':
-        i_col = f"{fuse_name}minI"
-        time_col = f"{fuse_name}minT"
-    else:
-        i_col = f"{fuse_name}totI"
-        time_col = f"{fuse_name}totT"
-
-    # Ensure the DataFrame is sorted by i_col
-    df = fd_2.sort_values(i_col).reset_index(drop=True)
-
-    time_interp = False
-    # Find the rows where x lies between y1 and y2
-
-    for i in range(len(df) - 1):
-        if df.loc[i, i_col] <= current <= df.loc[i + 1, i_col]:
-            y1, y2 = df.loc[i, i_col], df.loc[i + 1, i_col]
-            z1, z2 = df.loc[i, time_col], df.loc[i + 1, time_col]
-
-            # Linear interpolation formula
-            time_interp = z1 + (current - y1) * (z2 - z1) / (y2 - y1)
-
+    time_interp = line_fuse_curves()[fuse_name].time(current, bound, clip=False)
+    if math.isnan(time_interp):
+        return False
     return time_interp
 
 
@@ -188,29 +410,11 @@ def ip_fuse_current(fuse_name, time: float, bound: str) -> float:
     Interpolates fuse current from given time
     :param fuse_name:
     :param time:
-    :param bound:
-    :return:
+    :param bound: 'Min', 'Max'
+    :return: Current, or False if the time is outside the fuse curve
     """
 
-    if bound == 'Min':
-        i_col = f"{fuse_name}minI"
-        time_col = f"{fuse_name}minT"
-    else:
-        i_col = f"{fuse_name}totI"
-        time_col = f"{fuse_name}totT"
-
-    # Ensure the DataFrame is sorted by i_col
-    df = fd_2.sort_values(time_col).reset_index(drop=True)
-
-    time_interp = False
-    # Find the rows where x lies between y1 and y2
-
-    for i in range(len(df) - 1):
-        if df.loc[i, time_col] <= time <= df.loc[i + 1, time_col]:
-            y1, y2 = df.loc[i, time_col], df.loc[i + 1, time_col]
-            z1, z2 = df.loc[i, i_col], df.loc[i + 1, i_col]
-
-            # Linear interpolation formula
-            time_interp = z1 + (time - y1) * (z2 - z1) / (y2 - y1)
-
-    return time_interp
+    current_interp = line_fuse_curves()[fuse_name].current(time, bound, clip=False)
+    if math.isnan(current_interp):
+        return False
+    return current_interp
@@ -1,21 +1,31 @@
+import datetime
+import math
 from pathlib import Path
+import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
 from openpyxl.utils import get_column_letter
 
 
 
 def save_dataframe(app, study_type, gen_info: list, all_devices: list,
-                   setting_report: dict, detailed_fls: list):
+                   setting_report: dict, detailed_fls: list, feeder: str = None, side_outputs: tuple = ()):
     """ saves the dataframe in the user directory.
     If the user is connected through citrix, the file should
     be saved local users PowerFactoryResults folder
+    If feeder is given, it is included in the file name
+    side_outputs: Formats ('parquet', 'csv') in which the detailed fault levels are also saved, beside the workbook
     """
     import os
     import time
 
     date_string = time.strftime("%Y%m%d-%H%M%S")
-    filename = 'Protection Study Results ' + date_string + ".xlsx"
+    if feeder:
+        filename = 'Protection Study Results ' + feeder + ' ' + date_string + ".xlsx"
+    else:
+        filename = 'Protection Study Results ' + date_string + ".xlsx"
 
     user = Path.home().name
     basepath = Path('//client/c$/LocalData') / user
@@ -31,34 +41,9 @@ def save_dataframe(app, study_type, gen_info: list, all_devices: list,
         format_results(study_type, gen_info, all_devices, setting_report, detailed_fls))
 
     #TODO: use Excel conditional formatting rules
-    with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-        # General Information sheet
-        grid_data_df.to_excel(writer, sheet_name='General Information', startrow=9, index=False)
-        workbook = writer.book
-        worksheet = workbook['General Information']
-        worksheet['A1'] = feeder_name
-        worksheet['A2'] = study_type
-        worksheet['A4'] = 'Script Run Date'
-        worksheet['A5'] = date_string
-        worksheet['A8'] = 'External Grid Data:'
-
-        # Study Results sheet
-        study_results.to_excel(writer, sheet_name='Study Results', index=False)
-        # Detailed Fault Levels sheet
-        for i, device in enumerate(dfls_list):
-            count = (i + 1) * 6 - 6
-            device.to_excel(writer, sheet_name='Detailed Fault Levels', startrow=0, startcol=count, index=False)
-
-    wb = load_workbook(filepath)
-    ws = wb['General Information']
-    adjust_col_width(ws)
-    ws = wb['Study Results']
-    adjust_col_width(ws)
-    ws = wb['Detailed Fault Levels']
-    adjust_col_width(ws)
-
-    # Save the adjusted workbook
-    wb.save(filepath)
+    write_workbook(filepath, feeder_name, study_type, date_string, grid_data_df, study_results, dfls_list)
+    if side_outputs and dfls_list:
+        save_detailed_fls(app, filepath, dfls_list, side_outputs)
 
 
 def format_results(study_type, gen_info, all_devices, setting_report, detailed_fls):
@@ -251,26 +236,141 @@ def format_tfmrs(section_loads):
     return device_list
 
 
-def adjust_col_width(ws):
+def write_workbook(filepath, feeder_name, study_type, date_string, grid_data_df, study_results, dfls_list):
+    """
+    Write the results workbook in a single pass. Sheets are streamed row by row (openpyxl write only mode), with the
+    column widths found from the data before the rows are written.
+    :param filepath:
+    :param feeder_name:
+    :param study_type:
+    :param date_string:
+    :param grid_data_df:
+    :param study_results:
+    :param dfls_list: Detailed fault level table of each device, placed side by side
+    :return:
+    """
+
+    workbook = Workbook(write_only=True)
+    general_cells = {
+        (0, 0): feeder_name,
+        (1, 0): study_type,
+        (3, 0): 'Script Run Date',
+        (4, 0): date_string,
+        (7, 0): 'External Grid Data:',
+    }
+    _write_sheet(workbook, 'General Information', [(9, 0, grid_data_df)], general_cells)
+    _write_sheet(workbook, 'Study Results', [(0, 0, study_results)])
+    _write_sheet(workbook, 'Detailed Fault Levels', [(0, i * 6, df) for i, df in enumerate(dfls_list)])
+    workbook.save(filepath)
+
+
+def _write_sheet(workbook, title: str, blocks: list[tuple], cells: dict = None):
     """
-    Adjust column width of given Excel sheet
-    :param ws:
+    Stream DataFrames (without index) and single cells to a new write only sheet.
+    :param workbook: Write only workbook
+    :param title: Sheet name
+    :param blocks: (start row, start column, DataFrame) of each table. Rows and columns are zero based
+    :param cells: {(row, column): value} of single cells
     :return:
     """
 
-    # Adjust the column widths
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter  # Get the column name
+    worksheet = workbook.create_sheet(title)
+    cells = cells or {}
+
+    # Column widths, as the longest value in the column
+    widths = {}
+    for (_, col), value in cells.items():
+        widths[col] = max(widths.get(col, 0), _text_length(value))
+    for _, startcol, df in blocks:
+        for j, column in enumerate(df.columns):
+            length = max(_text_length(column), df[column].map(_text_length).max() if len(df) else 0)
+            widths[startcol + j] = max(widths.get(startcol + j, 0), length)
+    for col, width in widths.items():
+        worksheet.column_dimensions[get_column_letter(col + 1)].width = width + 2
+
+    n_cols = max(widths) + 1 if widths else 0
+    n_rows = max([row + 1 for row, _ in cells] + [startrow + 1 + len(df) for startrow, _, df in blocks], default=0)
+    data = [(startrow, startcol, df, df.itertuples(index=False, name=None)) for startrow, startcol, df in blocks]
+    for row in range(n_rows):
+        values = [None] * n_cols
+        for (cell_row, col), value in cells.items():
+            if cell_row == row:
+                values[col] = _cell_value(value)
+        for startrow, startcol, df, rows in data:
+            if row == startrow:
+                for j, column in enumerate(df.columns):
+                    values[startcol + j] = _header_cell(worksheet, column)
+            elif startrow < row <= startrow + len(df):
+                for j, value in enumerate(next(rows)):
+                    values[startcol + j] = _cell_value(value)
+        worksheet.append(values)
+
+
+def _header_cell(worksheet, value) -> WriteOnlyCell:
+    """DataFrame header cell, in the pandas to_excel header style"""
+    cell = WriteOnlyCell(worksheet, value=_cell_value(value))
+    cell.font = Font(bold=True)
+    cell.border = Border(left=Side('thin'), right=Side('thin'), top=Side('thin'), bottom=Side('thin'))
+    cell.alignment = Alignment(horizontal='center', vertical='top')
+    return cell
+
+
+def _cell_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+        return None if isinstance(value, float) and math.isnan(value) else value
+    if isinstance(value, (str, int, float, datetime.date, datetime.time)):
+        return value
+    return str(value)
+
+
+def _text_length(value) -> int:
+    value = _cell_value(value)
+    return 0 if value is None else len(str(value))
+
+
+def save_detailed_fls(app, filepath, dfls_list: list, formats: tuple) -> list[Path]:
+    """
+    Save the detailed fault levels of all devices as one long table beside the workbook, with a 'Device' and a
+    'Terminal' column. Parquet output needs a Parquet engine (pyarrow or fastparquet); if none is installed, the
+    Parquet file is skipped.
+    :param app:
+    :param filepath: Results workbook
+    :param dfls_list: Detailed fault level table of each device
+    :param formats: 'parquet', 'csv'
+    :return: Files saved
+    """
 
-        # Iterate over all cells in the column to find the maximum length
-        for cell in col:
+    tables = []
+    for df in dfls_list:
+        device = df.columns[1]
+        table = df.rename(columns={device: 'Terminal'})
+        table.insert(0, 'Device', device)
+        tables.append(table)
+    if tables:
+        detailed_fls = pd.concat(tables, ignore_index=True)
+    else:
+        detailed_fls = pd.DataFrame(columns=['Device', 'Tfmr Size (kVA)', 'Terminal'])
+    # Transformer sizes are blank where the terminal has no transformer
+    detailed_fls['Tfmr Size (kVA)'] = pd.to_numeric(detailed_fls['Tfmr Size (kVA)'], errors='coerce')
+
+    saved = []
+    stem = Path(filepath).with_suffix('')
+    for file_format in formats:
+        path = Path(f"{stem} Detailed Fault Levels.{file_format}")
+        if file_format == 'parquet':
             try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-
-        # Set the column width to the maximum length found
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
+                detailed_fls.to_parquet(path, index=False)
+            except ImportError as error:
+                app.PrintPlain(f"Detailed fault levels not saved to Parquet: {error}")
+                continue
+        elif file_format == 'csv':
+            detailed_fls.to_csv(path, index=False)
+        else:
+            raise ValueError(f"Unknown detailed fault level output format: {file_format}")
+        app.PrintPlain(f"Detailed fault levels saved to {path}")
+        saved.append(path)
+    return saved
+
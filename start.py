@@ -8,24 +8,18 @@ grading_diagram
 from importlib import reload
 import time
 import sys
-import powerfactory as pf
 from helper_funcs.script_helper import *
 from input_files import input_file, data_validation as dv
 from load_rating_data import device_load_rating as dlr
 from fault_level_data import fault_data
+from fault_level_data.network_backend import ReplayNetwork
 from relay_coordination import relay_coord as rc
 from grading_diagram import grading_diagrams as gd
 from line_fuse_study import study_line_fuse as slf
 import save_dataframe as save
 
-reload(fault_data)
-reload(input_file)
-reload(save)
-reload(dlr)
-reload(rc)
-reload(dv)
 
-def main(app):
+def main(app, input_path=None):
     """
 
     All documents are stored and saved to home/RelayCoordinationStudies
@@ -37,19 +31,38 @@ def main(app):
     New Excel files created:
     - EF grading_diagram
     - OC grading_diagram
+    :param app:
+    :param input_path: Input file. Defaults to relay_coordination_input_file.xlsm in the user's study directory
     """
 
     # Retrieve data from the input file
-    instructions, inputs, grad_param = input_file.get_input()
+    instructions, inputs, grad_param = input_file.get_input(input_path)
     # Validate all input data
     dv.validate_data(app, instructions, inputs, grad_param)
-    feeder = instructions[0]
-    study_type = instructions[1]
+    # Use this run's grading parameters rather than any cached from a previous run
+    input_file.set_grading_parameters(grad_param)
 
     # Load the data into the device classes.
     all_devices = input_file.update_devices(grad_param, inputs)
 
+    gen_info, all_devices, detailed_fls = network_stages(app, instructions, all_devices)
+    study_stages(app, instructions, grad_param, gen_info, all_devices, detailed_fls)
+
+
+def network_stages(app, instructions: list, all_devices: list) -> tuple[list, list, list]:
+    """
+    Study stages that read the PowerFactory model.
+    :param app:
+    :param instructions: Instructions from the input file
+    :param all_devices:
+    :return: gen_info, all_devices, detailed_fls. gen_info and detailed_fls are None if there is no fault level study
+    """
+
+    feeder = instructions[0]
+    study_type = instructions[1]
+
     # Assess the type of study required.
+    gen_info, detailed_fls = None, None
     if study_type == 1:
         app.PrintPlain("No study type selected from the relay_coordination_input_file.xlsm Instructions sheet")
         app.PrintPlain("Please review the Instructions sheet and run the script again")
@@ -57,40 +70,80 @@ def main(app):
     elif study_type == 2:
         app.PrintPlain("User has selected a full study (fault levels & relay coordination & grading diagram)")
         gen_info, all_devices, detailed_fls = fault_data.fault_study(app, all_devices, feeder)
-        dlr.get_load_rating(app, all_devices, instructions, grad_param)
-        all_devices, setting_report = rc.relay_coordination(all_devices)
-        gd.create_diagrams(all_devices)
     elif study_type == 3:
         app.PrintPlain("User has selected a fault level study only")
-        setting_report = None
         gen_info, all_devices, detailed_fls = fault_data.fault_study(app, all_devices, feeder)
     elif study_type == 4:
         app.PrintPlain("User has selected a relay coordination study only")
-        gen_info, detailed_fls = None, None
-        dlr.get_load_rating(all_devices, instructions, grad_param)
-        all_devices, setting_report = rc.relay_coordination(all_devices)
     elif study_type == 5:
         app.PrintPlain("User has selected to create a grading diagram only")
-        gen_info, detailed_fls, setting_report = None, None, None
-        gd.create_diagrams(all_devices)
     else:
         app.PrintPlain("User has selected a line fuse study")
-        dlr.get_load_rating(all_devices, instructions, grad_param)
-        gen_info, detailed_fls = None, None
+    return gen_info, all_devices, detailed_fls
+
+
+def study_stages(app, instructions: list, grad_param: dict, gen_info: list, all_devices: list, detailed_fls: list,
+                 feeder_file_name: bool = False):
+    """
+    Study stages that work from the device data alone, after network_stages(). app is used only for messages.
+    :param app:
+    :param instructions: Instructions from the input file
+    :param grad_param: Grading parameters from the input file
+    :param gen_info: From network_stages()
+    :param all_devices: From network_stages()
+    :param detailed_fls: From network_stages()
+    :param feeder_file_name: Include the feeder name in the results file name
+    :return:
+    """
+
+    study_type = instructions[1]
+
+    if study_type == 2:
+        dlr.get_load_rating(app, all_devices, instructions, grad_param)
+        all_devices, setting_report = rc.relay_coordination(all_devices)
+        gd.create_diagrams(all_devices, feeder=instructions[0])
+    elif study_type == 3:
+        setting_report = None
+    elif study_type == 4:
+        dlr.get_load_rating(app, all_devices, instructions, grad_param)
+        all_devices, setting_report = rc.relay_coordination(all_devices)
+    elif study_type == 5:
+        setting_report = None
+        gd.create_diagrams(all_devices, feeder=instructions[0])
+    else:
+        dlr.get_load_rating(app, all_devices, instructions, grad_param)
         setting_report = slf.line_fuse_study(all_devices)
 
-    save.save_dataframe(app, study_type, gen_info, all_devices, setting_report, detailed_fls)
+    feeder = instructions[0] if feeder_file_name else None
+    save.save_dataframe(app, study_type, gen_info, all_devices, setting_report, detailed_fls, feeder=feeder,
+                        side_outputs=input_file.side_output_formats(grad_param))
 
 
 if __name__ == '__main__':
+    # PowerFactory keeps the interpreter between script runs. Reload the study modules so that changes to them take
+    # effect. Not done on import, so that batch_study workers keep the modules they have loaded.
+    reload(fault_data)
+    reload(input_file)
+    reload(save)
+    reload(dlr)
+    reload(rc)
+    reload(dv)
+
     start = time.time()
 
-    app = pf.GetApplication()
-    app.SetEnableUserBreak(1)
-    app.ClearOutputWindow()
+    if len(sys.argv) > 1:
+        # Headless study against a network recording (see fault_level_data.network_backend):
+        # start.py <recording.json> [input file]
+        app = ReplayNetwork.load(sys.argv[1])
+        main(app, sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        import powerfactory as pf
+        app = pf.GetApplication()
+        app.SetEnableUserBreak(1)
+        app.ClearOutputWindow()
 
-    with project_manager(app):
-        main(app)
+        with project_manager(app):
+            main(app)
 
     end = time.time()
     run_time = round(end - start, 6)
@@ -0,0 +1,101 @@
+"""Fixtures shared by the test modules"""
+from types import SimpleNamespace
+from device_data import eql_relay_data as re
+
+
+def make_relay(name='Test relay', pu=100, tms=0.2, min_fl=250, max_fl=3000, curve='SI', hiset="OFF", min_time="OFF",
+               hiset_2="OFF", min_time2="OFF", saturation=20, downstream=()):
+    """
+    Relay with the same OC and EF settings, and the attributes read by the trip time, grading and diagram functions.
+    """
+    settings = {'pu': pu, 'tms': tms, 'curve': curve, 'hiset': hiset, 'min_time': min_time, 'hiset2': hiset_2,
+                'min_time2': min_time2}
+    relset = SimpleNamespace(**{f'{element}_{key}': value for element in ('oc', 'ef')
+                                for key, value in settings.items()})
+    return SimpleNamespace(
+        name=name,
+        relset=relset,
+        cb_interrupt=0.05,
+        ct=SimpleNamespace(saturation=saturation, ect=5),
+        manufacturer=SimpleNamespace(timing_error=5, overshoot=0.05, safety_margin=0.1, technology='Digital'),
+        netdat=SimpleNamespace(min_pg_fl=min_fl, max_pg_fl=max_fl, tr_max_pg=min_fl * 2,
+                               downstream_devices=list(downstream), upstream_devices=[]),
+    )
+
+
+def make_grad_param():
+    return {
+        'Consider cold load pickup': 'Yes', 'Primary reach factor': 2, 'Back-up reach factor': 1.3,
+        'Primary slowest clearing time (s)': 2, 'Back-up slowest clearing time (s)': 10,
+        'Electro-mechanical relay': 0.4, 'Static relay': 0.3, 'Digital/numeric relay': 0.2, 'Fuse': 0.3,
+        'CB interrupt time': 0.05, 'Relay coordination optimization iterations': 100,
+        'Enter feeder rating and load forecast manually': 'No', 'Forecast feeder load (A)': 150,
+        'Feeder rating (A)': 400,
+    }
+
+
+def make_protection_relay(name, status='New'):
+    """Relay device as built by update_devices, without network data or settings"""
+    network = [11, 1, '', '', 0, 0, 0, 0, 0, '', 0, None, 0, 0, [], []]
+    return re.ProtectionRelay([name, re.REF615, 0.05], [status] + [''] * 14, network, [20, 5, 400])
+
+
+def feeder_recording() -> dict:
+    """
+    Recording of a small radial feeder:
+    FDR01 bus -- LN1 -- RC2 bus -- LN2 -- SP100 (200kVA)
+                                 \\- LN3 -- SP200 (315kVA)
+    The FDR01 CB is at FDR01 bus and the RC2 recloser at RC2 bus, protecting LN2.
+    """
+
+    objects = {}
+
+    def add(object_id, class_name, loc_name, attributes=None, references=None, calls=None):
+        objects[object_id] = {'class': class_name, 'loc_name': loc_name, 'attributes': attributes or {},
+                              'references': references or {}, 'calls': calls or {}}
+
+    add('X', 'ElmXnet', 'Grid', {'outserv': 0, 'ikss': 10, 'rntxn': 0.1, 'z2tz1': 1, 'x0tx1': 1, 'r0tx0': 0.1,
+                                 'ikssmin': 8, 'rntxnmin': 0.1, 'z2tz1min': 1, 'x0tx1min': 1, 'r0tx0min': 0.1})
+    terminals = {'T0': ('FDR01 bus', ['LN1a']), 'T1': ('RC2 bus', ['LN1b', 'LN2a', 'LN3a']),
+                 'T2': ('SP100', ['LN2b']), 'T3': ('SP200', ['LN3b'])}
+    for term, (name, cubicles) in terminals.items():
+        add(term, 'ElmTerm', name, {'iUsage': 1}, calls={'GetConnectedCubicles': cubicles})
+    add('C0', 'StaCubic', 'C0', references={'cterm': 'T0', 'obj_id': 'SW1'},
+        calls={'GetAll|1|0': ['LN1', 'T1', 'LN2', 'T2', 'L1', 'LN3', 'T3', 'L2'], 'GetAll|0|0': ['X']})
+    add('C1', 'StaCubic', 'C1', references={'cterm': 'T1', 'obj_id': 'SW2'},
+        calls={'GetAll|1|0': ['LN2', 'T2', 'L1'], 'GetAll|0|0': ['LN1', 'T0', 'X']})
+    add('SW1', 'ElmCoup', 'FDR01 CB', {'on_off': 1, 'outserv': 0}, {'bus1': 'C0', 'bus2': 'C0'})
+    add('SW2', 'ElmCoup', 'RC2 recloser', {'on_off': 1, 'outserv': 0}, {'bus1': 'C1', 'bus2': 'C1'})
+    for load, term, kva in (('L1', 'T2', 200), ('L2', 'T3', 315)):
+        add(f'C{load}', 'StaCubic', f'C{load}', references={'cterm': term, 'obj_id': load})
+        add(load, 'ElmLod', f'{load} load', {'Strat': kva, 'outserv': 0}, {'bus1': f'C{load}'})
+    for line, term_1, term_2 in (('LN1', 'T0', 'T1'), ('LN2', 'T1', 'T2'), ('LN3', 'T1', 'T3')):
+        add(f'{line}a', 'StaCubic', f'{line}a', references={'cterm': term_1, 'obj_id': line})
+        add(f'{line}b', 'StaCubic', f'{line}b', references={'cterm': term_2, 'obj_id': line})
+        end_terms = [term_1, term_2] if line == 'LN1' else [term_2]
+        add(line, 'ElmLne', line, {'outserv': 0, 'dline': 1.5, 'nlnum': 1},
+            {'bus1': f'{line}a', 'bus2': f'{line}b', 'typ_id': 'LT'},
+            {'GetConnectedElements': [term_1, term_2], 'GetConnectedElements|1|1|0': end_terms})
+    add('LT', 'TypLne', 'Mars 7/3.75 AAC', {'uline': 11, 'rline': 0.4, 'xline': 0.35, 'rline0': 0.55, 'xline0': 1.5})
+    add('F', 'ElmFeeder', 'FDR01', references={'obj_id': 'C0'},
+        calls={'GetAll': ['T0'], 'GetObjs|ElmLne': ['LN1', 'LN2', 'LN3']})
+
+    results = {}
+    for bound, factor in (('Max', 1), ('Min', 0.6)):
+        for f_type in ('Ground', 'Phase'):
+            results[f'{bound}|{f_type}'] = {
+                term: {'m:Ikss:A': factor * ka, 'm:Ikss:B': factor * ka * 0.87, 'm:Ikss': factor * ka}
+                for term, ka in (('T0', 5), ('T1', 3), ('T2', 2), ('T3', 1.5))
+            }
+            for line in ('LN2', 'LN3'):
+                for ppro in (1, 99):
+                    results[f'{bound}|{f_type}|{line}|{ppro}'] = {
+                        line: {f'm:Ikss:{bus}:{phase}': factor * 0.9 for bus in ('bus1', 'bus2') for phase in 'ABC'}
+                    }
+
+    return {
+        'objects': objects,
+        'calc_relevant': {'*.ElmCoup': ['SW1', 'SW2'], '*.StaSwitch': [], '*.ElmXnet': ['X']},
+        'feeders': ['F'],
+        'results': results,
+    }
@@ -0,0 +1,83 @@
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+import batch_study
+import save_dataframe
+from fault_level_data import fault_cache
+from relay_coordination import setting_checks as sc
+from fault_level_data.network_backend import ReplayNetwork
+from input_files import input_file
+from tests.helpers import feeder_recording, make_grad_param, make_protection_relay
+
+
+class TestRunStudyStages(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.environ = mock.patch.dict(os.environ, {'LOCALAPPDATA': self.cache_dir.name})
+        self.environ.start()
+
+    def tearDown(self):
+        self.environ.stop()
+        self.cache_dir.cleanup()
+        input_file.set_grading_parameters(make_grad_param())
+
+    def test_pickled_fault_level_job(self):
+        # Network stages as in network_job, against a recording in place of PowerFactory
+        grad_param = make_grad_param()
+        input_file.set_grading_parameters(grad_param)
+        import start
+
+        instructions = ['FDR01', 3]
+        app = ReplayNetwork(feeder_recording())
+        devices = [make_protection_relay('FDR01'), make_protection_relay('RC2')]
+        gen_info, all_devices, detailed_fls = start.network_stages(app, instructions, devices)
+        job = {'instructions': instructions, 'grad_param': grad_param, 'gen_info': gen_info,
+               'all_devices': all_devices, 'detailed_fls': fault_cache.capture(gen_info, all_devices, detailed_fls)}
+        job = pickle.loads(pickle.dumps(job))
+
+        # The worker sets the grading parameters of the job, whatever is set in the process
+        job['grad_param'] = dict(grad_param, **{'Relay coordination optimization iterations': 50.0,
+                                                'Detailed fault level files': 'CSV'})
+        input_file.clear_grading_parameters()
+        with mock.patch.object(save_dataframe, 'write_workbook') as write_workbook, \
+                mock.patch.object(save_dataframe, 'save_detailed_fls') as save_detailed_fls:
+            status = batch_study.run_study_stages(job)
+
+        self.assertEqual(status['Status'], 'Complete', status['Detail'])
+        self.assertEqual(input_file.grading_parameters().optimization_iter, 50)
+        filepath, _, study_type = write_workbook.call_args.args[:3]
+        self.assertIn('FDR01', filepath)
+        self.assertEqual(study_type, 'Fault level study only')
+        self.assertEqual(save_detailed_fls.call_args.args[3], ('csv',))
+
+    def test_iterations_of_each_job(self):
+        # Two feeders with different iteration counts studied in turn by the same worker
+        def failed_iteration(relays, triggers, percentage, f_type):
+            # Settings generation failing on every attempt permitted by setting_checks
+            with mock.patch.object(sc.gs, 'generate_ef_settings', return_value=False):
+                return [0, 0, 0, 0, 0, 0, sc.generate_settings([], percentage, 'EF', 'Exact')]
+
+        import start
+        notes = {}
+        for feeder, iterations in (('FDR01', 3), ('FDR02', 5)):
+            grad_param = dict(make_grad_param(), **{'Relay coordination optimization iterations': iterations})
+            job = {'instructions': [feeder, 4], 'grad_param': grad_param, 'gen_info': None,
+                   'all_devices': [make_protection_relay(feeder)], 'detailed_fls': None}
+            with mock.patch.object(start.dlr, 'get_load_rating'), \
+                    mock.patch.object(start.rc.slf, 'line_fuse_study', return_value={}), \
+                    mock.patch.object(sc, 'check_settings', side_effect=failed_iteration) as check_settings, \
+                    mock.patch.object(save_dataframe, 'save_dataframe') as save:
+                status = batch_study.run_study_stages(job)
+            self.assertEqual(status['Status'], 'Complete', status['Detail'])
+            self.assertEqual(check_settings.call_count, 2 * iterations)
+            notes[feeder] = save.call_args.args[4]['EF Setting Notes'][-1]
+
+        self.assertEqual(notes['FDR01'], "There were 3 failed EF setting interations out of a total of 3")
+        self.assertEqual(notes['FDR02'], "There were 5 failed EF setting interations out of a total of 5")
+
+
+if __name__ == '__main__':
+    unittest.main()
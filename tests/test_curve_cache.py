@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+from relay_coordination import curve_cache as cc
+from relay_coordination import trip_time as tt
+from tests.helpers import make_relay
+
+
+class TestCurveCache(unittest.TestCase):
+
+    def setUp(self):
+        cc.cache.clear()
+
+    def tearDown(self):
+        cc.cache.clear()
+        cc.cache.resize(64)
+
+    def test_populate_then_read(self):
+        ds_relay = make_relay('R2', 100, 0.1)
+        relay = make_relay('R1', 150, 0.3, downstream=[ds_relay])
+        cc.populate([relay], 'EF')
+        misses = cc.cache.misses
+        fault_levels, ds_trip, us_trip = cc.grading_curves(ds_relay, relay, 'EF')
+        cc.relay_curve(relay, 'EF')
+        self.assertEqual(cc.cache.misses, misses)
+        np.testing.assert_array_equal(us_trip, tt.relay_trip_time_array(relay, fault_levels, 'EF'))
+        np.testing.assert_array_equal(ds_trip, tt.relay_trip_time_array(ds_relay, fault_levels, 'EF'))
+
+    def test_settings_change_misses(self):
+        relay = make_relay('R1', 150, 0.3)
+        _, before = cc.relay_curve(relay, 'EF')
+        relay.relset.ef_tms = 0.4
+        _, after = cc.relay_curve(relay, 'EF')
+        # One samples array and a curve for each setting
+        self.assertEqual(len(cc.cache), 3)
+        self.assertTrue(np.all(after > before))
+
+    def test_size_bound(self):
+        cc.cache.resize(0.01)
+        for n in range(20):
+            cc.relay_curve(make_relay(f'R{n}', 100 + n, 0.1), 'EF')
+        self.assertLessEqual(cc.cache.nbytes, cc.cache.max_bytes)
+        self.assertGreater(len(cc.cache), 0)
+
+    def test_cached_arrays_are_read_only(self):
+        _, trip_times = cc.relay_curve(make_relay('R1', 150, 0.3), 'EF')
+        with self.assertRaises(ValueError):
+            trip_times[0] = 0
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import pandas as pd
+from input_files import data_inputs as di
+from relay_coordination import trip_time as tt
+
+
+class TestLoadTable(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.local = tempfile.TemporaryDirectory()
+        self.environ = mock.patch.dict(os.environ, {'LOCALAPPDATA': self.local.name})
+        self.environ.start()
+        self.path = Path(self.directory.name) / 'table.csv'
+        pd.DataFrame({'a': [1, 2]}).to_csv(self.path, index=False)
+        self.reads = 0
+        di.clear_tables()
+
+    def tearDown(self):
+        di.clear_tables()
+        self.environ.stop()
+        self.directory.cleanup()
+        self.local.cleanup()
+
+    def read(self, path):
+        self.reads += 1
+        return pd.read_csv(path)
+
+    def test_cache_file_kept_out_of_the_source_directory(self):
+        di._load_table(self.path, self.read)
+        self.assertEqual(os.listdir(self.directory.name), ['table.csv'])
+        cache_file = di._cache_file_path(self.path)
+        self.assertTrue(cache_file.is_relative_to(self.local.name))
+        self.assertTrue(cache_file.exists())
+
+    def test_cache_file_reused(self):
+        di._load_table(self.path, self.read)
+        di.clear_tables()
+        table = di._load_table(self.path, self.read)
+        self.assertEqual(self.reads, 1)
+        self.assertEqual(list(table['a']), [1, 2])
+
+    def test_touched_file_hashed_once(self):
+        di._load_table(self.path, self.read)
+        stat = self.path.stat()
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        with mock.patch.object(di, '_file_hash', wraps=di._file_hash) as file_hash:
+            di.clear_tables()
+            di._load_table(self.path, self.read)
+            di.clear_tables()
+            di._load_table(self.path, self.read)
+        # The content is unchanged, so the table is not read again, and the cache file takes the new mtime
+        self.assertEqual(self.reads, 1)
+        self.assertEqual(file_hash.call_count, 1)
+        with open(di._cache_file_path(self.path), 'rb') as file:
+            self.assertEqual(pickle.load(file)['mtime'], self.path.stat().st_mtime)
+
+    def test_changed_file_read(self):
+        di._load_table(self.path, self.read)
+        pd.DataFrame({'a': [3]}).to_csv(self.path, index=False)
+        stat = self.path.stat()
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        self.assertEqual(list(di._load_table(self.path, self.read)['a']), [3])
+        self.assertEqual(self.reads, 2)
+
+    def test_clear_tables_clears_fuse_curves(self):
+        saved = tt._line_fuse_curves, tt._grade_sheet_curves
+        try:
+            tt._line_fuse_curves = tt._grade_sheet_curves = {}
+            di.clear_tables()
+            self.assertIsNone(tt._line_fuse_curves)
+            self.assertIsNone(tt._grade_sheet_curves)
+        finally:
+            tt._line_fuse_curves, tt._grade_sheet_curves = saved
+
+
+if __name__ == '__main__':
+    unittest.main()
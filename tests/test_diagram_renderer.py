@@ -0,0 +1,52 @@
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+from grading_diagram import diagram_renderer as dr
+from relay_coordination import curve_cache as cc
+from tests.helpers import make_relay
+
+
+def make_feeder():
+    feeder_relay = make_relay('FDR01', 200, 0.3, 600, 8000, hiset=5000, min_time=0.05)
+    recloser = make_relay('RC1', 100, 0.1, 300, 3000)
+    feeder_relay.netdat.downstream_devices = [recloser]
+    # Links left as names by relay_coordination
+    recloser.netdat.upstream_devices = ['FDR01']
+    return [feeder_relay, recloser]
+
+
+class TestDiagramRenderer(unittest.TestCase):
+
+    def setUp(self):
+        cc.cache.clear()
+
+    def test_build_diagram(self):
+        diagram = dr.build_diagram('FDR01 EF', make_feeder(), 'EF')
+        self.assertEqual([curve[0] for curve in diagram.curves], ['FDR01', 'RC1'])
+        self.assertEqual(len(diagram.markers), 6)
+        self.assertEqual(len(diagram.margins), 1)
+        ds_name, us_name, fault_level, ds_time, us_time = diagram.margins[0]
+        self.assertEqual((ds_name, us_name), ('RC1', 'FDR01'))
+        self.assertTrue(300 <= fault_level <= 3000)
+        self.assertGreater(us_time, ds_time)
+
+    def test_svg(self):
+        svg = dr.render_svg(dr.build_diagram('FDR01 EF', make_feeder(), 'EF'))
+        root = ElementTree.fromstring(svg)
+        namespace = '{http://www.w3.org/2000/svg}'
+        self.assertGreaterEqual(len(root.findall(f'{namespace}polyline')), 2)
+        texts = [text.text for text in root.iter(f'{namespace}text')]
+        self.assertIn('FDR01 max', texts)
+        self.assertTrue(any(text.startswith('FDR01/RC1') for text in texts))
+
+    def test_render_diagrams_in_parallel(self):
+        diagrams = [dr.build_diagram(f'FDR0{n} EF', make_feeder(), 'EF') for n in range(3)]
+        with tempfile.TemporaryDirectory() as directory:
+            paths = dr.render_diagrams(diagrams, directory, workers=2)
+            self.assertEqual([path.name for path in paths], ['FDR00 EF.svg', 'FDR01 EF.svg', 'FDR02 EF.svg'])
+            self.assertTrue(all(Path(path).stat().st_size for path in paths))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+import numpy as np
+from fault_level_data import fault_cache, fault_data, fault_results
+from fault_level_data.network_backend import NetworkBackend, ReplayNetwork
+from tests.helpers import feeder_recording, make_grad_param, make_protection_relay
+
+
+class TestSectionMap(unittest.TestCase):
+
+    def test_nested_sections(self):
+        # FDR: T0 -> T1 (RC) -> T2, T3 (RC2 at T3)
+        devices_terms = {'T0': ['T0', 'T1', 'T2', 'T3', 'T4'], 'T1': ['T1', 'T2', 'T3', 'T4'], 'T3': ['T3', 'T4']}
+        term_device, device_terms = fault_data.section_map(devices_terms)
+        self.assertEqual(term_device, {'T0': 'T0', 'T1': 'T1', 'T2': 'T1', 'T3': 'T3', 'T4': 'T3'})
+        # Device terminals also bound the section upstream of them
+        self.assertEqual(device_terms, {'T0': ['T0', 'T1'], 'T1': ['T1', 'T2', 'T3'], 'T3': ['T3', 'T4']})
+
+
+class TestSiteIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.terms = {name: SimpleNamespace(loc_name=name) for name in ('FDR01 bus', 'RC2 bus', 'SP100')}
+        self.feeder_relay, self.recloser = make_protection_relay('FDR01'), make_protection_relay('RC2')
+        site_name_map = {
+            'FDR01': {'C0': self.terms['FDR01 bus']},
+            'RC2': {'C1': self.terms['RC2 bus'], 'C2': self.terms['SP100']},
+            # Sites without a device are left out
+            'RC9': {'C9': SimpleNamespace(loc_name='RC9 bus')},
+        }
+        self.index = fault_data.SiteIndex(site_name_map, [self.feeder_relay, self.recloser, make_protection_relay('RC2')])
+
+    def test_device(self):
+        self.assertIs(self.index.device(self.terms['FDR01 bus']), self.feeder_relay)
+        # Terminals are matched by name, and the first device of a name is used
+        self.assertIs(self.index.device(SimpleNamespace(loc_name='RC2 bus')), self.recloser)
+        self.assertIs(self.index.device(self.terms['SP100']), self.recloser)
+        self.assertIsNone(self.index.device(SimpleNamespace(loc_name='RC9 bus')))
+
+    def test_site(self):
+        self.assertEqual(self.index.site(self.feeder_relay), ('C0', self.terms['FDR01 bus']))
+        # The first cubicle of the site
+        self.assertEqual(self.index.site(self.recloser), ('C1', self.terms['RC2 bus']))
+        self.assertIsNone(self.index.site(make_protection_relay('FDR01')))
+
+
+class TestFaultLevelTable(unittest.TestCase):
+
+    def test_section_bound(self):
+        # Section bounds match sect_fl_bound, including ties and zero fault levels
+        rng = random.Random(0)
+        terminals = [f'T{i}' for i in range(12)]
+        values = np.array([[rng.choice([0, 1000, 1500, 2000]) for _ in range(4)] for _ in terminals], dtype=float)
+        rows = {f'D{i}': np.array(rng.sample(range(12), rng.randint(1, 6))) for i in range(20)}
+        table = fault_results.FaultLevelTable(terminals, values, {'sections': rows})
+        for bound in ('Max', 'Min'):
+            for f_type in ('Ground', 'Phase'):
+                expected = fault_data.sect_fl_bound(table.results(bound, f_type), bound)
+                self.assertEqual(table.section_bound(bound, f_type), expected)
+
+    def test_missing_results_skipped(self):
+        values = np.array([[np.nan] * 4, [1200] * 4, [800] * 4, [np.nan] * 4, [0] * 4])
+        groups = {'sections': {'D0': np.array([0, 1, 2]), 'D1': np.array([3, 4])}}
+        table = fault_results.FaultLevelTable(['T0', 'T1', 'T2', 'T3', 'T4'], values, groups)
+        self.assertEqual(table.section_bound('Max', 'Ground'), {'D0': {'T1': 1200}, 'D1': 'no terminations'})
+        self.assertEqual(table.section_bound('Min', 'Phase'), {'D0': {'T2': 800}, 'D1': 'no terminations'})
+
+
+class TestFaultStudyReplay(unittest.TestCase):
+
+    def setUp(self):
+        # Topology and fault level cache files
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.environ = mock.patch.dict(os.environ, {'LOCALAPPDATA': self.cache_dir.name})
+        self.environ.start()
+        self.app = ReplayNetwork(feeder_recording())
+        self.feeder_relay = make_protection_relay('FDR01')
+        self.recloser = make_protection_relay('RC2')
+        self.gen_info, self.all_devices, self.detailed_fls = fault_data.fault_study(
+            self.app, [self.feeder_relay, self.recloser], 'FDR01')
+
+    def tearDown(self):
+        self.environ.stop()
+        self.cache_dir.cleanup()
+
+    def test_device_links(self):
+        self.assertEqual(self.feeder_relay.netdat.downstream_devices, [self.recloser])
+        self.assertEqual(self.recloser.netdat.upstream_devices, [self.feeder_relay])
+
+    def test_fault_levels(self):
+        self.assertEqual(self.feeder_relay.netdat.max_pg_fl, 5000)
+        self.assertEqual(self.feeder_relay.netdat.min_pg_fl, 900)
+        self.assertEqual(self.recloser.netdat.max_3p_fl, 3000)
+        self.assertEqual(self.recloser.netdat.min_2p_fl, 1044)
+
+    def test_transformer_data(self):
+        self.assertEqual(self.feeder_relay.netdat.tr_max_name, 'SP200')
+        self.assertEqual(self.feeder_relay.netdat.max_tr_fuse, '25K')
+        self.assertEqual(self.recloser.netdat.max_tr_size, 200)
+        self.assertEqual(self.feeder_relay.netdat.ds_capacity, 27)
+
+    def test_gen_info(self):
+        self.assertEqual(self.gen_info[0], 'FDR01')
+        self.assertEqual(self.gen_info[1]['Grid Maximum'][0], 10)
+
+    def test_backend_interface(self):
+        self.assertIsInstance(self.app, NetworkBackend)
+
+        class PartialBackend(NetworkBackend):
+            def PrintPlain(self, message):
+                pass
+
+        with self.assertRaises(TypeError):
+            PartialBackend()
+
+
+class TestHeadlessStart(unittest.TestCase):
+    """start.py <recording.json> [input file]"""
+
+    def test_import_without_input_file(self):
+        # The study modules are imported before the input file is read
+        with tempfile.TemporaryDirectory() as home:
+            result = subprocess.run([sys.executable, '-c', 'import start'], cwd=Path(__file__).parents[1],
+                                    env=dict(os.environ, HOME=home, USERPROFILE=home), capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_input_path(self):
+        import start
+        grad_param = make_grad_param()
+        devices = [make_protection_relay('FDR01'), make_protection_relay('RC2')]
+        inputs = (['FDR01', 3], {}, grad_param)
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                mock.patch.dict(os.environ, {'LOCALAPPDATA': cache_dir}), \
+                mock.patch.object(start.input_file, 'get_input', return_value=inputs) as get_input, \
+                mock.patch.object(start.input_file, 'update_devices', return_value=devices), \
+                mock.patch.object(start.dv, 'validate_data'), \
+                mock.patch.object(start.save, 'save_dataframe') as save:
+            start.main(ReplayNetwork(feeder_recording()), 'FDR01 input file.xlsm')
+        get_input.assert_called_once_with('FDR01 input file.xlsm')
+        study_type, gen_info, all_devices = save.call_args.args[1:4]
+        self.assertEqual((study_type, gen_info[0]), (3, 'FDR01'))
+        self.assertEqual(all_devices[0].netdat.max_pg_fl, 5000)
+
+
+class TestFaultLevelCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.environ = mock.patch.dict(os.environ, {'LOCALAPPDATA': self.cache_dir.name})
+        self.environ.start()
+        self.app = ReplayNetwork(feeder_recording())
+
+    def tearDown(self):
+        self.environ.stop()
+        self.cache_dir.cleanup()
+
+    def fault_study(self):
+        devices = [make_protection_relay('FDR01'), make_protection_relay('RC2')]
+        gen_info, all_devices, detailed_fls = fault_data.fault_study(self.app, devices, 'FDR01')
+        return devices, gen_info, detailed_fls
+
+    def test_unchanged_inputs(self):
+        devices, gen_info, detailed_fls = self.fault_study()
+
+        def short_circuit(*args):
+            raise AssertionError("Short-circuit calculation run with unchanged inputs")
+
+        self.app.short_circuit = short_circuit
+        cached_devices, cached_gen_info, cached_fls = self.fault_study()
+        self.assertEqual(cached_gen_info, gen_info)
+        for device, cached in zip(devices, cached_devices):
+            self.assertEqual(cached.netdat.max_pg_fl, device.netdat.max_pg_fl)
+            self.assertEqual(cached.netdat.tr_max_name, device.netdat.tr_max_name)
+            self.assertEqual([ds.name for ds in cached.netdat.downstream_devices],
+                             [ds.name for ds in device.netdat.downstream_devices])
+        self.assertEqual([{term.loc_name: fl for term, fl in terms.items()} for terms in cached_fls[0].values()],
+                         [{term.loc_name: fl for term, fl in terms.items()} for terms in detailed_fls[0].values()])
+
+    def test_switch_operation(self):
+        self.fault_study()
+        self.app.obj('SW2')._attributes['on_off'] = 0
+        calls = []
+        short_circuit = self.app.short_circuit
+        self.app.short_circuit = lambda *args: calls.append(args) or short_circuit(*args)
+        self.fault_study()
+        self.assertTrue(calls)
+
+    def test_electrical_parameters(self):
+        feeder = self.app.obj('F')
+        feeder._calls['GetAll'] = ['T0', 'LN1', 'T1', 'LN2', 'T2', 'L1', 'LN3', 'T3', 'L2']
+
+        def key():
+            return fault_cache.study_key(self.app, feeder, [make_protection_relay('FDR01')], {}, {})
+
+        unchanged = key()
+        self.assertEqual(key(), unchanged)
+        # Line length, conductor impedance and load changes all change the fault levels or the saved results
+        for object_id, attribute, value in (('LN2', 'dline', 3.0), ('LT', 'rline', 0.6), ('L1', 'Strat', 315)):
+            with self.subTest(attribute=attribute):
+                attributes = self.app.obj(object_id)._attributes
+                original = attributes[attribute]
+                attributes[attribute] = value
+                self.assertNotEqual(key(), unchanged)
+                attributes[attribute] = original
+                self.assertEqual(key(), unchanged)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import numpy as np
+import pandas as pd
+from device_data import fuse_curves as fc
+
+
+def make_table():
+    # Fuse data table layout, with the shorter curve padded with blank cells as in the EQL fuse data CSV
+    return pd.DataFrame({
+        '16KminI': [40, 80, 400, ''], '16KminT': [100, 10, 0.1, ''],
+        '16KtotI': [50, 100, 500, ' '], '16KtotT': [200, 20, 0.2, ' '],
+        '25KminI': [60, 120, 600, 1200], '25KminT': [300, 30, 0.3, 0.05],
+    })
+
+
+class TestFuseCurve(unittest.TestCase):
+
+    def setUp(self):
+        self.curves = fc.bound_curves(make_table())
+
+    def test_blank_cells_dropped(self):
+        self.assertEqual(list(self.curves), ['16K', '25K'])
+        np.testing.assert_allclose(self.curves['16K'].min.currents, [40, 80, 400])
+        # No total clearing columns: the min curve is used for both bounds
+        self.assertIs(self.curves['25K'].total, self.curves['25K'].min)
+
+    def test_log_log_interpolation(self):
+        curve = self.curves['16K']
+        # Geometric mean of the currents gives the geometric mean of the times
+        self.assertAlmostEqual(curve.time(np.sqrt(40 * 80)), np.sqrt(100 * 10))
+        self.assertAlmostEqual(curve.current(np.sqrt(10 * 0.1)), np.sqrt(80 * 400))
+        self.assertAlmostEqual(curve.time(100, 'Max'), 20)
+        np.testing.assert_allclose(curve.time([40, 80, 400]), [100, 10, 0.1])
+
+    def test_outside_curve(self):
+        curve = self.curves['16K']
+        self.assertEqual(curve.time(10), 100)
+        self.assertEqual(curve.time(1000), 0.1)
+        self.assertTrue(np.isnan(curve.time(10, clip=False)))
+        self.assertTrue(np.all(np.isnan(curve.current([1000, 0.01], clip=False))))
+        self.assertTrue(np.isnan(curve.time(0, clip=False)))
+
+    def test_no_valid_points(self):
+        with self.assertRaises(ValueError):
+            fc.FuseCurve('blank', ([np.nan, 10], [5, -1]))
+
+
+class TestCurveStack(unittest.TestCase):
+
+    def setUp(self):
+        self.curves = list(fc.bound_curves(make_table()).values())
+
+    def test_matches_single_curves(self):
+        currents = np.array([[10, 40, 50, 80], [300, 400, 600, 1200], [1500, 0, 61.5, 1000]])
+        times = np.array([500, 100, 20, 0.3, 0.1, 0.05, 0.01])
+        for bound in ('Min', 'Max'):
+            stack = fc.CurveStack(self.curves, bound)
+            stack_times = stack.time(currents)
+            stack_currents = stack.current(times)
+            self.assertEqual(stack_times.shape, (2, 3, 4))
+            for row, curve in enumerate(self.curves):
+                np.testing.assert_allclose(stack_times[row], curve.time(currents, bound, clip=False), rtol=1e-12)
+                np.testing.assert_allclose(stack_currents[row], curve.current(times, bound, clip=False), rtol=1e-12)
+
+    def test_scalar(self):
+        stack = fc.CurveStack(self.curves, 'Min')
+        np.testing.assert_allclose(stack.time(80.0), [10, self.curves[1].time(80.0)])
+        self.assertTrue(np.isnan(stack.time(1000.0)[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
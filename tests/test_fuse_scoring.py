@@ -0,0 +1,118 @@
+import math
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from device_data import fuse_curves as fc
+from input_files import data_inputs as di
+from line_fuse_study import fuse_scoring as fs
+from relay_coordination import trip_time as tt
+from tests.helpers import make_relay
+
+
+def make_curves():
+    # Candidate curves scaled from one shape, larger fuses melting at higher currents
+    currents = np.geomspace(1, 40, 20)
+    times = 600 / currents ** 2.5
+    curves = {}
+    for size, name in enumerate(fs.candidate_fuses, start=1):
+        scale = 4 * size ** 1.5
+        curves[name] = fc.FuseCurve(name, (currents * scale, times), (currents * scale * 1.3, times * 1.2))
+    return curves
+
+
+def make_fuse(name, load, ds_capacity, upstream=None):
+    netdat = SimpleNamespace(
+        load=load, ds_capacity=ds_capacity, max_3p_fl=3000, max_pg_fl=2000, min_2p_fl=400, min_pg_fl=300,
+        tr_max_3p=1500, tr_max_pg=900, upstream_devices=[upstream] if upstream else []
+    )
+    return SimpleNamespace(name=name, relset=SimpleNamespace(status='Required', rating=None), netdat=netdat)
+
+
+def reference_values(cand, fuse):
+    """Criteria values of one candidate from the scalar curve lookups"""
+
+    def melt(current):
+        return tt.line_fuse_curves()[cand].time(current, 'Min', clip=False)
+
+    def clear(current):
+        return tt.line_fuse_curves()[cand].time(current, 'Max', clip=False)
+
+    net = fuse.netdat
+    tr_max_2p = net.tr_max_3p * math.sqrt(3) / 2
+    values = [
+        melt(25 * net.ds_capacity), melt(12 * net.ds_capacity), melt(6 * net.load), melt(3 * net.load),
+        tt.line_fuse_curves()[cand].current(300, 'Min', clip=False),
+        clear(net.tr_max_3p) / melt(net.tr_max_3p), clear(tr_max_2p) / melt(tr_max_2p),
+        clear(net.tr_max_pg) / melt(net.tr_max_pg), clear(net.min_2p_fl), clear(net.min_pg_fl),
+    ]
+    if net.upstream_devices:
+        relay = net.upstream_devices[0]
+        values += [tt.relay_trip_time(relay, net.max_3p_fl, 'OC') - clear(net.max_3p_fl),
+                   tt.relay_trip_time(relay, net.max_pg_fl, 'EF') - clear(net.max_pg_fl)]
+    else:
+        values += [math.nan, math.nan]
+    return values
+
+
+class TestFuseScoring(unittest.TestCase):
+
+    def setUp(self):
+        self.saved_curves = tt._line_fuse_curves
+        tt._line_fuse_curves = make_curves()
+        fs.clear_stacks()
+        self.fuses = [
+            make_fuse('F1', load=10, ds_capacity=5, upstream=make_relay()),
+            make_fuse('F2', load=60, ds_capacity=40),
+            make_fuse('F3', load=200, ds_capacity=100, upstream=make_relay()),
+        ]
+
+    def tearDown(self):
+        tt._line_fuse_curves = self.saved_curves
+        fs.clear_stacks()
+
+    def test_values_match_scalar_lookups(self):
+        scores = fs.score_fuses(self.fuses, fuse_grading=0.3)
+        self.assertEqual(scores.values.shape, (3, len(fs.candidate_fuses), len(fs.criteria)))
+        for i, fuse in enumerate(self.fuses):
+            for j, cand in enumerate(fs.candidate_fuses):
+                np.testing.assert_allclose(scores.values[i, j], reference_values(cand, fuse), rtol=1e-9)
+
+    def test_selection_is_smallest_best_candidate(self):
+        scores = fs.score_fuses(self.fuses, fuse_grading=0.3)
+        for i in range(len(self.fuses)):
+            best = scores.totals[i].max()
+            self.assertEqual(scores.selection[i], scores.candidates[list(scores.totals[i]).index(best)])
+        # A larger load needs a larger fuse
+        sizes = [fs.candidate_fuses[name] for name in scores.selection]
+        self.assertLessEqual(sizes[0], sizes[2])
+
+    def test_upstream_grading_margin(self):
+        scores = fs.score_fuses(self.fuses, fuse_grading=0.3)
+        margins = scores.values[0, :, 10:]
+        self.assertTrue(np.isfinite(margins).any())
+        # The upstream relay grades with a candidate at exactly the required margin, but not just above it
+        for j, k in zip(*np.nonzero(np.isfinite(margins))):
+            margin = margins[j, k]
+            with self.subTest(candidate=scores.candidates[j], criterion=k):
+                self.assertTrue(fs.score_fuses(self.fuses, fuse_grading=margin).scores[0, j, 10 + k])
+                self.assertFalse(fs.score_fuses(self.fuses, fuse_grading=margin + 1e-6).scores[0, j, 10 + k])
+
+    def test_missing_data_fails_criteria(self):
+        fuse = make_fuse('F4', load=10, ds_capacity=None)
+        scores = fs.score_fuses([fuse], fuse_grading=0.3)
+        self.assertTrue(np.isnan(scores.values[0, :, :2]).all())
+        self.assertFalse(scores.scores[0, :, :2].any())
+        self.assertFalse(scores.scores[0, :, 10:].any())
+
+    def test_stacks_cleared_with_tables(self):
+        fs.candidate_stack('Min')
+        di.clear_tables()
+        self.assertEqual(fs._stacks, {})
+
+    def test_no_fuses(self):
+        scores = fs.score_fuses([], fuse_grading=0.3)
+        self.assertEqual(scores.selection, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from unittest import mock
+import numpy as np
+from relay_coordination import grading_margins as gm
+from relay_coordination import trip_time as tt
+from tests.helpers import make_relay
+
+
+class TestMinGradingMargin(unittest.TestCase):
+    """The breakpoint search finds the same worst case as evaluating every 1A step"""
+
+    def assert_search_matches_dense(self, ds_relay, us_relay):
+        # Every 1A step
+        fault_levels = tt.fault_range(ds_relay.netdat.min_pg_fl, ds_relay.netdat.max_pg_fl)
+        trip_ds = tt.relay_trip_time_array(ds_relay, fault_levels, 'EF')
+        margins = (tt.relay_trip_time_array(us_relay, fault_levels, 'EF') - trip_ds
+                   - gm._grading_required(ds_relay, trip_ds, 'Exact'))
+        worst = int(np.argmin(margins))
+        search = gm.min_grading_margin(ds_relay, us_relay, 'EF', 'Exact')
+        self.assertAlmostEqual(search[0], margins[worst])
+        self.assertEqual(search[1], fault_levels[worst])
+
+    def test_idmt_curves(self):
+        self.assert_search_matches_dense(make_relay(pu=100, tms=0.1), make_relay(pu=150, tms=0.3))
+
+    def test_hisets(self):
+        ds_relay = make_relay(pu=100, tms=0.1, hiset=1200, min_time=0.05, max_fl=20000)
+        us_relay = make_relay(pu=200, tms=0.3, hiset=2500, min_time=0.3, hiset_2=6000, min_time2=0.05, saturation=10)
+        self.assert_search_matches_dense(ds_relay, us_relay)
+
+    def test_worst_case_location(self):
+        # The upstream hiset 2 undercuts the downstream curve above 6000A
+        ds_relay = make_relay(pu=100, tms=0.1, max_fl=20000)
+        us_relay = make_relay(pu=200, tms=0.3, hiset=6000, min_time=0.05)
+        margin, fault_level = gm.min_grading_margin(ds_relay, us_relay, 'EF', 'Exact')
+        self.assertLess(margin, 0)
+        self.assertGreaterEqual(fault_level, 6000)
+
+    def test_short_range(self):
+        self.assert_search_matches_dense(make_relay(pu=100, tms=0.1, max_fl=400), make_relay(pu=150, tms=0.3))
+
+    def test_few_steps(self):
+        ds_relay = make_relay(pu=100, tms=0.1, min_fl=250.5, max_fl=260)
+        self.assert_search_matches_dense(ds_relay, make_relay(pu=150, tms=0.3))
+
+    def test_points_evaluated(self):
+        # Far fewer points than the 1A steps of the range
+        ds_relay = make_relay(pu=100, tms=0.1, hiset=1200, min_time=0.05, max_fl=200000)
+        us_relay = make_relay(pu=200, tms=0.3, hiset=2500, min_time=0.3)
+        with mock.patch.object(tt, 'relay_trip_time_array', wraps=tt.relay_trip_time_array) as trip_time:
+            gm.min_grading_margin(ds_relay, us_relay, 'EF', 'Exact')
+        points = sum(len(call.args[1]) for call in trip_time.call_args_list if call.args[0] is ds_relay)
+        self.assertLess(points, 10000)
+
+    def test_empty_range(self):
+        ds_relay = make_relay(pu=100, tms=0.1, min_fl=250.5, max_fl=250)
+        us_relay = make_relay(pu=150, tms=0.3)
+        self.assertEqual(gm.min_grading_margin(ds_relay, us_relay, 'EF', 'Exact'), (float('inf'), None))
+
+
+if __name__ == '__main__':
+    unittest.main()
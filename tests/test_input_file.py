@@ -0,0 +1,75 @@
+import unittest
+from types import SimpleNamespace
+from input_files import input_file
+from tests.helpers import make_grad_param
+
+
+def make_device(name, downstream, upstream):
+    return SimpleNamespace(name=name, netdat=SimpleNamespace(downstream_devices=downstream, upstream_devices=upstream))
+
+
+class TestLinkDevices(unittest.TestCase):
+
+    def setUp(self):
+        self.feeder = make_device('FDR01', ['RC1', 'FU1'], [None])
+        self.recloser = make_device('RC1', ['FU1', 'RC9'], ['FDR01'])
+        self.fuse = make_device('FU1', [None], ['RC1', 'FDR01', 'FU1'])
+        self.all_devices = [self.feeder, self.recloser, self.fuse]
+
+    def test_adjacency(self):
+        downstream, upstream, _ = input_file.device_adjacency(self.all_devices)
+        self.assertEqual(downstream, [[1, 2], [2], []])
+        # The device itself is excluded, and devices are in all_devices order
+        self.assertEqual(upstream, [[], [0], [0, 1]])
+
+    def test_link_devices(self):
+        unresolved = input_file.link_devices(self.all_devices)
+        self.assertEqual(unresolved, ['RC9 (RC1)'])
+        self.assertEqual(self.feeder.netdat.downstream_devices, [self.recloser, self.fuse])
+        self.assertEqual(self.fuse.netdat.upstream_devices, [self.feeder, self.recloser])
+        self.assertEqual(self.feeder.netdat.upstream_devices, [])
+
+
+class TestGradingParameters(unittest.TestCase):
+
+    def setUp(self):
+        self.params = input_file.GradingParameters(make_grad_param())
+
+    def test_scope_reverts_relaxations(self):
+        with self.params.scope():
+            self.params.relax(fuse_grading=-0.15, pri_reach_factor=-0.5)
+            self.params.relax(fuse_grading=-0.05)
+            self.assertAlmostEqual(self.params.fuse_grading, 0.1)
+            self.assertAlmostEqual(self.params.pri_reach_factor, 1.5)
+        self.assertEqual(self.params.fuse_grading, 0.3)
+        self.assertEqual(self.params.pri_reach_factor, 2)
+        self.assertEqual(self.params._overrides, [])
+
+    def test_scope_reverts_on_exception(self):
+        with self.assertRaises(RuntimeError):
+            with self.params.scope():
+                self.params.relax(bu_slowest_clear=5)
+                raise RuntimeError
+        self.assertEqual(self.params.bu_slowest_clear, 10)
+
+    def test_nested_scopes(self):
+        with self.params.scope():
+            self.params.relax(fuse_grading=-0.1)
+            with self.params.scope():
+                self.params.relax(fuse_grading=-0.1)
+                self.assertAlmostEqual(self.params.fuse_grading, 0.1)
+            # Only the inner relaxation is reverted
+            self.assertAlmostEqual(self.params.fuse_grading, 0.2)
+        self.assertEqual(self.params.fuse_grading, 0.3)
+
+
+class TestSideOutputFormats(unittest.TestCase):
+
+    def test_formats(self):
+        self.assertEqual(input_file.side_output_formats(make_grad_param()), ())
+        grad_param = dict(make_grad_param(), **{'Detailed fault level files': ' Parquet, csv '})
+        self.assertEqual(input_file.side_output_formats(grad_param), ('parquet', 'csv'))
+
+
+if __name__ == '__main__':
+    unittest.main()
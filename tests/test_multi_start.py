@@ -0,0 +1,83 @@
+import multiprocessing
+import random
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from unittest import mock
+from input_files import input_file
+from relay_coordination import relay_coord as rc
+from relay_coordination import multi_start as ms
+from tests.helpers import make_grad_param, make_protection_relay
+
+
+def random_chain(all_devices, f_type):
+    """Stand-in for rc.best_relays whose settings depend only on the random state"""
+    relays = [device for device in all_devices if hasattr(device, 'cb_interrupt')]
+    for relay in relays:
+        if f_type == 'EF':
+            relay.relset.ef_pu = round(random.uniform(50, 200))
+            relay.relset.ef_tms = round(random.uniform(0.05, 0.5), 2)
+        else:
+            relay.relset.oc_pu = round(random.uniform(200, 400))
+            relay.relset.oc_tms = round(random.uniform(0.05, 0.5), 2)
+        relay.relset.status = 'New'
+    total = sum(relay.relset.ef_pu if f_type == 'EF' else relay.relset.oc_pu for relay in relays)
+    return total, relays, [0] * 7, 0
+
+
+@unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), "Workers inherit the stand-in chain by fork")
+class TestMultiStart(unittest.TestCase):
+
+    def setUp(self):
+        # Passed to the workers
+        input_file.set_grading_parameters(make_grad_param())
+
+    def run_chains(self, seed):
+        relays = [make_protection_relay('FDR01', 'Required'), make_protection_relay('RC1', 'Required')]
+        executor = partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('fork'))
+        with mock.patch.object(rc, 'best_relays', random_chain), mock.patch.object(ms, 'ProcessPoolExecutor', executor):
+            best, results = ms.best_relays(relays, chains=2, workers=2, seed=seed)
+        return [vars(relay.relset) for relay in best], results
+
+    def test_seeded_run_is_reproducible(self):
+        settings, results = self.run_chains(seed=7)
+        self.assertEqual(self.run_chains(seed=7), (settings, results))
+        # Chains seeded 7 and 8 against chains seeded 100 and 101
+        self.assertNotEqual(self.run_chains(seed=100)[1], results)
+
+    def test_best_chain_applied(self):
+        settings, results = self.run_chains(seed=7)
+        # Each element takes the chain with the lowest total, seeded with seed + n
+        for f_type, pu in (('EF', 'ef_pu'), ('OC', 'oc_pu')):
+            totals = []
+            for n in range(2):
+                random.seed(7 + n)
+                relays = [make_protection_relay('FDR01', 'Required'), make_protection_relay('RC1', 'Required')]
+                totals.append(random_chain(relays, f_type)[0])
+            self.assertEqual(results[f_type][0], min(totals))
+            self.assertEqual(sum(relay[pu] for relay in settings), min(totals))
+        self.assertTrue(all(relay['status'] == 'New' for relay in settings))
+
+    def test_sequential_without_interpreter(self):
+        # Inside PowerFactory sys.executable is the PowerFactory host, which cannot start worker processes
+        relays = [make_protection_relay('FDR01', 'Required'), make_protection_relay('RC1', 'Required')]
+        with mock.patch.object(rc, 'best_relays', random_chain), mock.patch.object(ms, 'ProcessPoolExecutor') as pool, \
+                mock.patch.object(ms.sys, 'executable', r'C:\Program Files\DIgSILENT\PowerFactory.exe'):
+            best, results = ms.best_relays(relays, chains=2, workers=2, seed=7)
+        pool.assert_not_called()
+        self.assertEqual(([vars(relay.relset) for relay in best], results), self.run_chains(seed=7))
+
+
+class TestChainsParameter(unittest.TestCase):
+
+    def test_default_single_chain(self):
+        self.assertEqual(input_file.GradingParameters(make_grad_param()).optimization_chains, 1)
+
+    def test_chains_from_grading_parameters(self):
+        grad_param = make_grad_param()
+        grad_param['Relay coordination optimization chains'] = 4.0
+        self.assertEqual(input_file.GradingParameters(grad_param).optimization_chains, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from unittest import mock
+from relay_coordination import relay_coord as rc
+from relay_coordination import trip_time as tt
+from tests.helpers import make_relay
+
+
+class TestObjectiveFunction(unittest.TestCase):
+
+    def setUp(self):
+        self.relays = [
+            make_relay('FDR01', 120, 0.3, 400, 6000),
+            make_relay('RC1', 80, 0.2, 300, 3000),
+            make_relay('RC2', 60, 0.1, 200, 1500),
+        ]
+
+    def test_cached_contributions_match_full_recompute(self):
+        contributions = {}
+        rc.objective_function(self.relays, 'EF', contributions)
+        self.relays[1].relset.ef_tms = 0.25
+        with mock.patch.object(tt, 'relay_trip_time_integral', wraps=tt.relay_trip_time_integral) as integral:
+            cached = rc.objective_function(self.relays, 'EF', contributions)
+        # Only the changed relay is evaluated again
+        self.assertEqual(integral.call_count, 1)
+        self.assertEqual(cached, rc.objective_function(self.relays, 'EF'))
+        self.assertEqual(len(contributions), 4)
+
+    def test_fault_level_change_evaluated(self):
+        contributions = {}
+        before = rc.objective_function(self.relays, 'EF', contributions)
+        self.relays[2].netdat.max_pg_fl = 2500
+        after = rc.objective_function(self.relays, 'EF', contributions)
+        self.assertNotEqual(before, after)
+        self.assertEqual(after, rc.objective_function(self.relays, 'EF'))
+
+
+if __name__ == '__main__':
+    unittest.main()
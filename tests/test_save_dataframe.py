@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+import save_dataframe as save
+
+
+def make_dfls(device, terminals):
+    return pd.DataFrame({
+        'Tfmr Size (kVA)': [500 if n % 2 else '' for n in range(len(terminals))],
+        device: terminals,
+        'Max PG fault': np.linspace(1000, 2000, len(terminals)),
+        'Max 3P fault': np.linspace(1500, 2500, len(terminals)),
+        'Min PG fault': np.linspace(500, 900, len(terminals)),
+        'Min 2P fault': [np.nan] + list(np.linspace(600, 800, len(terminals) - 1)),
+    })
+
+
+class TestWriteWorkbook(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'results.xlsx'
+        self.grid_data = pd.DataFrame({'Parameter': ['Max 3P', 'Max PG'], 'GRID': [np.float64(12.5), 9.25]})
+        self.study_results = pd.DataFrame({'Site Name': ['Voltage (kV)', 'load (A)'], 'RC1': [11, 'a long value']})
+        self.dfls = [make_dfls('RC1', ['T1', 'T2', 'T3']), make_dfls('RC2', ['T4', 'Terminal 5'])]
+        save.write_workbook(self.path, 'FDR01', 'Fault level study only', '20240101-120000', self.grid_data,
+                            self.study_results, self.dfls)
+        self.workbook = load_workbook(self.path)
+
+    def tearDown(self):
+        self.workbook.close()
+        self.directory.cleanup()
+
+    def test_layout(self):
+        general = self.workbook['General Information']
+        self.assertEqual(general['A1'].value, 'FDR01')
+        self.assertEqual(general['A5'].value, '20240101-120000')
+        self.assertEqual(general['A8'].value, 'External Grid Data:')
+        self.assertEqual([general['A10'].value, general['B10'].value, general['B11'].value], ['Parameter', 'GRID', 12.5])
+        self.assertTrue(general['A10'].font.bold)
+
+        detailed = self.workbook['Detailed Fault Levels']
+        self.assertEqual([detailed['B1'].value, detailed['H1'].value], ['RC1', 'RC2'])
+        self.assertEqual([detailed['B4'].value, detailed['H3'].value, detailed['H4'].value], ['T3', 'Terminal 5', None])
+        # nan and blank values are empty cells
+        self.assertIsNone(detailed['F2'].value)
+        self.assertIsNone(detailed['A2'].value)
+        self.assertEqual(detailed['A3'].value, 500)
+
+    def test_matches_pandas(self):
+        results = pd.read_excel(self.path, sheet_name='Study Results')
+        pd.testing.assert_frame_equal(results, self.study_results, check_dtype=False)
+        detailed = pd.read_excel(self.path, sheet_name='Detailed Fault Levels', usecols='G:L', nrows=2)
+        # read_excel renames the repeated column names of the second device
+        detailed.columns = self.dfls[1].columns
+        pd.testing.assert_frame_equal(detailed.fillna(''), self.dfls[1].fillna(''), check_dtype=False)
+
+    def test_column_widths(self):
+        results = self.workbook['Study Results']
+        self.assertEqual(results.column_dimensions['A'].width, len('Voltage (kV)') + 2)
+        self.assertEqual(results.column_dimensions['B'].width, len('a long value') + 2)
+        detailed = self.workbook['Detailed Fault Levels']
+        self.assertEqual(detailed.column_dimensions['H'].width, len('Terminal 5') + 2)
+
+    def test_side_outputs(self):
+        app = SimpleNamespace(PrintPlain=lambda message: None)
+        saved = save.save_detailed_fls(app, self.path, self.dfls, ('csv',))
+        table = pd.read_csv(saved[0])
+        self.assertEqual(list(table['Device']), ['RC1'] * 3 + ['RC2'] * 2)
+        self.assertEqual(list(table['Terminal']), ['T1', 'T2', 'T3', 'T4', 'Terminal 5'])
+
+
+if __name__ == '__main__':
+    unittest.main()
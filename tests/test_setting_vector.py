@@ -0,0 +1,37 @@
+import unittest
+from device_data.eql_relay_data import RelaySettings
+from relay_coordination import setting_vector as sv
+
+
+class Relay:
+    def __init__(self, settings):
+        self.relset = RelaySettings(settings)
+
+
+class TestSettingVector(unittest.TestCase):
+
+    def test_round_trip(self):
+        relays = [
+            Relay(["Existing", 400, 0.2, "SI", 2000, 0.05, "OFF", "OFF", 100, 0.15, "EI", "OFF", "OFF", "OFF", "OFF"]),
+            Relay([False, "", "", False, "", "", "", "", 80.5, 0.1, "VI", 900, 0.1, 3000, 0.05]),
+        ]
+        expected = [vars(relay.relset).copy() for relay in relays]
+        settings = sv.capture(relays)
+        for relay in relays:
+            relay.relset.oc_tms = 0.5
+            relay.relset.ef_hiset = 1234
+            relay.relset.status = "Required"
+        sv.restore(relays, settings)
+        self.assertEqual([vars(relay.relset) for relay in relays], expected)
+
+    def test_snapshot_is_independent(self):
+        relays = [Relay(["New", 400, 0.2, "SI", "OFF", "OFF", "OFF", "OFF", 100, 0.15, "SI", "OFF", "OFF", "OFF", "OFF"])]
+        settings = sv.capture(relays)
+        snapshot = settings.copy()
+        settings['oc_tms'] = 0.9
+        sv.restore(relays, snapshot)
+        self.assertEqual(relays[0].relset.oc_tms, 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
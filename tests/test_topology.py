@@ -0,0 +1,127 @@
+import tempfile
+import unittest
+from pathlib import Path
+from fault_level_data import fault_data, floating_terminals as ft, topology
+from fault_level_data.network_backend import ReplayNetwork
+
+
+def feeder_recording() -> dict:
+    """
+    FDR01 bus T0 -- FDR01 CB -- T1 -- LN1 -- T2 -- RC2 recloser -- T3 -- LN2 -- T4 (L1)
+                                              \\- LN3 -- T5 (L2) -- open point -- T6 (L3)
+    """
+
+    objects = {}
+
+    def add(object_id, class_name, attributes=None, references=None, calls=None):
+        objects[object_id] = {'class': class_name, 'loc_name': object_id, 'attributes': attributes or {},
+                              'references': references or {}, 'calls': calls or {}}
+
+    for term in ('T0', 'T1', 'T2', 'T3', 'T4', 'T5', 'T6'):
+        add(term, 'ElmTerm', {'iUsage': 1, 'outserv': 0})
+    branches = {
+        'SW1': ('ElmCoup', 'T0', 'T1'), 'LN1': ('ElmLne', 'T1', 'T2'), 'SW2': ('ElmCoup', 'T2', 'T3'),
+        'LN2': ('ElmLne', 'T3', 'T4'), 'LN3': ('ElmLne', 'T2', 'T5'), 'SW3': ('ElmCoup', 'T5', 'T6'),
+    }
+    for branch, (class_name, term_1, term_2) in branches.items():
+        add(f'{branch}a', 'StaCubic', references={'cterm': term_1, 'obj_id': branch})
+        add(f'{branch}b', 'StaCubic', references={'cterm': term_2, 'obj_id': branch})
+        attributes = {'outserv': 0}
+        if class_name == 'ElmCoup':
+            attributes['on_off'] = 0 if branch == 'SW3' else 1
+        add(branch, class_name, attributes, {'bus1': f'{branch}a', 'bus2': f'{branch}b'},
+            {'GetConnectedElements|1|1|0': [term_1, term_2], 'GetConnectedElements': [term_1, term_2]})
+    # LN4 is open at T6 (a floating line)
+    add('LN4a', 'StaCubic', references={'cterm': 'T4', 'obj_id': 'LN4'})
+    add('LN4b', 'StaCubic', references={'cterm': 'T6', 'obj_id': 'LN4'})
+    add('LN4', 'ElmLne', {'outserv': 0}, {'bus1': 'LN4a', 'bus2': 'LN4b'},
+        {'GetConnectedElements|1|1|0': ['T4'], 'GetConnectedElements': ['T4', 'T6']})
+    for load, term in (('L1', 'T4'), ('L2', 'T5'), ('L3', 'T6')):
+        add(f'{load}a', 'StaCubic', references={'cterm': term, 'obj_id': load})
+        add(load, 'ElmLod', {'Strat': 200, 'outserv': 0}, {'bus1': f'{load}a'},
+            {'GetConnectedElements|1|1|0': [term]})
+    for term in ('T0', 'T1', 'T2', 'T3', 'T4', 'T5', 'T6'):
+        objects[term]['calls']['GetConnectedCubicles'] = [
+            object_id for object_id, data in objects.items() if data['references'].get('cterm') == term
+        ]
+    feeder_objects = [object_id for object_id, data in objects.items() if data['class'] != 'StaCubic']
+    feeder_lines = [object_id for object_id in feeder_objects if objects[object_id]['class'] == 'ElmLne']
+    add('F', 'ElmFeeder', references={'obj_id': 'SW1a'},
+        calls={'GetAll': feeder_objects, 'GetObjs|ElmLne': feeder_lines})
+    # PowerFactory topological searches from the device cubicles
+    objects['SW1a']['calls'] = {
+        'GetAll|1|0': ['SW1', 'T1', 'LN1', 'T2', 'LN3', 'T5', 'L2', 'SW2', 'T3', 'LN2', 'T4', 'L1', 'LN4'],
+        'GetAll|0|0': ['X']
+    }
+    objects['SW2a']['calls'] = {'GetAll|1|0': ['SW2', 'T3', 'LN2', 'T4', 'L1', 'LN4'],
+                                'GetAll|0|0': ['LN1', 'T1', 'LN3', 'T5', 'L2', 'SW1', 'T0', 'X']}
+    add('X', 'ElmXnet', {'outserv': 0})
+
+    return {'objects': objects, 'calc_relevant': {'*.ElmXnet': ['X']}, 'feeders': ['F'], 'results': {}}
+
+
+class TestFeederGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.app = ReplayNetwork(feeder_recording())
+        self.feeder = self.app.obj('F')
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache_path = topology.cache_path
+        topology.cache_path = lambda feeder_name: Path(self.cache_dir.name) / f"{feeder_name}.pkl"
+        topology.clear_graphs()
+
+    def tearDown(self):
+        topology.cache_path = self.cache_path
+        topology.clear_graphs()
+        self.cache_dir.cleanup()
+
+    def obj(self, *object_ids):
+        return [self.app.obj(object_id) for object_id in object_ids]
+
+    def test_matches_topological_search(self):
+        site_name_map = {'FDR01': dict(zip(self.obj('SW1a'), self.obj('T0'))),
+                         'RC2': dict(zip(self.obj('SW2a'), self.obj('T2')))}
+        graph = topology.feeder_graph(self.app, self.feeder)
+        from_graph = fault_data.get_downstream_objects(self.app, site_name_map, graph)
+        from_search = fault_data.get_downstream_objects(self.app, site_name_map)
+        for graph_objects, search_objects in zip(from_graph, from_search):
+            self.assertEqual(graph_objects.keys(), search_objects.keys())
+            for device in graph_objects:
+                self.assertEqual(graph_objects[device][0], search_objects[device][0])
+                self.assertCountEqual(graph_objects[device], search_objects[device])
+
+    def test_floating_terminals(self):
+        site_name_map = {'FDR01': dict(zip(self.obj('SW1a'), self.obj('T0'))),
+                         'RC2': dict(zip(self.obj('SW2a'), self.obj('T2')))}
+        graph = topology.feeder_graph(self.app, self.feeder)
+        devices_terminals, _ = fault_data.get_downstream_objects(self.app, site_name_map, graph)
+        devices_sections = fault_data.get_device_sections(devices_terminals)
+        from_graph = ft.get_floating_terminals(self.feeder, devices_sections, graph)
+        self.assertEqual(from_graph, ft.get_floating_terminals(self.feeder, devices_sections))
+        self.assertEqual(from_graph[self.app.obj('T2')], {self.app.obj('LN4'): self.app.obj('T6')})
+
+    def test_upstream_cubicle(self):
+        # The device cubicle element leads towards the feeder terminal
+        graph = topology.feeder_graph(self.app, self.feeder)
+        terminals, loads = graph.downstream(*self.obj('SW2b', 'T3'))
+        self.assertEqual(terminals, self.obj('T3', 'T4'))
+        self.assertEqual(loads, self.obj('L1'))
+
+    def test_cache(self):
+        graph = topology.feeder_graph(self.app, self.feeder)
+        self.assertIs(topology.feeder_graph(self.app, self.feeder), graph)
+        topology.clear_graphs()
+        from_disk = topology.feeder_graph(self.app, self.feeder)
+        self.assertIsNot(from_disk, graph)
+        self.assertEqual(from_disk.indices.tolist(), graph.indices.tolist())
+
+    def test_switch_operation(self):
+        graph = topology.feeder_graph(self.app, self.feeder)
+        self.assertNotIn(self.app.obj('T6'), graph.downstream(*self.obj('SW1a', 'T0'))[0])
+        self.app.obj('SW3')._attributes['on_off'] = 1
+        graph = topology.feeder_graph(self.app, self.feeder)
+        self.assertIn(self.app.obj('T6'), graph.downstream(*self.obj('SW1a', 'T0'))[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
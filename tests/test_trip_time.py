@@ -0,0 +1,121 @@
+import unittest
+import numpy as np
+from relay_coordination import trip_time as tt
+from tests.helpers import make_relay
+
+
+class TestTripTimeArray(unittest.TestCase):
+    """relay_trip_time_array element by element against the scalar relay_trip_time"""
+
+    # Below pick up, either side of the hisets and beyond CT saturation. Exactly at pick up the scalar calculation
+    # divides by zero
+    fault_levels = np.concatenate([[10, 50, 99.5, 100.5], np.geomspace(101, 5000, 60), [1499.9, 1500, 2999.9, 3000]])
+
+    def assert_matches_scalar(self, relay):
+        array = tt.relay_trip_time_array(relay, self.fault_levels, 'EF')
+        scalar = [tt.relay_trip_time(relay, fault_level, 'EF') for fault_level in self.fault_levels]
+        np.testing.assert_allclose(array, scalar, rtol=1e-12)
+
+    def test_curves(self):
+        for curve in ('SI', 'VI', 'EI'):
+            with self.subTest(curve=curve):
+                self.assert_matches_scalar(make_relay(curve=curve))
+
+    def test_curve_constants(self):
+        # IEC 60255 curves at 10 times pick up, TMS 0.2
+        for curve, trip_time in (('SI', 0.2 * 0.14 / (10 ** 0.02 - 1)), ('VI', 0.2 * 13.5 / 9), ('EI', 0.2 * 80 / 99)):
+            with self.subTest(curve=curve):
+                self.assertAlmostEqual(tt.relay_trip_time(make_relay(curve=curve), 1000, 'EF'), trip_time)
+                self.assertAlmostEqual(tt.relay_trip_time_array(make_relay(curve=curve), [1000], 'EF')[0], trip_time)
+
+    def test_hiset(self):
+        self.assert_matches_scalar(make_relay(hiset=1500, min_time=0.05))
+
+    def test_hiset_2(self):
+        self.assert_matches_scalar(make_relay(hiset=1500, min_time=0.05, hiset_2=3000, min_time2=0.02))
+
+    def test_ct_saturation(self):
+        self.assert_matches_scalar(make_relay(saturation=8))
+
+    def test_below_pick_up(self):
+        trip_times = tt.relay_trip_time_array(make_relay(), [10, 50, 99.5, 100], 'EF')
+        self.assertTrue(np.all(trip_times == 9999))
+
+
+class TestTripTimeIntegral(unittest.TestCase):
+    """relay_trip_time_integral against the 1A step summation it replaces in the objective function"""
+
+    def assert_matches_summation(self, relay, min_fl, max_fl, delta=0.002):
+        summation = tt.relay_trip_time_array(relay, tt.fault_range(min_fl, max_fl), 'EF').sum()
+        integral = tt.relay_trip_time_integral(relay, min_fl, max_fl, 'EF')
+        self.assertAlmostEqual(integral / summation, 1, delta=delta)
+
+    def test_hisets_off(self):
+        self.assert_matches_summation(make_relay(), 200, 5000)
+
+    def test_curves(self):
+        # VI and EI are integrated in closed form. The steep EI curve is compared with a fine midpoint sum, as the 1A
+        # summation overestimates it by a few tenths of a percent
+        for curve in ('VI', 'EI'):
+            for relay in (make_relay(curve=curve), make_relay(curve=curve, hiset=1500, min_time=0.05)):
+                with self.subTest(curve=curve, hiset=relay.relset.ef_hiset):
+                    midpoints = np.arange(200.005, 5000, 0.01)
+                    expected = tt.relay_trip_time_array(relay, midpoints, 'EF').sum() * 0.01
+                    integral = tt.relay_trip_time_integral(relay, 200, 5000, 'EF')
+                    self.assertAlmostEqual(integral / expected, 1, delta=1e-6)
+
+    def test_hiset(self):
+        self.assert_matches_summation(make_relay(hiset=1500, min_time=0.05), 200, 5000)
+
+    def test_hiset_2(self):
+        self.assert_matches_summation(make_relay(hiset=1500, min_time=0.05, hiset_2=3000, min_time2=0.02), 200, 5000)
+
+    def test_ct_saturation(self):
+        self.assert_matches_summation(make_relay(saturation=8), 200, 5000)
+
+    def test_below_pick_up(self):
+        # The summation samples the 9999s non-operate time at exactly pick up, so agreement is looser here
+        self.assert_matches_summation(make_relay(), 50, 400, delta=0.03)
+
+    def test_plateau_is_exact(self):
+        relay = make_relay(hiset=1000, min_time=0.05)
+        self.assertAlmostEqual(tt.relay_trip_time_integral(relay, 2000, 3000, 'EF'), 50)
+
+    def test_tolerance(self):
+        relay = make_relay()
+        coarse = tt.relay_trip_time_integral(relay, 200, 50000, 'EF', tol=1e-2)
+        fine = tt.relay_trip_time_integral(relay, 200, 50000, 'EF', tol=1e-10)
+        self.assertAlmostEqual(coarse / fine, 1, delta=1e-2)
+
+
+class TestFaultSamples(unittest.TestCase):
+
+    def test_point_budget(self):
+        for max_fl in (1000, 100000, 1e7):
+            samples = tt.fault_samples(100, max_fl, [500, 800], points=64)
+            self.assertLessEqual(len(samples), 64 + 2)
+            self.assertEqual((samples[0], samples[-1]), (100, max_fl))
+            self.assertTrue(np.all(np.diff(samples) > 0))
+
+    def test_breakpoints_sampled_both_sides(self):
+        relay = make_relay(hiset=1500, min_time=0.05, hiset_2=3000, min_time2=0.02)
+        samples = tt.fault_samples(150.5, 5000.25, tt.relay_breakpoints(relay, 'EF'))
+        for breakpoint in (1500, 3000, 2000):
+            self.assertIn(breakpoint, samples)
+            self.assertIn(np.nextafter(breakpoint, 0), samples)
+        # Trip times either side of the hiset step
+        trip_times = tt.relay_trip_time_array(relay, samples, 'EF')
+        self.assertIn(0.05, trip_times)
+        self.assertGreater(trip_times[samples == np.nextafter(1500, 0)][0], 0.05)
+
+    def test_many_breakpoints(self):
+        samples = tt.fault_samples(10, 10000, np.linspace(20, 9000, 500), points=100)
+        self.assertLessEqual(len(samples), 102)
+
+    def test_empty_range(self):
+        self.assertEqual(len(tt.fault_samples(250.5, 250)), 0)
+        self.assertEqual(len(tt.fault_samples(250, 250)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()